@@ -0,0 +1,38 @@
+"""Helpers shared by the benchmark scripts
+
+Every script runs from the root of the repository, takes its options on the
+command line and prints one line per scenario with the same latency
+percentiles:
+
+    python benchmarks/<script>.py --help
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def use_service(directory):
+    """Function that makes the modules of a service directory importable"""
+
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(name, samples, *details):
+    """Function that prints the p50, p95 and p99 latencies of a scenario, in ms, and its details"""
+
+    if samples:
+        latencies = (
+            f"p50 {percentile(samples, 0.5):.3f} ms, "
+            f"p95 {percentile(samples, 0.95):.3f} ms, "
+            f"p99 {percentile(samples, 0.99):.3f} ms over {len(samples)} samples"
+        )
+    else:
+        latencies = "no samples"
+    print(", ".join([f"{name}: {latencies}", *details]))
@@ -0,0 +1,68 @@
+"""Measures the throughput and latency of an endpoint under concurrent clients
+
+Run it against the same endpoint with the service on sync workers and on
+gevent workers to compare both deployments:
+
+    GUNICORN_WORKER_CLASS=sync docker compose up -d product_api
+    python benchmarks/http_concurrency.py "http://localhost:8001/api/v1/products?limit=50"
+
+    GUNICORN_WORKER_CLASS=gevent MONGODB_MAX_POOL_SIZE=100 docker compose up -d product_api
+    python benchmarks/http_concurrency.py "http://localhost:8001/api/v1/products?limit=50"
+
+The same endpoint served by the composite app, which runs all six services
+in one container, compares both topologies:
+
+    docker compose --profile composite up -d composite_api
+    python benchmarks/http_concurrency.py "http://localhost:8006/api/v1/products?limit=50"
+
+Only the standard library is used, so it runs from any machine with Python.
+"""
+
+import argparse
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from common import report
+
+
+def fetch(url, timeout):
+    """Function that requests the url once and returns its status and latency in ms"""
+
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = None
+
+    return status, (time.perf_counter() - started) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("url")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        started = time.perf_counter()
+        results = list(
+            executor.map(lambda _: fetch(args.url, args.timeout), range(args.requests))
+        )
+        elapsed = time.perf_counter() - started
+
+    latencies = [latency for status, latency in results if status == 200]
+    errors = len(results) - len(latencies)
+
+    report(
+        f"{args.concurrency} concurrent clients",
+        latencies,
+        f"{args.requests / elapsed:.1f} requests/s",
+        f"{errors} non-200 responses or failures",
+    )
@@ -0,0 +1,81 @@
+"""Compares Flask's default JSON provider with the orjson provider on a list of orders
+
+Builds 10,000 orders shaped like the ones get_all_orders returns and times
+how long each provider takes to turn them into a response, along with the
+peak memory allocated while doing it. No database is needed, only the
+packages of a service:
+
+    pip install -r products_API/requirements.txt
+    python benchmarks/json_providers.py --orders 10000
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from common import report, use_service
+
+# The provider is the same in every service
+use_service("products_API")
+from routes.json_provider import OrjsonProvider  # noqa: E402
+
+
+def build_orders(count):
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "_id": order_id,
+            "customer_email": f"customer{order_id}@example.com",
+            "products": [
+                {
+                    "id": str(product_id),
+                    "name": f"Product {product_id}",
+                    "price": 10.5 + product_id,
+                    "quantity": 1 + product_id % 3,
+                }
+                for product_id in range(order_id % 5 + 1)
+            ],
+            "total_price": 42.0 + order_id,
+            "created_at": (created_at + timedelta(minutes=order_id)).isoformat(),
+        }
+        for order_id in range(count)
+    ]
+
+
+def measure(app, orders, runs):
+    samples = []
+    with app.app_context():
+        for _ in range(runs):
+            started = time.perf_counter()
+            response = app.json.response(orders)
+            samples.append((time.perf_counter() - started) * 1000)
+
+        tracemalloc.start()
+        app.json.response(orders)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return samples, peak, len(response.get_data())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    orders = build_orders(args.orders)
+
+    providers = [("flask default", DefaultJSONProvider), ("orjson", OrjsonProvider)]
+    for name, provider in providers:
+        app = Flask(__name__)
+        app.json = provider(app)
+        samples, peak, size = measure(app, orders, args.runs)
+        report(
+            name,
+            samples,
+            f"peak memory {peak / 1024 / 1024:.1f} MiB",
+            f"{size / 1024:.0f} KiB body for {args.orders} orders",
+        )
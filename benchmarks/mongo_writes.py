@@ -0,0 +1,105 @@
+"""Compares the latency of the old and new update/delete round trips
+
+The services used to read a document with find_one before every update_one
+or delete_one. They now issue a single find_one_and_update or
+find_one_and_delete. This script times both patterns on a scratch collection
+of the product database. It needs the MONGODB_USER, MONGODB_PASS and
+MONGODB_HOST variables of the services; the product_api container has them
+and reaches the database:
+
+    docker compose run --rm -v "$PWD:/repo" -w /repo --entrypoint python \
+        product_api benchmarks/mongo_writes.py --runs 2000
+"""
+
+import argparse
+import os
+import time
+from pymongo import ReturnDocument
+from common import report, use_service
+
+use_service("products_API")
+from models.mongo_client import create_client  # noqa: E402
+
+SCRATCH_COLLECTION = "benchmark_writes"
+
+
+def seed(collection, runs):
+    collection.drop()
+    collection.insert_many(
+        [
+            {"_id": doc_id, "name": f"Product {doc_id}", "price": "10", "category": "b"}
+            for doc_id in range(runs)
+        ]
+    )
+
+
+def timed(runs, operation):
+    samples = []
+    for doc_id in range(runs):
+        started = time.perf_counter()
+        operation(doc_id)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def update_two_round_trips(collection):
+    def operation(doc_id):
+        if collection.find_one({"_id": doc_id}):
+            collection.update_one({"_id": doc_id}, {"$set": {"price": "11"}})
+
+    return operation
+
+
+def update_one_round_trip(collection):
+    def operation(doc_id):
+        collection.find_one_and_update(
+            {"_id": doc_id},
+            {"$set": {"price": "12"}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    return operation
+
+
+def delete_two_round_trips(collection):
+    def operation(doc_id):
+        if collection.find_one({"_id": doc_id}):
+            collection.delete_one({"_id": doc_id})
+
+    return operation
+
+
+def delete_one_round_trip(collection):
+    def operation(doc_id):
+        collection.find_one_and_delete({"_id": doc_id})
+
+    return operation
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = create_client(
+        os.environ["MONGODB_HOST"],
+        os.environ["MONGODB_USER"],
+        os.environ["MONGODB_PASS"],
+    )
+
+    try:
+        collection = client["project"][SCRATCH_COLLECTION]
+
+        scenarios = [
+            ("update, find_one + update_one", update_two_round_trips),
+            ("update, find_one_and_update", update_one_round_trip),
+            ("delete, find_one + delete_one", delete_two_round_trips),
+            ("delete, find_one_and_delete", delete_one_round_trip),
+        ]
+        for name, scenario in scenarios:
+            seed(collection, args.runs)
+            report(name, timed(args.runs, scenario(collection)))
+
+        collection.drop()
+    finally:
+        client.close()
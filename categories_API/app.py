@@ -2,23 +2,32 @@ from flask import Flask
 from models.categories_models import CategoryModel
 from services.categories_services import CategoryService
 from schemas.categories_schemas import CategorySchema
+from services.cache_watcher import CacheWatcher
 from routes.categories_routes import CategoryRoute
+from routes.compression import Compression
+from routes.json_provider import OrjsonProvider
 from flask_cors import CORS
 from flasgger import Swagger
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
+Compression(app)
 
 # Swagger
 swagger = Swagger(app)
 
-# Model
+# Model, the MongoDB client is created on first use in every worker
 db_conn = CategoryModel()
-db_conn.connect_to_database()
 
 # Service
 category_service = CategoryService(db_conn)
 
+# Evicts cached categories written by the other workers
+cache_watcher = CacheWatcher(
+    db_conn, "categories", category_service.cache, version=category_service.version
+)
+
 # Schema
 category_schema = CategorySchema()
 
@@ -28,10 +37,26 @@ category_routes = CategoryRoute(category_service, category_schema)
 # Register the blueprint to make the routes available in the app
 app.register_blueprint(category_routes)
 
+
+def init_worker():
+    """Function that starts the background threads of a worker process
+
+    Called from the gunicorn post_fork hook, so it also runs with --preload.
+    """
+
+    cache_watcher.start()
+
+
+def close_worker():
+    """Function that stops the threads and closes the client of a worker process"""
+
+    cache_watcher.stop()
+    db_conn.close_connection()
+
+
 if __name__ == "__main__":
     try:
+        init_worker()
         app.run(debug=True)
     finally:
-        db_conn.close_connection()
-
-
+        close_worker()
@@ -0,0 +1,112 @@
+import os
+from datetime import datetime, timedelta, timezone
+from pymongo import ASCENDING, IndexModel
+
+# Entries older than this are removed by a TTL index. Clients whose version is
+# older than the oldest entry left must read the whole collection again.
+RETENTION_SECONDS = int(os.environ.get("CHANGELOG_RETENTION_SECONDS", 7 * 24 * 3600))
+
+# A missing version younger than this belongs to a write still in flight, so
+# readers stop before it instead of skipping it
+IN_FLIGHT_SECONDS = float(os.environ.get("CHANGELOG_IN_FLIGHT_SECONDS", 5))
+
+MAX_ENTRIES = int(os.environ.get("CHANGELOG_MAX_ENTRIES", 5000))
+
+
+def change_log_indexes(collection_name):
+    """Function that declares the indexes of the change log of a collection"""
+
+    return {
+        f"{collection_name}_changes": [
+            IndexModel([("version", ASCENDING)], name="version_1"),
+            IndexModel(
+                [("at", ASCENDING)],
+                name="at_ttl",
+                expireAfterSeconds=RETENTION_SECONDS,
+            ),
+        ]
+    }
+
+
+class ChangeLog:
+    """Class that records which documents every version of a collection touched
+
+    Each write appends one entry per document with the version it bumped the
+    collection to, and deletes are kept as tombstones. Reading the entries
+    after a version tells a client exactly what to fetch and what to drop.
+    """
+
+    def __init__(self, db_conn, collection_name):
+        self.db_conn = db_conn
+        self.collection_name = collection_name
+
+    @property
+    def entries(self):
+        return self.db_conn.db[f"{self.collection_name}_changes"]
+
+    def record(self, version, upserted=(), deleted=()):
+        """Function that appends the entries of one write"""
+
+        at = datetime.now(timezone.utc)
+        entries = [
+            {"version": version, "doc_id": doc_id, "op": "upsert", "at": at}
+            for doc_id in upserted
+        ] + [
+            {"version": version, "doc_id": doc_id, "op": "delete", "at": at}
+            for doc_id in deleted
+        ]
+        if entries:
+            self.entries.insert_many(entries, ordered=False)
+
+    def since(self, since, current_version, limit=None):
+        """Function that returns the last operation of every document changed after a version
+
+        Returns (operations, version, has_more), where operations maps document
+        ids to "upsert" or "delete" and version is the one the client reaches
+        by applying them. Returns None when the entries after since were
+        already removed.
+        """
+
+        limit = limit or MAX_ENTRIES
+
+        oldest = self.entries.find_one(sort=[("version", ASCENDING)])
+        if oldest is None:
+            if since < current_version:
+                return None
+            return {}, since, False
+        if since < oldest["version"] - 1:
+            return None
+
+        entries = list(
+            self.entries.find({"version": {"$gt": since}})
+            .sort("version", ASCENDING)
+            .limit(limit + 1)
+        )
+
+        has_more = len(entries) > limit
+        if has_more:
+            # Never hand out part of a version, a bulk write is read whole
+            last_version = entries[limit]["version"]
+            entries = [entry for entry in entries if entry["version"] < last_version]
+            if not entries:
+                entries = list(self.entries.find({"version": last_version}))
+
+        operations = {}
+        reached = since
+        in_flight_after = datetime.now(timezone.utc) - timedelta(
+            seconds=IN_FLIGHT_SECONDS
+        )
+        for entry in entries:
+            if entry["version"] > reached + 1 and _aware(entry["at"]) > in_flight_after:
+                # An earlier version may not be logged yet, resume from here
+                has_more = True
+                break
+            reached = entry["version"]
+            operations[entry["doc_id"]] = entry["op"]
+
+        return operations, reached, has_more
+
+
+def _aware(value):
+    # pymongo returns naive datetimes in UTC unless the client is tz_aware
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
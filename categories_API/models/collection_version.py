@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pymongo import ReturnDocument
+
+
+def utc_timestamp():
+    """Function that returns the current UTC time in ISO 8601, as stored in updated_at"""
+
+    return datetime.now(timezone.utc).isoformat()
+
+
+class CollectionVersion:
+    """Class that tracks a version number bumped by every write to a collection
+
+    The version and the time of the last write are kept in a counter document
+    of the counters collection. Every worker keeps the last values it saw, so
+    reading the version costs no round trip. The local values are refreshed
+    after writes of other workers reported by the cache watcher, and at least
+    every VERSION_REFRESH_SECONDS in case a report arrives before the counter
+    was bumped or no watcher runs.
+    """
+
+    def __init__(self, db_conn, collection_name, refresh_interval=None):
+        self.db_conn = db_conn
+        self.collection_name = collection_name
+        self.counter_id = f"{collection_name}_version"
+        self.refresh_interval = (
+            refresh_interval
+            if refresh_interval is not None
+            else float(os.environ.get("VERSION_REFRESH_SECONDS", 1))
+        )
+        self._lock = threading.Lock()
+        self._version = None
+        self._updated_at = None
+        self._expires_at = 0.0
+
+    def current(self):
+        """Function that returns the version, reading the counter only when it is stale"""
+
+        return self.snapshot()["version"]
+
+    def snapshot(self):
+        """Function that returns the version and the time of the last write"""
+
+        with self._lock:
+            if self._version is None or self._expires_at < time.monotonic():
+                counter = self.db_conn.db.counters.find_one({"_id": self.counter_id})
+                self._store(counter or {"seq": 0})
+            return {
+                "collection": self.collection_name,
+                "version": self._version,
+                "updated_at": self._updated_at,
+            }
+
+    def bump(self, updated_at=None):
+        """Function that increments the version after a write and returns the new value"""
+
+        counter = self.db_conn.db.counters.find_one_and_update(
+            {"_id": self.counter_id},
+            {"$inc": {"seq": 1}, "$set": {"updated_at": updated_at or utc_timestamp()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        with self._lock:
+            # Concurrent bumps may answer out of order, never move backwards
+            if self._version is None or counter["seq"] > self._version:
+                self._store(counter)
+        return counter["seq"]
+
+    def mark_stale(self):
+        """Function that makes the next read fetch the counter again"""
+
+        with self._lock:
+            self._expires_at = 0.0
+
+    def _store(self, counter):
+        self._version = counter["seq"]
+        self._updated_at = counter.get("updated_at")
+        self._expires_at = time.monotonic() + self.refresh_interval
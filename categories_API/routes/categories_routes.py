@@ -1,6 +1,27 @@
 from flask import Blueprint, jsonify, request
 from marshmallow import ValidationError
 from flasgger import swag_from
+from routes.query_params import (
+    FIELDS_PARAMETER,
+    IDS_PARAMETER,
+    PAGINATION_PARAMETERS,
+    bulk_response,
+    parse_bulk_ids,
+    parse_bulk_items,
+    parse_bulk_patch,
+    parse_fields,
+    parse_lookup_ids,
+    parse_pagination,
+    ordered_by_ids,
+    paginated,
+    schema_field_names,
+)
+from routes.conditional import (
+    IF_NONE_MATCH_PARAMETER,
+    cacheable,
+    collection_etag,
+    not_modified,
+)
 from logger.logger_categories import Logger
 
 
@@ -12,24 +33,53 @@ class CategoryRoute(Blueprint):
         self.logger = Logger()
         self.category_service = category_service
         self.category_schema = category_schema
+        self.projectable_fields = schema_field_names(category_schema) | {
+            "_id",
+            "updated_at",
+        }
         self.register_routes()
 
     def register_routes(self):
         """Function to register the routes for the category API"""
 
         self.route("/api/v1/categories", methods=["GET"])(self.get_categories)
+        self.route("/api/v1/categories/<int:category_id>", methods=["GET"])(
+            self.get_category
+        )
         self.route("/api/v1/categories", methods=["POST"])(self.add_category)
+        self.route("/api/v1/categories/bulk", methods=["POST"])(
+            self.add_categories_bulk
+        )
+        self.route("/api/v1/categories/lookup", methods=["POST"])(
+            self.get_categories_by_ids
+        )
         self.route("/api/v1/categories/<int:category_id>", methods=["PUT"])(
             self.update_category
         )
         self.route("/api/v1/categories/<int:category_id>", methods=["DELETE"])(
             self.delete_category
         )
+        self.route("/api/v1/categories/bulk", methods=["PATCH"])(
+            self.update_categories_bulk
+        )
+        self.route("/api/v1/categories/bulk", methods=["DELETE"])(
+            self.delete_categories_bulk
+        )
+        self.route("/api/v1/categories/cache/stats", methods=["GET"])(
+            self.get_cache_stats
+        )
+        self.route("/api/v1/categories/changes", methods=["GET"])(self.get_changes)
+        self.route("/api/v1/categories/version", methods=["GET"])(self.get_version)
+        self.route("/api/v1/categories/pool/stats", methods=["GET"])(
+            self.get_pool_stats
+        )
         self.route("/healthcheck", methods=["GET"])(self.healthcheck)
 
     @swag_from(
         {
             "tags": ["categories"],
+            "parameters": PAGINATION_PARAMETERS
+            + [IDS_PARAMETER, FIELDS_PARAMETER, IF_NONE_MATCH_PARAMETER],
             "responses": {
                 200: {
                     "description": "Fetches all categories",
@@ -42,15 +92,140 @@ class CategoryRoute(Blueprint):
                             },
                         },
                     },
-                }
+                },
+                304: {"description": "Categories not modified since the given ETag"},
             },
         }
     )
     def get_categories(self):
         """Fetches all categories"""
 
-        categories = self.category_service.get_all_categories()
-        return jsonify(categories), 200
+        if "ids" in request.args:
+            return self.get_categories_by_ids()
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        try:
+            after, limit = parse_pagination()
+        except ValueError as e:
+            self.logger.error(f"Invalid pagination parameters: {e}")
+            return jsonify({"error": f"Invalid pagination parameters: {e}"}), 400
+
+        etag = collection_etag("categories", self.category_service.get_version())
+        unchanged = not_modified(etag)
+        if unchanged is not None:
+            return unchanged
+
+        categories = self.category_service.get_all_categories(after, limit, fields)
+        if limit is None:
+            return cacheable(jsonify(categories), etag), 200
+        return cacheable(jsonify(paginated(categories, limit)), etag), 200
+
+    @swag_from(
+        {
+            "tags": ["categories"],
+            "parameters": [
+                {
+                    "name": "category_id",
+                    "in": "path",
+                    "required": True,
+                    "type": "integer",
+                },
+                FIELDS_PARAMETER,
+                IF_NONE_MATCH_PARAMETER,
+            ],
+            "responses": {
+                200: {"description": "Category fetched successfully"},
+                304: {"description": "Category not modified since the given ETag"},
+                400: {"description": "Invalid fields parameter"},
+                404: {"description": "Category not found"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_category(self, category_id):
+        """Fetches a category by its ID"""
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        etag = collection_etag("categories", self.category_service.get_version())
+        unchanged = not_modified(etag)
+        if unchanged is not None:
+            return unchanged
+
+        try:
+            category = self.category_service.get_categories_by_id(category_id, fields)
+            if category:
+                return cacheable(jsonify(category), etag), 200
+            else:
+                self.logger.error("Category not found")
+                return jsonify({"error": "Category not found"}), 404
+
+        except Exception as e:
+            self.logger.error(f"Error fetching category: {e}")
+            return jsonify({"error": f"Error fetching category: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["categories"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {"type": "array", "items": {"type": "integer"}},
+                },
+                FIELDS_PARAMETER,
+            ],
+            "responses": {
+                200: {"description": "Categories in the requested order, missing ids"},
+                400: {"description": "Invalid ids or fields parameter"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_categories_by_ids(self):
+        """Fetches many categories by their IDs with one query, in the requested order"""
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        try:
+            category_ids = parse_lookup_ids()
+        except ValueError as e:
+            self.logger.error(f"Invalid ids: {e}")
+            return jsonify({"error": f"Invalid ids: {e}"}), 400
+
+        # Ids sent in a POST body are not part of the URL, so only GET is cacheable
+        etag = None
+        if request.method == "GET":
+            etag = collection_etag("categories", self.category_service.get_version())
+            unchanged = not_modified(etag)
+            if unchanged is not None:
+                return unchanged
+
+        try:
+            categories = self.category_service.get_categories_by_ids(
+                category_ids, fields
+            )
+            return (
+                cacheable(jsonify(ordered_by_ids(categories, category_ids)), etag),
+                200,
+            )
+        except Exception as e:
+            self.logger.error(f"Error fetching categories by ids: {e}")
+            return jsonify({"error": f"Error fetching categories by ids: {e}"}), 500
 
     @swag_from(
         {
@@ -132,13 +307,109 @@ class CategoryRoute(Blueprint):
             new_category = {"name": name}
 
             created_category = self.category_service.add_category(new_category)
-            self.logger.info(f"Category added: {created_category}")
+            self.logger.info(f"Category added: {created_category['_id']}")
             return jsonify(created_category), 201
 
         except Exception as e:
             self.logger.error(f"Error adding category: {e}")
             return jsonify({"error": f"Error adding category: {e}"}), 500
 
+    def validate_category(self, data):
+        """Function that validates one category with the schema and returns its fields"""
+
+        if not isinstance(data, dict):
+            raise ValidationError("Each item must be a JSON object")
+
+        missing = [field for field in ("name",) if field not in data]
+        if missing:
+            raise ValidationError(f"Missing fields: {', '.join(missing)}")
+
+        name = data["name"]
+
+        self.category_schema.validate_name(name)
+
+        return {"name": name}
+
+    @swag_from(
+        {
+            "tags": ["categories"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string"},
+                            },
+                            "required": ["name"],
+                        },
+                    },
+                }
+            ],
+            "responses": {
+                201: {"description": "Every category was added"},
+                207: {
+                    "description": "Some categories were added, see the per-item results"
+                },
+                400: {"description": "No category was added"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def add_categories_bulk(self):
+        """Adds many categories in one request, reporting the result of each item"""
+
+        try:
+            items = parse_bulk_items()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"error": f"Invalid bulk data: {e}"}), 400
+
+        results = [None] * len(items)
+        new_categories = []
+        positions = []
+        for index, item in enumerate(items):
+            try:
+                new_categories.append(self.validate_category(item))
+                positions.append(index)
+            except (ValidationError, TypeError, ValueError) as e:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "error": f"Invalid data: {e}",
+                }
+
+        try:
+            if new_categories:
+                created, failed = self.category_service.add_categories(new_categories)
+                for position, (index, category) in enumerate(zip(positions, created)):
+                    if position in failed:
+                        results[index] = {
+                            "index": index,
+                            "status": "error",
+                            "error": failed[position],
+                        }
+                    else:
+                        results[index] = {
+                            "index": index,
+                            "status": "created",
+                            "_id": category["_id"],
+                        }
+
+            body, code = bulk_response(results, success_code=201)
+            self.logger.info(
+                f"Bulk categories: {body['succeeded']} added, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error adding categories in bulk: {e}")
+            return jsonify({"error": f"Error adding categories in bulk: {e}"}), 500
+
     @swag_from(
         {
             "tags": ["categories"],
@@ -182,7 +453,7 @@ class CategoryRoute(Blueprint):
                 category_id, update_category
             )
             if updated_category:
-                self.logger.info(f"Category updated: {updated_category}")
+                self.logger.info(f"Category updated: {category_id}")
                 return jsonify(updated_category), 200
             else:
                 self.logger.error("Category not found")
@@ -216,7 +487,7 @@ class CategoryRoute(Blueprint):
         try:
             deleted_category = self.category_service.delete_category(category_id)
             if deleted_category:
-                self.logger.info(f"Category deleted: {deleted_category}")
+                self.logger.info(f"Category deleted: {category_id}")
                 return jsonify(deleted_category), 200
             else:
                 self.logger.error("Category not found")
@@ -226,6 +497,249 @@ class CategoryRoute(Blueprint):
             self.logger.error(f"Error deleting category: {e}")
             return jsonify({"error": f"Error deleting category: {e}"}), 500
 
+    def validate_category_patch(self, fields):
+        """Function that validates the fields of a partial category update"""
+
+        validators = {
+            "name": self.category_schema.validate_name,
+        }
+        unknown = [field for field in fields if field not in validators]
+        if unknown:
+            raise ValidationError(f"Unknown fields: {', '.join(unknown)}")
+
+        for field, value in fields.items():
+            validators[field](value)
+
+        return fields
+
+    @swag_from(
+        {
+            "tags": ["categories"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "_id": {"type": "integer"},
+                                "name": {"type": "string"},
+                            },
+                            "required": ["_id"],
+                        },
+                    },
+                }
+            ],
+            "responses": {
+                200: {
+                    "description": "Every category was found, see the matched and modified counts"
+                },
+                207: {
+                    "description": "Some categories were not updated, see the per-id results"
+                },
+                400: {"description": "No category was updated"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def update_categories_bulk(self):
+        """Updates many categories in one request, reporting the counts of each id"""
+
+        try:
+            items = parse_bulk_items()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"error": f"Invalid bulk data: {e}"}), 400
+
+        results = [None] * len(items)
+        patches = []
+        positions = []
+        seen = set()
+        for index, item in enumerate(items):
+            try:
+                category_id, fields = parse_bulk_patch(item)
+                if category_id in seen:
+                    raise ValueError(f"_id {category_id} appears more than once")
+                patches.append((category_id, self.validate_category_patch(fields)))
+                seen.add(category_id)
+                positions.append(index)
+            except (ValidationError, TypeError, ValueError) as e:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "error": f"Invalid data: {e}",
+                }
+
+        try:
+            summary = {"matched": 0, "modified": 0, "missing": 0}
+            if patches:
+                updated, summary = self.category_service.update_categories(patches)
+                for index, result in zip(positions, updated):
+                    results[index] = {"index": index, **result}
+
+            body, code = bulk_response(results)
+            body.update(summary)
+            self.logger.info(
+                f"Bulk categories: {summary['modified']} modified, "
+                f"{summary['missing']} missing, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error updating categories in bulk: {e}")
+            return jsonify({"error": f"Error updating categories in bulk: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["categories"],
+            "parameters": [
+                {
+                    "name": "ids",
+                    "in": "query",
+                    "required": False,
+                    "type": "string",
+                    "description": "Comma separated list of ids, e.g. 1,2,3",
+                },
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": False,
+                    "schema": {"type": "array", "items": {"type": "integer"}},
+                    "description": "JSON array of ids, used when ids is not given",
+                },
+            ],
+            "responses": {
+                200: {"description": "Every category was deleted"},
+                207: {
+                    "description": "Some categories were not found, see the per-id results"
+                },
+                400: {"description": "No category was deleted"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def delete_categories_bulk(self):
+        """Deletes many categories in one request, reporting the result of each id"""
+
+        try:
+            category_ids = parse_bulk_ids()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"error": f"Invalid bulk data: {e}"}), 400
+
+        try:
+            results, summary = self.category_service.delete_categories(category_ids)
+
+            body, code = bulk_response(results)
+            body.update(summary)
+            self.logger.info(
+                f"Bulk categories: {summary['deleted']} deleted, "
+                f"{summary['missing']} missing, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error deleting categories in bulk: {e}")
+            return jsonify({"error": f"Error deleting categories in bulk: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["categories"],
+            "responses": {
+                200: {"description": "Read cache counters of the worker that answered"},
+            },
+        }
+    )
+    def get_cache_stats(self):
+        """Returns the hit and miss counters of the category read cache"""
+
+        return jsonify(self.category_service.get_cache_stats()), 200
+
+    @swag_from(
+        {
+            "tags": ["categories"],
+            "parameters": [
+                {
+                    "name": "since",
+                    "in": "query",
+                    "required": True,
+                    "type": "integer",
+                    "description": "Version the client holds, from /version or a previous call",
+                }
+            ],
+            "responses": {
+                200: {"description": "Documents written and ids deleted after since"},
+                400: {"description": "Invalid since parameter"},
+                410: {"description": "Changes since that version were compacted"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_changes(self):
+        """Returns the categories written and deleted after the version a client holds"""
+
+        try:
+            since = int(request.args["since"])
+            if since < 0:
+                raise ValueError
+        except (KeyError, ValueError):
+            self.logger.error("Invalid since parameter")
+            return (
+                jsonify({"error": "since must be a non negative integer version"}),
+                400,
+            )
+
+        try:
+            changes = self.category_service.get_changes(since)
+            if changes is None:
+                # The client has to read the whole list again
+                message = f"Changes since version {since} are no longer kept"
+                self.logger.error(message)
+                return jsonify({"error": message}), 410
+            return jsonify(changes), 200
+
+        except Exception as e:
+            self.logger.error(f"Error fetching categories changes: {e}")
+            return jsonify({"error": f"Error fetching categories changes: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["categories"],
+            "responses": {
+                200: {
+                    "description": "Collection version and the time of the last write"
+                },
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_version(self):
+        """Returns the current version of the categories collection"""
+
+        try:
+            return jsonify(self.category_service.get_version_info()), 200
+        except Exception as e:
+            self.logger.error(f"Error reading the categories version: {e}")
+            return jsonify({"error": f"Error reading the categories version: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["categories"],
+            "responses": {
+                200: {
+                    "description": "Checkouts, connections in use and checkout wait times"
+                },
+            },
+        }
+    )
+    def get_pool_stats(self):
+        """Returns the connection pool counters of the worker that answered"""
+
+        return jsonify(self.category_service.get_pool_stats()), 200
+
     def healthcheck(self):
         """Healthcheck endpoint for the category API container"""
 
@@ -0,0 +1,53 @@
+import decimal
+import orjson
+from bson import Decimal128, ObjectId
+from flask.json.provider import JSONProvider
+
+
+def _default(value):
+    """Function that serializes the BSON and stdlib types orjson does not know"""
+
+    if isinstance(value, (ObjectId, decimal.Decimal, Decimal128)):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    """Class that serializes the app's JSON with orjson instead of the stdlib json
+
+    orjson writes straight to bytes, so list responses of thousands of
+    documents are serialized several times faster and with far fewer
+    intermediate objects. datetime and UUID values are written natively in
+    ISO 8601 and canonical form, and ObjectId, Decimal and Decimal128 values
+    as strings.
+    """
+
+    # Same defaults as Flask's DefaultJSONProvider, so responses do not change
+    sort_keys = True
+    compact = None
+    mimetype = "application/json"
+
+    def _options(self):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Like DefaultJSONProvider, only responses are pretty printed in debug
+        # mode; dumps() stays compact for the one record per line of NDJSON
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self._options() | orjson.OPT_APPEND_NEWLINE
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        body = orjson.dumps(obj, default=_default, option=option)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, OperationFailure, PyMongoError
+from logger.logger_categories import Logger
+
+EVENTS_COLLECTION = "cache_events"
+EVENTS_COLLECTION_BYTES = 1024 * 1024
+
+
+class CacheWatcher:
+    """Class that evicts read cache entries written by other workers
+
+    Uses a MongoDB change stream on the watched collection when the server is a
+    replica set. Standalone servers have neither change streams nor an oplog, so
+    the fallback makes every write publish an event to a small capped collection
+    that each worker tails. The collection version, when given, is marked stale
+    on every eviction so the next read picks up the new value.
+    """
+
+    def __init__(
+        self,
+        db_conn,
+        collection_name,
+        cache,
+        mode=None,
+        poll_interval=None,
+        version=None,
+    ):
+        self.db_conn = db_conn
+        self.collection_name = collection_name
+        self.cache = cache
+        self.version = version
+        self.mode = mode or os.environ.get("CACHE_WATCH_MODE", "auto")
+        self.poll_interval = poll_interval or float(
+            os.environ.get("CACHE_WATCH_POLL_SECONDS", 1)
+        )
+        self.logger = Logger()
+        self._stop = threading.Event()
+        self._thread = None
+        self._events_ready = False
+
+    def start(self):
+        """Function that starts the watcher thread of this worker
+
+        The server is probed from the thread, so starting a worker never waits
+        on MongoDB.
+        """
+
+        if self.mode == "off" or (self._thread and self._thread.is_alive()):
+            return
+
+        # Local writes are published from the start, before the thread knows
+        # which strategy the server supports, so none of them is lost
+        if (
+            self.mode != "change_stream"
+            and self.publish not in self.cache.on_invalidate
+        ):
+            self.cache.on_invalidate.append(self.publish)
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"{self.collection_name}-cache-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Function that stops the watcher thread"""
+
+        self._stop.set()
+        if self.publish in self.cache.on_invalidate:
+            self.cache.on_invalidate.remove(self.publish)
+
+    def publish(self, doc_id):
+        """Function that tells the other workers a document changed"""
+
+        try:
+            # Inserting first would create the events collection uncapped
+            if not self._events_ready:
+                self._ensure_events_collection()
+            self.db_conn.db[EVENTS_COLLECTION].insert_one(
+                {"collection": self.collection_name, "doc_id": doc_id}
+            )
+        except PyMongoError as e:
+            self.logger.warning(f"Could not publish cache event: {e}")
+
+    def _run(self):
+        """Function that picks the eviction strategy the server supports and runs it"""
+
+        wants_change_streams = self.mode in ("auto", "change_stream")
+        change_streams = None
+        while change_streams is None:
+            if self._stop.is_set():
+                return
+            try:
+                change_streams = (
+                    wants_change_streams and self._supports_change_streams()
+                )
+            except PyMongoError as e:
+                self.logger.warning(f"Cache watcher waiting for MongoDB: {e}")
+                self._stop.wait(self.poll_interval)
+
+        if change_streams:
+            # The change stream reports the writes of every worker
+            if self.publish in self.cache.on_invalidate:
+                self.cache.on_invalidate.remove(self.publish)
+            target = self._watch_change_stream
+        elif self.mode == "change_stream":
+            self.logger.critical(
+                "Change streams require MongoDB to run as a replica set"
+            )
+            return
+        else:
+            self._ensure_events_collection()
+            target = self._tail_events
+
+        self.logger.info(
+            f"Cache watcher for {self.collection_name} started ({target.__name__})"
+        )
+        target()
+
+    def _supports_change_streams(self):
+        """Function that checks whether the server accepts change streams"""
+
+        try:
+            with self.db_conn.db[self.collection_name].watch(max_await_time_ms=1):
+                return True
+        except OperationFailure:
+            return False
+
+    def _ensure_events_collection(self):
+        """Function that creates the capped events collection if it is missing"""
+
+        try:
+            self.db_conn.db.create_collection(
+                EVENTS_COLLECTION, capped=True, size=EVENTS_COLLECTION_BYTES
+            )
+        except (CollectionInvalid, OperationFailure):
+            pass
+        self._events_ready = True
+
+    def _evict(self, doc_id):
+        self.cache.invalidate(doc_id, propagate=False)
+        if self.version is not None:
+            self.version.mark_stale()
+
+    def _evict_all(self):
+        self.cache.clear()
+        if self.version is not None:
+            self.version.mark_stale()
+
+    def _watch_change_stream(self):
+        """Function that evicts entries from the collection change stream"""
+
+        resume_token = None
+        while not self._stop.is_set():
+            try:
+                with self.db_conn.db[self.collection_name].watch(
+                    resume_after=resume_token, max_await_time_ms=1000
+                ) as stream:
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        resume_token = stream.resume_token
+                        if "documentKey" in change:
+                            self._evict(change["documentKey"]["_id"])
+                        else:
+                            # drop, rename or invalidate events
+                            self._evict_all()
+            except Exception as e:
+                self.logger.warning(f"Change stream interrupted: {e}")
+                # Events may have been missed while the stream was down
+                self._evict_all()
+                resume_token = None
+                self._stop.wait(self.poll_interval)
+
+    def _tail_events(self):
+        """Function that evicts entries from the capped events collection
+
+        Event ids are ObjectIds made by every worker, so they are not ordered
+        across workers and cannot be resumed from with $gt. The cursor reads
+        in $natural order, the insertion order the server keeps for capped
+        collections, and a reopened cursor skips the events up to the last one
+        it saw.
+        """
+
+        events = self.db_conn.db[EVENTS_COLLECTION]
+        last_event = events.find_one(sort=[("$natural", -1)])
+        last_id = last_event["_id"] if last_event else None
+
+        while not self._stop.is_set():
+            try:
+                if last_id is not None and events.find_one({"_id": last_id}) is None:
+                    # The events after the last one seen may have rolled out
+                    # of the capped collection
+                    self._evict_all()
+                    last_event = events.find_one(sort=[("$natural", -1)])
+                    last_id = last_event["_id"] if last_event else None
+
+                cursor = events.find(
+                    cursor_type=CursorType.TAILABLE_AWAIT, sort=[("$natural", 1)]
+                ).max_await_time_ms(1000)
+                caught_up = last_id is None
+                while not self._stop.is_set() and cursor.alive:
+                    for event in cursor:
+                        if not caught_up:
+                            caught_up = event["_id"] == last_id
+                            continue
+                        last_id = event["_id"]
+                        if event["collection"] == self.collection_name:
+                            self._evict(event["doc_id"])
+                    time.sleep(0.01)
+            except Exception as e:
+                self.logger.warning(f"Cache event tailing interrupted: {e}")
+                self._evict_all()
+
+            # Tailable cursors on an empty collection die immediately
+            self._stop.wait(self.poll_interval)
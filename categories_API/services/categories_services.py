@@ -1,5 +1,12 @@
 from flask import jsonify
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 from logger.logger_categories import Logger
+from models.change_log import ChangeLog
+from models.collection_version import CollectionVersion, utc_timestamp
+from models.id_allocator import IdAllocator
+from services.bulk_writes import bulk_delete, bulk_update
+from services.read_cache import ReadCache
 
 
 class CategoryService:
@@ -8,12 +15,31 @@ class CategoryService:
     def __init__(self, db_conn):
         self.logger = Logger()
         self.db_conn = db_conn
+        self.id_allocator = IdAllocator(db_conn)
+        self.cache = ReadCache()
+        self.version = CollectionVersion(db_conn, "categories")
+        self.changes = ChangeLog(db_conn, "categories")
 
-    def get_all_categories(self):
-        """Function to fetch all categories from the database"""
+    def get_all_categories(self, after=None, limit=None, fields=None):
+        """Function to fetch all categories from the database, one page at a time when a limit is given"""
+
+        # The version is read before the query and is part of the key, so a result
+        # read before a write is never served under the version of that write
+        version = self.get_version()
+        key = ("all", after, limit, tuple(fields) if fields else None, version)
+        hit, categories = self.cache.get(key)
+        if hit:
+            return categories
 
         try:
-            categories = list(self.db_conn.db.categories.find())
+            query = {"_id": {"$gt": after}} if after is not None else {}
+            projection = {field: 1 for field in fields} if fields else None
+            cursor = self.db_conn.db.categories.find(query, projection)
+            if limit is not None:
+                cursor = cursor.sort("_id", 1).limit(limit)
+            categories = list(cursor)
+            if version is not None:
+                self.cache.set(key, categories)
             return categories
         except Exception as e:
             self.logger.error(f"Error fetching all categories from database: {e}")
@@ -22,11 +48,22 @@ class CategoryService:
                 500,
             )
 
-    def get_categories_by_id(self, categories_id):
+    def get_categories_by_id(self, categories_id, fields=None):
         """Function to fetch a categories by its id"""
 
+        version = self.get_version()
+        key = ("id", categories_id, tuple(fields) if fields else None, version)
+        hit, categories = self.cache.get(key)
+        if hit:
+            return categories
+
         try:
-            categories = self.db_conn.db.categories.find_one({"_id": categories_id})
+            projection = {field: 1 for field in fields} if fields else None
+            categories = self.db_conn.db.categories.find_one(
+                {"_id": categories_id}, projection
+            )
+            if categories and version is not None:
+                self.cache.set(key, categories)
             return categories
         except Exception as e:
             self.logger.error(f"Error fetching categories by id from database: {e}")
@@ -37,39 +74,97 @@ class CategoryService:
                 500,
             )
 
+    def get_categories_by_ids(self, category_ids, fields=None):
+        """Function to fetch many categories by id with a single $in query
+
+        The categories come back in no particular order and ids that do not
+        exist are simply absent.
+        """
+
+        version = self.get_version()
+        key = (
+            "all",
+            "ids",
+            tuple(category_ids),
+            tuple(fields) if fields else None,
+            version,
+        )
+        hit, categories = self.cache.get(key)
+        if hit:
+            return categories
+
+        try:
+            projection = {field: 1 for field in fields} if fields else None
+            categories = list(
+                self.db_conn.db.categories.find(
+                    {"_id": {"$in": category_ids}}, projection
+                )
+            )
+            if version is not None:
+                self.cache.set(key, categories)
+            return categories
+        except Exception as e:
+            self.logger.error(f"Error fetching categories by ids from database: {e}")
+            raise
+
     def add_category(self, new_category):
         """Function to add a category to the database"""
 
         try:
-            # Gets the highest id
-            if self.db_conn.db.categories.count_documents({}) == 0:
-                new_category["_id"] = 1
-            else:
-                max_id = self.db_conn.db.categories.find_one(sort=[("_id", -1)])["_id"]
-                next_id = max_id + 1
-                new_category["_id"] = next_id
+            new_category["_id"] = self.id_allocator.next_id("categories")
+            new_category["updated_at"] = utc_timestamp()
 
             self.db_conn.db.categories.insert_one(new_category)
+            self._after_write(upserted=[new_category["_id"]])
             return new_category
         except Exception as e:
             self.logger.error(f"Error adding category to database: {e}")
             return jsonify({"error": f"Error adding category to database: {e}"}), 500
 
+    def add_categories(self, new_categories):
+        """Function to add many categories with a contiguous id range and one insert_many
+
+        Returns the categories and a dict of insert errors keyed by their position.
+        """
+
+        ids = self.id_allocator.next_ids("categories", len(new_categories))
+        updated_at = utc_timestamp()
+        for new_category, category_id in zip(new_categories, ids):
+            new_category["_id"] = category_id
+            new_category["updated_at"] = updated_at
+
+        failed = {}
+        try:
+            self.db_conn.db.categories.insert_many(new_categories, ordered=False)
+        except BulkWriteError as e:
+            failed = {
+                error["index"]: error["errmsg"] for error in e.details["writeErrors"]
+            }
+            self.logger.error(f"Error adding {len(failed)} categories in bulk")
+
+        if len(failed) < len(new_categories):
+            self._after_write(
+                upserted=[
+                    category["_id"]
+                    for index, category in enumerate(new_categories)
+                    if index not in failed
+                ]
+            )
+        return new_categories, failed
+
     def update_category(self, category_id, categories):
         """Function that updatse a category in the database by its id"""
 
         try:
-            update_category = self.get_categories_by_id(category_id)
-            if update_category:
-                updated_category = self.db_conn.db.categories.update_one(
-                    {"_id": category_id}, {"$set": categories}
-                )
-                if updated_category.modified_count > 0:
-                    return update_category
-                else:
-                    return "The categories is already up to date"
-            else:
-                return None
+            categories["updated_at"] = utc_timestamp()
+            updated_category = self.db_conn.db.categories.find_one_and_update(
+                {"_id": category_id},
+                {"$set": categories},
+                return_document=ReturnDocument.AFTER,
+            )
+            if updated_category:
+                self._after_write(upserted=[category_id])
+            return updated_category
 
         except Exception as e:
             self.logger.error(f"Error updating the category in database: {e}")
@@ -78,16 +173,39 @@ class CategoryService:
                 500,
             )
 
+    def update_categories(self, patches):
+        """Function to update many categories with one read and one unordered bulk_write
+
+        Returns the per-id results and the matched, modified and missing counts.
+        """
+
+        try:
+            results, summary, _ = bulk_update(
+                self.db_conn.db.categories, patches, utc_timestamp()
+            )
+            if summary["modified"]:
+                self._after_write(
+                    upserted=[
+                        result["_id"]
+                        for result in results
+                        if result["status"] == "updated"
+                    ]
+                )
+            return results, summary
+        except Exception as e:
+            self.logger.error(f"Error updating categories in bulk: {e}")
+            raise
+
     def delete_category(self, category_id):
         """Function to delete a categories from the database by its id"""
 
         try:
-            deleted_category = self.get_categories_by_id(category_id)
+            deleted_category = self.db_conn.db.categories.find_one_and_delete(
+                {"_id": category_id}
+            )
             if deleted_category:
-                self.db_conn.db.categories.delete_one({"_id": category_id})
-                return deleted_category
-            else:
-                return None
+                self._after_write(deleted=[category_id])
+            return deleted_category
 
         except Exception as e:
             self.logger.error(f"Error deleting the category from database: {e}")
@@ -95,3 +213,88 @@ class CategoryService:
                 jsonify({"error": f"Error deleting the category from database: {e}"}),
                 500,
             )
+
+    def delete_categories(self, category_ids):
+        """Function to delete many categories with one read and one unordered bulk_write
+
+        Returns the per-id results and the deleted and missing counts.
+        """
+
+        try:
+            results, summary, deleted = bulk_delete(
+                self.db_conn.db.categories, category_ids
+            )
+            if summary["deleted"]:
+                self._after_write(deleted=list(deleted))
+            return results, summary
+        except Exception as e:
+            self.logger.error(f"Error deleting categories in bulk: {e}")
+            raise
+
+    def _after_write(self, upserted=(), deleted=()):
+        """Function that bumps the categories version, logs the change and drops stale cache entries"""
+
+        version = self.version.bump()
+        self.changes.record(version, upserted, deleted)
+
+        doc_ids = [*upserted, *deleted]
+        self.cache.invalidate(doc_ids[0] if len(doc_ids) == 1 else None)
+
+    def get_changes(self, since):
+        """Function that returns the categories written and deleted after a version
+
+        Returns None when the change log no longer reaches back to that version.
+        """
+
+        try:
+            found = self.changes.since(since, self.version.current())
+            if found is None:
+                return None
+
+            operations, version, has_more = found
+            upserted = [doc_id for doc_id, op in operations.items() if op == "upsert"]
+            changed = []
+            if upserted:
+                cursor = self.db_conn.db.categories.find({"_id": {"$in": upserted}})
+                changed = list(cursor.sort("_id", 1))
+            present = {doc["_id"] for doc in changed}
+
+            return {
+                "since": since,
+                "version": version,
+                "has_more": has_more,
+                "changed": changed,
+                # Tombstones, including documents deleted after being written
+                "deleted": [doc_id for doc_id in operations if doc_id not in present],
+            }
+        except Exception as e:
+            self.logger.error(f"Error fetching categories changes from database: {e}")
+            raise
+
+    def get_version(self):
+        """Function that returns the categories version, or None when it cannot be read"""
+
+        try:
+            return self.version.current()
+        except Exception as e:
+            self.logger.error(f"Error reading the categories version: {e}")
+            return None
+
+    def get_cache_stats(self):
+        """Function that returns the read cache counters of this worker"""
+
+        return self.cache.stats()
+
+    def get_version_info(self):
+        """Function that returns the categories version and the time of the last write"""
+
+        try:
+            return self.version.snapshot()
+        except Exception as e:
+            self.logger.error(f"Error reading the categories version: {e}")
+            raise
+
+    def get_pool_stats(self):
+        """Function that returns the connection pool counters of this worker"""
+
+        return self.db_conn.pool_metrics.stats()
@@ -0,0 +1,232 @@
+"""Serves the routes of the six services from a single Flask app
+
+Every service keeps its own directory, image and port; this app imports their
+blueprints and services instead and runs them in one process that shares a
+single MongoDB client. Small deployments need one container and one set of
+gunicorn workers instead of six:
+
+    docker compose --profile composite up -d composite_api
+"""
+
+import re
+from flask import Flask, jsonify
+from flask_cors import CORS
+from flasgger import Swagger
+from logger.logger_composite import Logger
+from service_loader import load_service
+
+# Healthchecks of the services, answered by the composite one instead
+SHADOWED_RULES = {"/healthcheck"}
+
+
+def create_app():
+    """Function that builds the app with the blueprints of the six services"""
+
+    logger = Logger()
+
+    (
+        OrjsonProvider,
+        Compression,
+        ProductModel,
+        ProductService,
+        StorefrontService,
+        ProductSchema,
+        ProductRoute,
+        StorefrontRoute,
+        ProductCacheWatcher,
+    ) = load_service(
+        "products_API",
+        "routes.json_provider:OrjsonProvider",
+        "routes.compression:Compression",
+        "models.products_model:ProductModel",
+        "services.products_services:ProductService",
+        "services.storefront_services:StorefrontService",
+        "schemas.products_schemas:ProductSchema",
+        "routes.products_routes:ProductRoute",
+        "routes.storefront_routes:StorefrontRoute",
+        "services.cache_watcher:CacheWatcher",
+    )
+    (
+        CategoryModel,
+        CategoryService,
+        CategorySchema,
+        CategoryRoute,
+        CategoryCacheWatcher,
+    ) = load_service(
+        "categories_API",
+        "models.categories_models:CategoryModel",
+        "services.categories_services:CategoryService",
+        "schemas.categories_schemas:CategorySchema",
+        "routes.categories_routes:CategoryRoute",
+        "services.cache_watcher:CacheWatcher",
+    )
+    (
+        ReviewModel,
+        ReviewService,
+        ReviewSchema,
+        ReviewRoute,
+        ReviewCacheWatcher,
+    ) = load_service(
+        "reviews_API",
+        "models.reviews_model:ReviewModel",
+        "services.reviews_services:ReviewService",
+        "schemas.reviews_schemas:ReviewSchema",
+        "routes.reviews_routes:ReviewRoute",
+        "services.cache_watcher:CacheWatcher",
+    )
+    OrdersModel, OrdersService, OrdersSchema, OrdersRoute = load_service(
+        "orders_APi",
+        "models.models_orders:OrdersModel",
+        "service.services_orders:OrdersService",
+        "schemas.schemas_orders:OrdersSchema",
+        "routes.routes_orders:OrdersRoute",
+    )
+    PaymentModel, PaymentService, PaymentSchema, PaymentRoute = load_service(
+        "payments_API",
+        "models.payment_model:PaymentModel",
+        "services.payment_service:PaymentService",
+        "schemas.payment_schema:PaymentSchema",
+        "routes.payment_route:PaymentRoute",
+    )
+    UserModel, UserService, UserSchema, UserRoute = load_service(
+        "users_API",
+        "models.users_model:UserModel",
+        "services.users_services:UserService",
+        "schemas.users_schemas:UserSchema",
+        "routes.users_routes:UserRoute",
+    )
+
+    # One model, and so one client and pool per worker, ensures the indexes of
+    # every collection
+    db_conn = ProductModel()
+    db_conn.INDEXES = {}
+    for model in (
+        ProductModel,
+        CategoryModel,
+        ReviewModel,
+        OrdersModel,
+        PaymentModel,
+        UserModel,
+    ):
+        db_conn.INDEXES.update(model.INDEXES)
+
+    # Services
+    product_service = ProductService(db_conn)
+    storefront_service = StorefrontService(db_conn, product_service)
+    category_service = CategoryService(db_conn)
+    review_service = ReviewService(db_conn)
+    orders_service = OrdersService(db_conn)
+    payment_service = PaymentService(db_conn)
+    user_service = UserService(db_conn)
+
+    # Evict cached documents written by the other workers
+    cache_watchers = [
+        ProductCacheWatcher(
+            db_conn, "products", product_service.cache, version=product_service.version
+        ),
+        CategoryCacheWatcher(
+            db_conn,
+            "categories",
+            category_service.cache,
+            version=category_service.version,
+        ),
+        ReviewCacheWatcher(
+            db_conn, "reviews", review_service.cache, version=review_service.version
+        ),
+    ]
+
+    # Routes
+    blueprints = [
+        ProductRoute(product_service, ProductSchema()),
+        StorefrontRoute(storefront_service),
+        CategoryRoute(category_service, CategorySchema()),
+        ReviewRoute(review_service, ReviewSchema()),
+        OrdersRoute(orders_service, OrdersSchema()),
+        PaymentRoute(payment_service, PaymentSchema()),
+        UserRoute(user_service, UserSchema()),
+    ]
+
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    CORS(app)
+    Compression(app)
+    Swagger(app)
+
+    # Registered before the blueprints, so it answers /healthcheck for all of them
+    app.add_url_rule("/healthcheck", "healthcheck", healthcheck)
+    for blueprint in blueprints:
+        app.register_blueprint(blueprint)
+
+    collisions = route_collisions(app)
+    if collisions:
+        logger.critical(f"Routes registered by more than one service: {collisions}")
+        raise RuntimeError(f"Routes registered by more than one service: {collisions}")
+
+    app.extensions["composite"] = {
+        "db_conn": db_conn,
+        "cache_watchers": cache_watchers,
+        "storefront_service": storefront_service,
+    }
+    logger.info(
+        f"Composite app serving {', '.join(blueprint.name for blueprint in blueprints)}"
+    )
+    return app
+
+
+def route_collisions(app):
+    """Function that lists the rules two endpoints registered for the same method
+
+    Variable names are ignored, /orders/<int:id> and /orders/<int:order_id>
+    collide. Rules in SHADOWED_RULES are expected to collide.
+    """
+
+    endpoints = {}
+    for rule in app.url_map.iter_rules():
+        if rule.rule in SHADOWED_RULES:
+            continue
+        shape = re.sub(r"<(?:([^:<>]+):)?[^<>]+>", r"<\1>", rule.rule)
+        for method in rule.methods - {"HEAD", "OPTIONS"}:
+            endpoints.setdefault((method, shape), []).append(rule.endpoint)
+
+    return {
+        f"{method} {shape}": names
+        for (method, shape), names in endpoints.items()
+        if len(names) > 1
+    }
+
+
+def healthcheck():
+    """Function to check the health of the API in the docker container"""
+
+    return jsonify({"status": "Up"}), 200
+
+
+app = create_app()
+
+
+def init_worker():
+    """Function that starts the background threads of a worker process
+
+    Called from the gunicorn post_fork hook, so it also runs with --preload.
+    """
+
+    for cache_watcher in app.extensions["composite"]["cache_watchers"]:
+        cache_watcher.start()
+
+
+def close_worker():
+    """Function that stops the threads and closes the client of a worker process"""
+
+    composite = app.extensions["composite"]
+    for cache_watcher in composite["cache_watchers"]:
+        cache_watcher.stop()
+    composite["storefront_service"].close()
+    composite["db_conn"].close_connection()
+
+
+if __name__ == "__main__":
+    try:
+        init_worker()
+        app.run(debug=True)
+    finally:
+        close_worker()
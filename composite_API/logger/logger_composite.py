@@ -0,0 +1,30 @@
+import logging as log
+from logger.log_pipeline import configure_logging
+
+
+class Logger:
+    """Logger class to log messages with different severity levels"""
+
+    def __init__(self, log_file="atemporal_composite_api.log", level=log.INFO):
+        configure_logging(log_file, level, datefmt="%I:%M:%S %p")
+        self.logger = log.getLogger()
+
+    def debug(self, message):
+        """Log a message with severity 'DEBUG' on the logger"""
+        self.logger.debug(message, stacklevel=2)
+
+    def info(self, message):
+        """Log a message with severity 'INFO' on the logger"""
+        self.logger.info(message, stacklevel=2)
+
+    def warning(self, message):
+        """Log a message with severity 'WARNING' on the logger"""
+        self.logger.warning(message, stacklevel=2)
+
+    def error(self, message):
+        """Log a message with severity 'ERROR' on the logger"""
+        self.logger.error(message, stacklevel=2)
+
+    def critical(self, message):
+        """Log a message with severity 'CRITICAL' on the logger"""
+        self.logger.critical(message, stacklevel=2)
@@ -0,0 +1,49 @@
+import importlib
+import os
+import sys
+
+# Folder holding the directories of the six services
+SERVICES_ROOT = os.environ.get(
+    "COMPOSITE_SERVICES_ROOT",
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+)
+
+# Top level packages every service defines with the same name
+SERVICE_PACKAGES = {"logger", "models", "routes", "schemas", "service", "services"}
+
+
+def _service_modules():
+    return {
+        name: module
+        for name, module in sys.modules.items()
+        if name.split(".")[0] in SERVICE_PACKAGES
+    }
+
+
+def load_service(directory, *targets):
+    """Function that imports classes and functions from one service directory
+
+    Every service imports its own modules as routes.*, services.*, models.*
+    and so on, so two services cannot share sys.modules. The modules of the
+    service are imported from a clean slate and taken out of sys.modules
+    again afterwards; the objects returned keep them alive. Targets are given
+    as "module.path:attribute" and returned in the same order.
+    """
+
+    saved = _service_modules()
+    for name in saved:
+        del sys.modules[name]
+
+    path = os.path.join(SERVICES_ROOT, directory)
+    sys.path.insert(0, path)
+    try:
+        loaded = []
+        for target in targets:
+            module_name, attribute = target.split(":")
+            loaded.append(getattr(importlib.import_module(module_name), attribute))
+        return loaded
+    finally:
+        sys.path.remove(path)
+        for name in _service_modules():
+            del sys.modules[name]
+        sys.modules.update(saved)
@@ -6,24 +6,32 @@ from models.models_orders import OrdersModel
 from service.services_orders import OrdersService
 from schemas.schemas_orders import OrdersSchema
 from routes.routes_orders import OrdersRoute
+from routes.compression import Compression
+from routes.json_provider import OrjsonProvider
 
 from flasgger import Swagger
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
+Compression(app)
 
 swagger = Swagger(app)  # Init Swagger
 
 db_conn = OrdersModel()
-db_conn.connect_to_database()
 orders_service = OrdersService(db_conn)
 orders_schema = OrdersSchema()
 orders_routes = OrdersRoute(orders_service, orders_schema)
 
 app.register_blueprint(orders_routes)
 
+
+def close_worker():
+    db_conn.close_connection()
+
+
 if __name__ == "__main__":
     try:
         app.run(debug=True)
     finally:
-        db_conn.close_connection()
+        close_worker()
@@ -0,0 +1,102 @@
+import math
+import os
+import threading
+from bson import Decimal128
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from logger.logger_orders import Logger
+
+
+class IdAllocator:
+    """Class that hands out sequential integer ids backed by the counters collection
+
+    Every worker leases a block of ids with a single atomic $inc on the counter
+    document of a collection and serves the following inserts from memory, so
+    concurrent workers never compete for the same id.
+    """
+
+    def __init__(self, db_conn, block_size=None):
+        self.db_conn = db_conn
+        self.block_size = block_size or int(os.environ.get("ID_BLOCK_SIZE", 100))
+        self.logger = Logger()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._blocks = {}
+        self._seeded = set()
+
+    def next_id(self, collection_name):
+        """Function that returns the next free id for a collection"""
+
+        with self._lock:
+            self._reset_after_fork()
+
+            block = self._blocks.get(collection_name)
+            if block is None or block[0] > block[1]:
+                block = self._lease_block(collection_name, self.block_size)
+                self._blocks[collection_name] = block
+
+            next_id = block[0]
+            block[0] += 1
+            return next_id
+
+    def next_ids(self, collection_name, count):
+        """Function that reserves `count` consecutive ids, e.g. for bulk inserts"""
+
+        if count < 1:
+            return []
+
+        with self._lock:
+            first_id, last_id = self._lease_block(collection_name, count)
+            return list(range(first_id, last_id + 1))
+
+    def _lease_block(self, collection_name, size):
+        """Function that reserves `size` consecutive ids with one round trip"""
+
+        self._seed_counter(collection_name)
+
+        counter = self.db_conn.db.counters.find_one_and_update(
+            {"_id": collection_name},
+            {"$inc": {"seq": size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        last_id = counter["seq"]
+        return [last_id - size + 1, last_id]
+
+    def _seed_counter(self, collection_name):
+        """Function that makes sure the counter starts after the highest existing id"""
+
+        if collection_name in self._seeded:
+            return
+
+        # Strings and ObjectIds sort above numbers, so only numeric ids are looked at
+        max_doc = self.db_conn.db[collection_name].find_one(
+            {"_id": {"$type": "number"}}, sort=[("_id", -1)], projection={"_id": 1}
+        )
+        max_id = 0
+        if max_doc:
+            max_id = max_doc["_id"]
+            if isinstance(max_id, Decimal128):
+                max_id = max_id.to_decimal()
+            max_id = math.ceil(max_id)
+
+        try:
+            # $max only moves the counter forward, so concurrent seeds are harmless
+            self.db_conn.db.counters.update_one(
+                {"_id": collection_name}, {"$max": {"seq": max_id}}, upsert=True
+            )
+        except DuplicateKeyError:
+            # Another worker created the counter document first, try again
+            self.db_conn.db.counters.update_one(
+                {"_id": collection_name}, {"$max": {"seq": max_id}}
+            )
+
+        self._seeded.add(collection_name)
+
+    def _reset_after_fork(self):
+        """Function that drops leased blocks inherited from a parent process"""
+
+        pid = os.getpid()
+        if self._pid != pid:
+            self._pid = pid
+            self._blocks = {}
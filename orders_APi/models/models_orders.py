@@ -1,13 +1,46 @@
 import os
+import threading
 from logger.logger_orders import Logger
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from models.indexes import ensure_indexes
+from models.mongo_client import PoolMetrics, create_client
 
 
 class OrdersModel:
+    # Indexes ensured on every connection, by collection
+    INDEXES = {
+        "orders": [
+            IndexModel([("customer_email", ASCENDING)], name="customer_email_1"),
+            IndexModel([("created_at", DESCENDING)], name="created_at_-1"),
+        ],
+    }
+
     def __init__(self):
-        self.client = None
-        self.db = None
+        self._client = None
+        self._db = None
+        self._pid = None
+        self._lock = threading.Lock()
         self.logger = Logger()
+        self.index_report = None
+        self.pool_metrics = PoolMetrics()
+
+    @property
+    def client(self):
+        self._connect_if_needed()
+        return self._client
+
+    @property
+    def db(self):
+        self._connect_if_needed()
+        return self._db
+
+    def _connect_if_needed(self):
+        # A client must not cross fork(), so every worker process builds its own
+        # on first use instead of inheriting the one of the gunicorn master
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self.connect_to_database()
 
     """ENVIROMENT VARIABLES"""
 
@@ -24,27 +57,26 @@ class OrdersModel:
 
         """CONECTION TO DATABASE"""
         try:
-            self.client = MongoClient(
-                host=mongodb_host,
-                port=27017,
-                username=mongodb_user,
-                password=mongodb_pass,
-                authSource="admin",
-                authMechanism="SCRAM-SHA-256",
-                serverSelectionTimeoutMS=5000,
+            self.pool_metrics = PoolMetrics()
+            self._client = create_client(
+                mongodb_host, mongodb_user, mongodb_pass, self.pool_metrics
             )
-            self.db = self.client["project"]
+            self._db = self._client["project"]
+            self._pid = os.getpid()
+            self.logger.info(f"MongoDB client created for process {self._pid}")
 
-            if self.db.list_collection_names():
-                self.logger.info("Connected to MongoDB successfully")
+            self.index_report = ensure_indexes(self._db, self.INDEXES, self.logger)
 
         except Exception as e:
             self.logger.critical(f"Error connecting to MongoDB: {e}")
             raise
 
     def close_connection(self):
-        if self.client:
-            self.client.close()
+        if self._client:
+            self._client.close()
+            self._client = None
+            self._db = None
+            self._pid = None
             self.logger.info("MongoDB connection closed")
 
 
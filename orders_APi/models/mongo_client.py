@@ -0,0 +1,137 @@
+import os
+import threading
+from collections import deque
+from pymongo import MongoClient
+from pymongo.monitoring import ConnectionPoolListener
+
+# Connection pool settings read from the environment, with the MongoClient
+# option each one maps to. Every gunicorn worker owns its own pool, so the
+# server sees up to workers x services x MONGODB_MAX_POOL_SIZE connections.
+POOL_OPTIONS = {
+    "MONGODB_MAX_POOL_SIZE": ("maxPoolSize", int, 10),
+    "MONGODB_MIN_POOL_SIZE": ("minPoolSize", int, 0),
+    "MONGODB_MAX_IDLE_TIME_MS": ("maxIdleTimeMS", int, 60000),
+    "MONGODB_WAIT_QUEUE_TIMEOUT_MS": ("waitQueueTimeoutMS", int, 5000),
+    "MONGODB_COMPRESSORS": ("compressors", str, "zstd"),
+    "MONGODB_READ_PREFERENCE": ("readPreference", str, "primary"),
+}
+
+
+def client_options():
+    """Function that reads the connection pool settings from the environment"""
+
+    options = {}
+    for variable, (option, cast, default) in POOL_OPTIONS.items():
+        value = os.environ.get(variable, default)
+        if value in (None, ""):
+            continue
+        try:
+            options[option] = cast(value)
+        except ValueError:
+            raise ValueError(f"{variable} must be an integer, got {value!r}")
+
+    return options
+
+
+def create_client(host, username, password, pool_metrics=None):
+    """Function that builds a service MongoClient with the configured pool"""
+
+    return MongoClient(
+        host=host,
+        port=27017,
+        username=username,
+        password=password,
+        authSource="admin",
+        authMechanism="SCRAM-SHA-256",
+        serverSelectionTimeoutMS=5000,
+        event_listeners=[pool_metrics] if pool_metrics else [],
+        **client_options(),
+    )
+
+
+class PoolMetrics(ConnectionPoolListener):
+    """Class that records how long requests wait to check a connection out of the pool
+
+    Waits that grow while the pool is at maxPoolSize mean the worker needs a
+    bigger pool, or more workers are competing for too few connections.
+    """
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=window)
+        self.checkouts = 0
+        self.failed_checkouts = 0
+        self.in_use = 0
+        self.open_connections = 0
+        self.max_wait_ms = 0.0
+        self.total_wait_ms = 0.0
+
+    def connection_checked_out(self, event):
+        wait_ms = event.duration * 1000
+        with self._lock:
+            self._waits.append(wait_ms)
+            self.checkouts += 1
+            self.in_use += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.failed_checkouts += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def stats(self):
+        """Function that returns the checkout counters and wait percentiles in ms"""
+
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                "max_pool_size": client_options().get("maxPoolSize"),
+                "open_connections": self.open_connections,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "failed_checkouts": self.failed_checkouts,
+                "wait_ms": {
+                    "avg": (
+                        round(self.total_wait_ms / self.checkouts, 3)
+                        if self.checkouts
+                        else 0.0
+                    ),
+                    "p50": round(waits[len(waits) // 2], 3) if waits else 0.0,
+                    "p95": (
+                        round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3)
+                        if waits
+                        else 0.0
+                    ),
+                    "max": round(self.max_wait_ms, 3),
+                },
+            }
@@ -2,6 +2,27 @@ from flask import Blueprint, jsonify, request
 from marshmallow import ValidationError
 from logger.logger_orders import Logger
 from flasgger import swag_from
+from routes.query_params import (
+    FIELDS_PARAMETER,
+    IDS_PARAMETER,
+    PAGINATION_PARAMETERS,
+    bulk_response,
+    parse_bulk_ids,
+    parse_bulk_items,
+    parse_bulk_patch,
+    parse_fields,
+    parse_lookup_ids,
+    parse_pagination,
+    ordered_by_ids,
+    paginated,
+    schema_field_names,
+)
+from routes.streaming import (
+    EXPORT_PARAMETERS,
+    ndjson_response,
+    parse_batch_size,
+    wants_ndjson,
+)
 
 
 class OrdersRoute(Blueprint):
@@ -10,17 +31,34 @@ class OrdersRoute(Blueprint):
         self.logger = Logger()
         self.orders_service = orders_service
         self.orders_schema = orders_schema
+        self.projectable_fields = schema_field_names(orders_schema) | {"_id", "updated_at"}
         self.register_routes()
 
     """ROUTES"""
 
     def register_routes(self):
         self.route("/api/v1/orders", methods=["GET"])(self.get_orders)
+        self.route("/api/v1/orders/<int:order_id>", methods=["GET"])(
+            self.get_order
+        )
         self.route("/api/v1/orders", methods=["POST"])(self.add_order)
+        self.route("/api/v1/orders/lookup", methods=["POST"])(
+            self.get_orders_by_ids
+        )
         self.route("/api/v1/orders/<int:order_id>", methods=["PUT"])(self.update_order)
         self.route("/api/v1/orders/<int:order_id>", methods=["DELETE"])(
             self.delete_order
         )
+        self.route("/api/v1/orders/bulk", methods=["PATCH"])(
+            self.update_orders_bulk
+        )
+        self.route("/api/v1/orders/bulk", methods=["DELETE"])(
+            self.delete_orders_bulk
+        )
+        self.route("/api/v1/orders/version", methods=["GET"])(self.get_version)
+        self.route("/api/v1/orders/pool/stats", methods=["GET"])(
+            self.get_pool_stats
+        )
         self.route("/healthcheck", methods=["GET"])(self.healthcheck)
 
     """GET"""
@@ -30,6 +68,9 @@ class OrdersRoute(Blueprint):
             "tags": ["Orders"],
             "summary": "Get all orders",
             "description": "Retrieve a list of all orders stored in the database.",
+            "parameters": PAGINATION_PARAMETERS
+            + [IDS_PARAMETER, FIELDS_PARAMETER]
+            + EXPORT_PARAMETERS,
             "responses": {
                 200: {
                     "description": "A list of all orders",
@@ -74,18 +115,127 @@ class OrdersRoute(Blueprint):
         }
     )
     def get_orders(self):
+        if "ids" in request.args:
+            return self.get_orders_by_ids()
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        if wants_ndjson():
+            try:
+                batch_size = parse_batch_size()
+            except ValueError as e:
+                self.logger.error(f"Invalid export parameters: {e}")
+                return jsonify({"error": f"Invalid export parameters: {e}"}), 400
+
+            cursor = self.orders_service.stream_all_orders(batch_size, fields)
+            return ndjson_response(cursor, batch_size)
+
+        try:
+            after, limit = parse_pagination()
+        except ValueError as e:
+            self.logger.error(f"Invalid pagination parameters: {e}")
+            return jsonify({"error": f"Invalid pagination parameters: {e}"}), 400
+
         try:
-            orders = self.orders_service.get_all_orders()
-            return jsonify(orders), 200
+            orders = self.orders_service.get_all_orders(after, limit, fields)
+            if limit is None:
+                return jsonify(orders), 200
+            return jsonify(paginated(orders, limit)), 200
         except Exception as e:
             self.logger.error(f"Error fetching all orders: {e}")
             return jsonify({"error": f"Error fetching all orders: {e}"}), 500
 
+    """GET BY ID"""
+
+    @swag_from(
+        {
+            "tags": ["Orders"],
+            "parameters": [
+                {
+                    "name": "order_id",
+                    "in": "path",
+                    "required": True,
+                    "type": "integer",
+                },
+                FIELDS_PARAMETER,
+            ],
+            "responses": {
+                200: {"description": "Order fetched successfully"},
+                400: {"description": "Invalid fields parameter"},
+                404: {"description": "Order not found"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_order(self, order_id):
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        try:
+            order = self.orders_service.get_orders_by_id(order_id, fields)
+            if order:
+                return jsonify(order), 200
+            else:
+                self.logger.error("Order not found")
+                return jsonify({"error": "Order not found"}), 404
+
+        except Exception as e:
+            self.logger.error(f"Error fetching order: {e}")
+            return jsonify({"error": f"Error fetching order: {e}"}), 500
+
+    """GET BY IDS"""
+
+    @swag_from(
+        {
+            "tags": ["Orders"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {"type": "array", "items": {"type": "integer"}},
+                },
+                FIELDS_PARAMETER,
+            ],
+            "responses": {
+                200: {"description": "Orders in the requested order, missing ids"},
+                400: {"description": "Invalid ids or fields parameter"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_orders_by_ids(self):
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        try:
+            order_ids = parse_lookup_ids()
+        except ValueError as e:
+            self.logger.error(f"Invalid ids: {e}")
+            return jsonify({"error": f"Invalid ids: {e}"}), 400
+
+        try:
+            orders = self.orders_service.get_orders_by_ids(order_ids, fields)
+            return jsonify(ordered_by_ids(orders, order_ids)), 200
+        except Exception as e:
+            self.logger.error(f"Error fetching orders by ids: {e}")
+            return jsonify({"error": f"Error fetching orders by ids: {e}"}), 500
+
     """POST"""
 
     @swag_from(
         {
-            "tags": ["orders"],
+            "tags": ["Orders"],
             "parameters": [
                 {
                     "name": "body",
@@ -167,7 +317,7 @@ class OrdersRoute(Blueprint):
 
             validated_data = self.orders_schema.load(request_data)
             created_order = self.orders_service.add_order(validated_data)
-            self.logger.info(f"Order added: {created_order}")
+            self.logger.info(f"Order added: {created_order['_id']}")
             return jsonify(created_order), 201
 
         except ValidationError as e:
@@ -189,7 +339,7 @@ class OrdersRoute(Blueprint):
             validated_data = self.orders_schema.load(request_data)
             updated_order = self.orders_service.update_order(order_id, validated_data)
             if updated_order:
-                self.logger.info(f"Order updated: {updated_order}")
+                self.logger.info(f"Order updated: {order_id}")
                 return jsonify(updated_order), 200
             else:
                 return jsonify({"error": "Order not found"}), 404
@@ -207,7 +357,7 @@ class OrdersRoute(Blueprint):
         try:
             deleted_order = self.orders_service.delete_order(order_id)
             if deleted_order:
-                self.logger.info(f"Order deleted: {deleted_order}")
+                self.logger.info(f"Order deleted: {order_id}")
                 return jsonify(deleted_order), 200
             else:
                 return jsonify({"error": "Order not found"}), 404
@@ -216,5 +366,159 @@ class OrdersRoute(Blueprint):
             self.logger.error(f"Error deleting order: {e}")
             return jsonify({"error": f"Error deleting order: {e}"}), 500
 
+    def validate_order_patch(self, fields):
+        return self.orders_schema.load(fields, partial=True)
+
+    @swag_from(
+        {
+            "tags": ["Orders"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "_id": {"type": "integer"},
+                                "customer_email": {"type": "string"},
+                                "products": {"type": "array", "items": {"type": "object"}},
+                            },
+                            "required": ["_id"],
+                        },
+                    },
+                }
+            ],
+            "responses": {
+                200: {"description": "Every order was found, see the matched and modified counts"},
+                207: {"description": "Some orders were not updated, see the per-id results"},
+                400: {"description": "No order was updated"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def update_orders_bulk(self):
+        try:
+            items = parse_bulk_items()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"error": f"Invalid bulk data: {e}"}), 400
+
+        results = [None] * len(items)
+        patches = []
+        positions = []
+        seen = set()
+        for index, item in enumerate(items):
+            try:
+                order_id, fields = parse_bulk_patch(item)
+                if order_id in seen:
+                    raise ValueError(f"_id {order_id} appears more than once")
+                patches.append((order_id, self.validate_order_patch(fields)))
+                seen.add(order_id)
+                positions.append(index)
+            except (ValidationError, TypeError, ValueError) as e:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "error": f"Invalid data: {e}",
+                }
+
+        try:
+            summary = {"matched": 0, "modified": 0, "missing": 0}
+            if patches:
+                updated, summary = self.orders_service.update_orders(patches)
+                for index, result in zip(positions, updated):
+                    results[index] = {"index": index, **result}
+
+            body, code = bulk_response(results)
+            body.update(summary)
+            self.logger.info(
+                f"Bulk orders: {summary['modified']} modified, "
+                f"{summary['missing']} missing, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error updating orders in bulk: {e}")
+            return jsonify({"error": f"Error updating orders in bulk: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["Orders"],
+            "parameters": [
+                {
+                    "name": "ids",
+                    "in": "query",
+                    "required": False,
+                    "type": "string",
+                    "description": "Comma separated list of ids, e.g. 1,2,3",
+                },
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": False,
+                    "schema": {"type": "array", "items": {"type": "integer"}},
+                    "description": "JSON array of ids, used when ids is not given",
+                },
+            ],
+            "responses": {
+                200: {"description": "Every order was deleted"},
+                207: {"description": "Some orders were not found, see the per-id results"},
+                400: {"description": "No order was deleted"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def delete_orders_bulk(self):
+        try:
+            order_ids = parse_bulk_ids()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"error": f"Invalid bulk data: {e}"}), 400
+
+        try:
+            results, summary = self.orders_service.delete_orders(order_ids)
+
+            body, code = bulk_response(results)
+            body.update(summary)
+            self.logger.info(
+                f"Bulk orders: {summary['deleted']} deleted, "
+                f"{summary['missing']} missing, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error deleting orders in bulk: {e}")
+            return jsonify({"error": f"Error deleting orders in bulk: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["Orders"],
+            "responses": {
+                200: {"description": "Collection version and the time of the last write"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_version(self):
+        try:
+            return jsonify(self.orders_service.get_version_info()), 200
+        except Exception as e:
+            self.logger.error(f"Error reading the orders version: {e}")
+            return jsonify({"error": f"Error reading the orders version: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["Orders"],
+            "responses": {
+                200: {"description": "Checkouts, connections in use and checkout wait times"},
+            },
+        }
+    )
+    def get_pool_stats(self):
+        return jsonify(self.orders_service.get_pool_stats()), 200
+
     def healthcheck(self):
         return jsonify({"status": "Up"}), 200
@@ -1,5 +1,9 @@
 from flask import jsonify
+from pymongo import ReturnDocument
 from logger.logger_orders import Logger
+from models.collection_version import CollectionVersion, utc_timestamp
+from models.id_allocator import IdAllocator
+from service.bulk_writes import bulk_delete, bulk_update
 from datetime import datetime, timezone
 
 
@@ -7,12 +11,19 @@ class OrdersService:
     def __init__(self, db_conn):
         self.logger = Logger()
         self.db_conn = db_conn
+        self.id_allocator = IdAllocator(db_conn)
+        self.version = CollectionVersion(db_conn, "orders")
 
     """GET ALL"""
 
-    def get_all_orders(self):
+    def get_all_orders(self, after=None, limit=None, fields=None):
         try:
-            orders = list(self.db_conn.db.orders.find())
+            query = {"_id": {"$gt": after}} if after is not None else {}
+            projection = {field: 1 for field in fields} if fields else None
+            cursor = self.db_conn.db.orders.find(query, projection)
+            if limit is not None:
+                cursor = cursor.sort("_id", 1).limit(limit)
+            orders = list(cursor)
             return orders
         except Exception as e:
             self.logger.error(f"Error fetching all orders from database: {e}")
@@ -21,11 +32,18 @@ class OrdersService:
                 500,
             )
 
+    """STREAM"""
+
+    def stream_all_orders(self, batch_size, fields=None):
+        projection = {field: 1 for field in fields} if fields else None
+        return self.db_conn.db.orders.find(projection=projection).batch_size(batch_size)
+
     """GET SEARCH"""
 
-    def get_orders_by_id(self, orders_id):
+    def get_orders_by_id(self, orders_id, fields=None):
         try:
-            orders = self.db_conn.db.orders.find_one({"_id": orders_id})
+            projection = {field: 1 for field in fields} if fields else None
+            orders = self.db_conn.db.orders.find_one({"_id": orders_id}, projection)
             return orders
         except Exception as e:
             self.logger.error(f"Error fetching orders by id from database: {e}")
@@ -34,6 +52,16 @@ class OrdersService:
                 500,
             )
 
+    def get_orders_by_ids(self, orders_ids, fields=None):
+        try:
+            projection = {field: 1 for field in fields} if fields else None
+            return list(
+                self.db_conn.db.orders.find({"_id": {"$in": orders_ids}}, projection)
+            )
+        except Exception as e:
+            self.logger.error(f"Error fetching orders by ids from database: {e}")
+            raise
+
     """POST"""
 
     def add_order(self, new_order):
@@ -46,11 +74,11 @@ class OrdersService:
 
             new_order["created_at"] = datetime.now(timezone.utc).isoformat()
 
-            max_id = self.db_conn.db.orders.find_one(sort=[("_id", -1)])["_id"]
-            next_id = max_id + 1
-            new_order["_id"] = next_id
+            new_order["_id"] = self.id_allocator.next_id("orders")
+            new_order["updated_at"] = new_order["created_at"]
 
             self.db_conn.db.orders.insert_one(new_order)
+            self.version.bump()
             return new_order
         except Exception as e:
             self.logger.error(f"Error adding orders to database: {e}")
@@ -60,37 +88,83 @@ class OrdersService:
 
     def update_order(self, orders_id, orders):
         try:
-            update_orders = self.get_orders_by_id(orders_id)
-            if update_orders:
-                updated_orders = self.db_conn.db.orders.update_one(
-                    {"_id": orders_id}, {"$set": orders}
-                )
-                if updated_orders.modified_count > 0:
-                    return updated_orders
-                else:
-                    return "The orders is already up to date"
-            else:
-                return None
+            orders["updated_at"] = utc_timestamp()
+            updated_order = self.db_conn.db.orders.find_one_and_update(
+                {"_id": orders_id},
+                {"$set": orders},
+                return_document=ReturnDocument.AFTER,
+            )
+            if updated_order:
+                self.version.bump()
+            return updated_order
 
         except Exception as e:
             self.logger.error(f"Error updating orders in database: {e}")
             return jsonify({"error": f"Error updating orders in database: {e}"}), 500
 
+    def update_orders(self, patches):
+        """Function to update many orders with one read and one unordered bulk_write
+
+        Returns the per-id results and the matched, modified and missing counts.
+        """
+
+        try:
+            results, summary, _ = bulk_update(
+                self.db_conn.db.orders, patches, utc_timestamp()
+            )
+            if summary["modified"]:
+                self.version.bump()
+            return results, summary
+        except Exception as e:
+            self.logger.error(f"Error updating orders in bulk: {e}")
+            raise
+
     """PUT DELETE"""
 
     def delete_order(self, orders_id):
         try:
-            deleted_orders = self.get_orders_by_id(orders_id)
-            if deleted_orders:
-                self.db_conn.db.orders.delete_one({"_id": orders_id})
-                return deleted_orders
-            else:
-                return None
+            deleted_order = self.db_conn.db.orders.find_one_and_delete(
+                {"_id": orders_id}
+            )
+            if deleted_order:
+                self.version.bump()
+            return deleted_order
 
         except Exception as e:
             self.logger.error(f"Error deleting orders from database: {e}")
             return jsonify({"error": f"Error deleting orders from database: {e}"}), 500
 
+    def delete_orders(self, order_ids):
+        """Function to delete many orders with one read and one unordered bulk_write
+
+        Returns the per-id results and the deleted and missing counts.
+        """
+
+        try:
+            results, summary, _ = bulk_delete(self.db_conn.db.orders, order_ids)
+            if summary["deleted"]:
+                self.version.bump()
+            return results, summary
+        except Exception as e:
+            self.logger.error(f"Error deleting orders in bulk: {e}")
+            raise
+
+    """VERSION"""
+
+    def get_version_info(self):
+        """Function that returns the orders version and the time of the last write"""
+
+        try:
+            return self.version.snapshot()
+        except Exception as e:
+            self.logger.error(f"Error reading the orders version: {e}")
+            raise
+
+    def get_pool_stats(self):
+        """Function that returns the connection pool counters of this worker"""
+
+        return self.db_conn.pool_metrics.stats()
+
 
 """TEST"""
 if __name__ == "__main__":
@@ -3,16 +3,19 @@ from models.payment_model import PaymentModel
 from services.payment_service import PaymentService
 from schemas.payment_schema import PaymentSchema
 from routes.payment_route import PaymentRoute
+from routes.compression import Compression
+from routes.json_provider import OrjsonProvider
 from flask_cors import CORS
 from flasgger import Swagger
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
+Compression(app)
 
 swagger = Swagger(app)
 
 db_conn = PaymentModel()
-db_conn.connect_to_database()
 
 payment_service = PaymentService(db_conn)
 
@@ -22,8 +25,13 @@ payment_routes = PaymentRoute(payment_service, payment_schema)
 
 app.register_blueprint(payment_routes)
 
+
+def close_worker():
+    db_conn.close_connection()
+
+
 if __name__ == "__main__":
     try:
         app.run(debug=True)
     finally:
-        db_conn.close_connection()
+        close_worker()
@@ -1,6 +1,27 @@
 from flask import Blueprint, jsonify, request
 from marshmallow import ValidationError
 from flasgger import swag_from
+from routes.query_params import (
+    FIELDS_PARAMETER,
+    IDS_PARAMETER,
+    PAGINATION_PARAMETERS,
+    bulk_response,
+    parse_bulk_ids,
+    parse_bulk_items,
+    parse_bulk_patch,
+    parse_fields,
+    parse_lookup_ids,
+    parse_pagination,
+    ordered_by_ids,
+    paginated,
+    schema_field_names,
+)
+from routes.streaming import (
+    EXPORT_PARAMETERS,
+    ndjson_response,
+    parse_batch_size,
+    wants_ndjson,
+)
 from logger.logger_pay import Logger
 
 
@@ -12,24 +33,45 @@ class PaymentRoute(Blueprint):
         self.logger = Logger()
         self.payment_service = payment_service
         self.payment_schema = payment_schema
+        self.projectable_fields = schema_field_names(payment_schema) | {
+            "_id",
+            "updated_at",
+        }
         self.register_routes()
 
     def register_routes(self):
         """Function to register the routes for the payment API"""
 
         self.route("/api/v1/payments", methods=["GET"])(self.get_payments)
+        self.route("/api/v1/payments/<int:payment_id>", methods=["GET"])(
+            self.get_payment
+        )
         self.route("/api/v1/payments", methods=["POST"])(self.add_payment)
+        self.route("/api/v1/payments/lookup", methods=["POST"])(
+            self.get_payments_by_ids
+        )
         self.route("/api/v1/payments/<int:payment_id>", methods=["PUT"])(
             self.update_payment
         )
         self.route("/api/v1/payments/<int:payment_id>", methods=["DELETE"])(
             self.delete_payment
         )
+        self.route("/api/v1/payments/bulk", methods=["PATCH"])(
+            self.update_payments_bulk
+        )
+        self.route("/api/v1/payments/bulk", methods=["DELETE"])(
+            self.delete_payments_bulk
+        )
+        self.route("/api/v1/payments/version", methods=["GET"])(self.get_version)
+        self.route("/api/v1/payments/pool/stats", methods=["GET"])(self.get_pool_stats)
         self.route("/healthcheck", methods=["GET"])(self.healthcheck)
 
     @swag_from(
         {
             "tags": ["payments"],
+            "parameters": PAGINATION_PARAMETERS
+            + [IDS_PARAMETER, FIELDS_PARAMETER]
+            + EXPORT_PARAMETERS,
             "responses": {
                 200: {
                     "description": "GET all payments",
@@ -54,8 +96,117 @@ class PaymentRoute(Blueprint):
     def get_payments(self):
         """Fetch all payments from the database"""
 
-        payments = self.payment_service.get_all_payments()
-        return jsonify(payments), 200
+        if "ids" in request.args:
+            return self.get_payments_by_ids()
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        if wants_ndjson():
+            try:
+                batch_size = parse_batch_size()
+            except ValueError as e:
+                self.logger.error(f"Invalid export parameters: {e}")
+                return jsonify({"error": f"Invalid export parameters: {e}"}), 400
+
+            cursor = self.payment_service.stream_all_payments(batch_size, fields)
+            return ndjson_response(cursor, batch_size)
+
+        try:
+            after, limit = parse_pagination()
+        except ValueError as e:
+            self.logger.error(f"Invalid pagination parameters: {e}")
+            return jsonify({"error": f"Invalid pagination parameters: {e}"}), 400
+
+        payments = self.payment_service.get_all_payments(after, limit, fields)
+        if limit is None:
+            return jsonify(payments), 200
+        return jsonify(paginated(payments, limit)), 200
+
+    @swag_from(
+        {
+            "tags": ["payments"],
+            "parameters": [
+                {
+                    "name": "payment_id",
+                    "in": "path",
+                    "required": True,
+                    "type": "integer",
+                },
+                FIELDS_PARAMETER,
+            ],
+            "responses": {
+                200: {"description": "Payment fetched successfully"},
+                400: {"description": "Invalid fields parameter"},
+                404: {"description": "Payment not found"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_payment(self, payment_id):
+        """Fetches a payment by its ID"""
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        try:
+            payment = self.payment_service.get_payment_by_id(payment_id, fields)
+            if payment:
+                return jsonify(payment), 200
+            else:
+                self.logger.error("Payment not found")
+                return jsonify({"error": "Payment not found"}), 404
+
+        except Exception as e:
+            self.logger.error(f"Error fetching payment: {e}")
+            return jsonify({"error": f"Error fetching payment: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["payments"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {"type": "array", "items": {"type": "integer"}},
+                },
+                FIELDS_PARAMETER,
+            ],
+            "responses": {
+                200: {"description": "Payments in the requested order, missing ids"},
+                400: {"description": "Invalid ids or fields parameter"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_payments_by_ids(self):
+        """Fetches many payments by their IDs with one query, in the requested order"""
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        try:
+            payment_ids = parse_lookup_ids()
+        except ValueError as e:
+            self.logger.error(f"Invalid ids: {e}")
+            return jsonify({"error": f"Invalid ids: {e}"}), 400
+
+        try:
+            payments = self.payment_service.get_payments_by_ids(payment_ids, fields)
+            return jsonify(ordered_by_ids(payments, payment_ids)), 200
+        except Exception as e:
+            self.logger.error(f"Error fetching payments by ids: {e}")
+            return jsonify({"error": f"Error fetching payments by ids: {e}"}), 500
 
     def fetch_request_data(self):
         """Function to fetch the request data from the request body and validate it with the schema"""
@@ -141,7 +292,7 @@ class PaymentRoute(Blueprint):
                 "cvv": cvv,
             }
             created_payment = self.payment_service.add_payment(new_payment)
-            self.logger.info(f"Payment added: {created_payment}")
+            self.logger.info(f"Payment added: {created_payment['_id']}")
             return jsonify(created_payment), 201
         except Exception as e:
             self.logger.error(f"Error adding payment: {e}")
@@ -209,8 +360,8 @@ class PaymentRoute(Blueprint):
                 payment_id, update_payment
             )
             if updated_payment:
-                self.logger.info(f"Payment updated: {updated_payment}")
-                return jsonify(update_payment), 200
+                self.logger.info(f"Payment updated: {payment_id}")
+                return jsonify(updated_payment), 200
             else:
                 self.logger.error("Payment not found")
                 return jsonify({"error": "Payment not found"}), 404
@@ -244,7 +395,7 @@ class PaymentRoute(Blueprint):
         try:
             deleted_payment = self.payment_service.delete_payment(payment_id)
             if deleted_payment:
-                self.logger.info(f"Payment deleted: {deleted_payment}")
+                self.logger.info(f"Payment deleted: {payment_id}")
                 return jsonify(deleted_payment), 200
             else:
                 self.logger.error("Payment not found")
@@ -253,6 +404,199 @@ class PaymentRoute(Blueprint):
             self.logger.error(f"Error deleting payment: {e}")
             return jsonify({"error": f"Error deleting payment: {e}"}), 500
 
+    def validate_payment_patch(self, fields):
+        """Function that validates the fields of a partial payment update"""
+
+        validators = {
+            "alias": self.payment_schema.validates_alias,
+            "name": self.payment_schema.validates_name,
+            "number": self.payment_schema.validates_number,
+            "month": self.payment_schema.validates_month,
+            "year": self.payment_schema.validates_year,
+            "cvv": self.payment_schema.validates_cvv,
+        }
+        unknown = [field for field in fields if field not in validators]
+        if unknown:
+            raise ValidationError(f"Unknown fields: {', '.join(unknown)}")
+
+        for field, value in fields.items():
+            validators[field](value)
+
+        return fields
+
+    @swag_from(
+        {
+            "tags": ["payments"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "_id": {"type": "integer"},
+                                "alias": {"type": "string"},
+                                "name": {"type": "string"},
+                                "number": {"type": "string"},
+                                "month": {"type": "string"},
+                                "year": {"type": "string"},
+                                "cvv": {"type": "string"},
+                            },
+                            "required": ["_id"],
+                        },
+                    },
+                }
+            ],
+            "responses": {
+                200: {
+                    "description": "Every payment was found, see the matched and modified counts"
+                },
+                207: {
+                    "description": "Some payments were not updated, see the per-id results"
+                },
+                400: {"description": "No payment was updated"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def update_payments_bulk(self):
+        """Updates many payments in one request, reporting the counts of each id"""
+
+        try:
+            items = parse_bulk_items()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"error": f"Invalid bulk data: {e}"}), 400
+
+        results = [None] * len(items)
+        patches = []
+        positions = []
+        seen = set()
+        for index, item in enumerate(items):
+            try:
+                payment_id, fields = parse_bulk_patch(item)
+                if payment_id in seen:
+                    raise ValueError(f"_id {payment_id} appears more than once")
+                patches.append((payment_id, self.validate_payment_patch(fields)))
+                seen.add(payment_id)
+                positions.append(index)
+            except (ValidationError, TypeError, ValueError) as e:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "error": f"Invalid data: {e}",
+                }
+
+        try:
+            summary = {"matched": 0, "modified": 0, "missing": 0}
+            if patches:
+                updated, summary = self.payment_service.update_payments(patches)
+                for index, result in zip(positions, updated):
+                    results[index] = {"index": index, **result}
+
+            body, code = bulk_response(results)
+            body.update(summary)
+            self.logger.info(
+                f"Bulk payments: {summary['modified']} modified, "
+                f"{summary['missing']} missing, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error updating payments in bulk: {e}")
+            return jsonify({"error": f"Error updating payments in bulk: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["payments"],
+            "parameters": [
+                {
+                    "name": "ids",
+                    "in": "query",
+                    "required": False,
+                    "type": "string",
+                    "description": "Comma separated list of ids, e.g. 1,2,3",
+                },
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": False,
+                    "schema": {"type": "array", "items": {"type": "integer"}},
+                    "description": "JSON array of ids, used when ids is not given",
+                },
+            ],
+            "responses": {
+                200: {"description": "Every payment was deleted"},
+                207: {
+                    "description": "Some payments were not found, see the per-id results"
+                },
+                400: {"description": "No payment was deleted"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def delete_payments_bulk(self):
+        """Deletes many payments in one request, reporting the result of each id"""
+
+        try:
+            payment_ids = parse_bulk_ids()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"error": f"Invalid bulk data: {e}"}), 400
+
+        try:
+            results, summary = self.payment_service.delete_payments(payment_ids)
+
+            body, code = bulk_response(results)
+            body.update(summary)
+            self.logger.info(
+                f"Bulk payments: {summary['deleted']} deleted, "
+                f"{summary['missing']} missing, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error deleting payments in bulk: {e}")
+            return jsonify({"error": f"Error deleting payments in bulk: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["payments"],
+            "responses": {
+                200: {
+                    "description": "Collection version and the time of the last write"
+                },
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_version(self):
+        """Returns the current version of the payments collection"""
+
+        try:
+            return jsonify(self.payment_service.get_version_info()), 200
+        except Exception as e:
+            self.logger.error(f"Error reading the payments version: {e}")
+            return jsonify({"error": f"Error reading the payments version: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["payments"],
+            "responses": {
+                200: {
+                    "description": "Checkouts, connections in use and checkout wait times"
+                },
+            },
+        }
+    )
+    def get_pool_stats(self):
+        """Returns the connection pool counters of the worker that answered"""
+
+        return jsonify(self.payment_service.get_pool_stats()), 200
+
     def healthcheck(self):
         """Healthcheck endpoint for the payments API container"""
         return jsonify({"status": "up"}), 200
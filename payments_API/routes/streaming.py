@@ -0,0 +1,66 @@
+import os
+from flask import Response, current_app, request, stream_with_context
+
+DEFAULT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+MAX_BATCH_SIZE = 10000
+
+EXPORT_PARAMETERS = [
+    {
+        "name": "format",
+        "in": "query",
+        "required": False,
+        "type": "string",
+        "enum": ["json", "ndjson"],
+        "description": "Use ndjson to stream one document per line",
+    },
+    {
+        "name": "batch_size",
+        "in": "query",
+        "required": False,
+        "type": "integer",
+        "description": f"Documents fetched per round trip when streaming (default {DEFAULT_BATCH_SIZE})",
+    },
+]
+
+
+def wants_ndjson():
+    """Function that tells whether the client asked for a streamed NDJSON export"""
+
+    return request.args.get("format", "json").lower() == "ndjson"
+
+
+def parse_batch_size():
+    """Function that reads the batch_size query argument used by NDJSON exports"""
+
+    batch_size = request.args.get("batch_size")
+    if batch_size is None:
+        return DEFAULT_BATCH_SIZE
+
+    try:
+        batch_size = int(batch_size)
+    except ValueError:
+        raise ValueError("batch_size must be an integer")
+
+    if batch_size < 1 or batch_size > MAX_BATCH_SIZE:
+        raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+
+    return batch_size
+
+
+def ndjson_response(cursor, batch_size):
+    """Function that streams a pymongo cursor as NDJSON, one chunk per batch"""
+
+    def generate():
+        try:
+            lines = []
+            for document in cursor:
+                lines.append(current_app.json.dumps(document))
+                if len(lines) >= batch_size:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+        finally:
+            cursor.close()
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
@@ -1,5 +1,9 @@
 from flask import jsonify
+from pymongo import ReturnDocument
 from logger.logger_pay import Logger
+from models.collection_version import CollectionVersion, utc_timestamp
+from models.id_allocator import IdAllocator
+from services.bulk_writes import bulk_delete, bulk_update
 
 
 class PaymentService:
@@ -8,12 +12,19 @@ class PaymentService:
     def __init__(self, db_conn):
         self.logger = Logger()
         self.db_conn = db_conn
+        self.id_allocator = IdAllocator(db_conn)
+        self.version = CollectionVersion(db_conn, "payments")
 
-    def get_all_payments(self):
-        """Function to get all payments from the database"""
+    def get_all_payments(self, after=None, limit=None, fields=None):
+        """Function to get all payments from the database, one page at a time when a limit is given"""
 
         try:
-            payments = list(self.db_conn.db.payments.find())
+            query = {"_id": {"$gt": after}} if after is not None else {}
+            projection = {field: 1 for field in fields} if fields else None
+            cursor = self.db_conn.db.payments.find(query, projection)
+            if limit is not None:
+                cursor = cursor.sort("_id", 1).limit(limit)
+            payments = list(cursor)
             return payments
         except Exception as e:
             self.logger.error(f"Error fetching all payments from database: {e}")
@@ -22,11 +33,20 @@ class PaymentService:
                 500,
             )
 
-    def get_payment_by_id(self, payment_id):
+    def stream_all_payments(self, batch_size, fields=None):
+        """Function that returns a cursor over all payments, fetched batch_size at a time"""
+
+        projection = {field: 1 for field in fields} if fields else None
+        return self.db_conn.db.payments.find(projection=projection).batch_size(
+            batch_size
+        )
+
+    def get_payment_by_id(self, payment_id, fields=None):
         """Function to get a payment by id from the database"""
 
         try:
-            payment = self.db_conn.db.payments.find_one({"_id": payment_id})
+            projection = {field: 1 for field in fields} if fields else None
+            payment = self.db_conn.db.payments.find_one({"_id": payment_id}, projection)
             return payment
         except Exception as e:
             self.logger.error(f"Error fetching payment by id from database: {e}")
@@ -35,18 +55,31 @@ class PaymentService:
                 500,
             )
 
+    def get_payments_by_ids(self, payment_ids, fields=None):
+        """Function to get many payments by id with a single $in query
+
+        The payments come back in no particular order and ids that do not
+        exist are simply absent.
+        """
+
+        try:
+            projection = {field: 1 for field in fields} if fields else None
+            return list(
+                self.db_conn.db.payments.find({"_id": {"$in": payment_ids}}, projection)
+            )
+        except Exception as e:
+            self.logger.error(f"Error fetching payments by ids from database: {e}")
+            raise
+
     def add_payment(self, new_payment):
         """Function to add a payment to the database"""
 
         try:
-            if self.db_conn.db.payments.count_documents({}) == 0:
-                new_payment["_id"] = 1
-            else:
-                max_id = self.db_conn.db.payments.find_one(sort=[("_id", -1)])["_id"]
-                next_id = max_id + 1
-                new_payment["_id"] = next_id
+            new_payment["_id"] = self.id_allocator.next_id("payments")
+            new_payment["updated_at"] = utc_timestamp()
 
             self.db_conn.db.payments.insert_one(new_payment)
+            self.version.bump()
             return new_payment
         except Exception as e:
             self.logger.error(f"Error adding payment to database: {e}")
@@ -56,28 +89,77 @@ class PaymentService:
         """Function to update a payment in the database"""
 
         try:
-            update_payment = self.get_payment_by_id(payment_id)
-            if update_payment:
-                updated_payment = self.db_conn.db.payments.update_one(
-                    {"_id": payment_id}, {"$set": payment}
-                )
-                return updated_payment
-            else:
-                return jsonify({"error": "Payment not found"}), 404
+            payment["updated_at"] = utc_timestamp()
+            updated_payment = self.db_conn.db.payments.find_one_and_update(
+                {"_id": payment_id},
+                {"$set": payment},
+                return_document=ReturnDocument.AFTER,
+            )
+            if updated_payment:
+                self.version.bump()
+            return updated_payment
+
         except Exception as e:
             self.logger.error(f"Error updating payment in database: {e}")
             return jsonify({"error": f"Error updating payment in database: {e}"}), 500
 
+    def update_payments(self, patches):
+        """Function to update many payments with one read and one unordered bulk_write
+
+        Returns the per-id results and the matched, modified and missing counts.
+        """
+
+        try:
+            results, summary, _ = bulk_update(
+                self.db_conn.db.payments, patches, utc_timestamp()
+            )
+            if summary["modified"]:
+                self.version.bump()
+            return results, summary
+        except Exception as e:
+            self.logger.error(f"Error updating payments in bulk: {e}")
+            raise
+
     def delete_payment(self, payment_id):
         """Function to delete a payment from the database"""
 
         try:
-            delete_payment = self.get_payment_by_id(payment_id)
-            if delete_payment:
-                self.db_conn.db.payments.delete_one({"_id": payment_id})
-                return delete_payment
-            else:
-                return None
+            deleted_payment = self.db_conn.db.payments.find_one_and_delete(
+                {"_id": payment_id}
+            )
+            if deleted_payment:
+                self.version.bump()
+            return deleted_payment
+
         except Exception as e:
             self.logger.error(f"Error deleting payment in database: {e}")
             return jsonify({"error": f"Error deleting payment in database: {e}"}), 500
+
+    def delete_payments(self, payment_ids):
+        """Function to delete many payments with one read and one unordered bulk_write
+
+        Returns the per-id results and the deleted and missing counts.
+        """
+
+        try:
+            results, summary, _ = bulk_delete(self.db_conn.db.payments, payment_ids)
+            if summary["deleted"]:
+                self.version.bump()
+            return results, summary
+        except Exception as e:
+            self.logger.error(f"Error deleting payments in bulk: {e}")
+            raise
+
+    def get_version_info(self):
+        """Function that returns the payments version and the time of the last write"""
+
+        try:
+            return self.version.snapshot()
+        except Exception as e:
+            self.logger.error(f"Error reading the payments version: {e}")
+            raise
+
+    def get_pool_stats(self):
+        """Function that returns the connection pool counters of this worker"""
+
+        return self.db_conn.pool_metrics.stats()
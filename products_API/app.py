@@ -1,35 +1,70 @@
 from flask import Flask
 from models.products_model import ProductModel
 from services.products_services import ProductService
+from services.storefront_services import StorefrontService
 from schemas.products_schemas import ProductSchema
+from services.cache_watcher import CacheWatcher
 from routes.products_routes import ProductRoute
+from routes.storefront_routes import StorefrontRoute
+from routes.compression import Compression
+from routes.json_provider import OrjsonProvider
 from flask_cors import CORS
 from flasgger import Swagger
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
+Compression(app)
 
 # Swagger
 swagger = Swagger(app)
 
-# Model
+# Model, the MongoDB client is created on first use in every worker
 db_conn = ProductModel()
-db_conn.connect_to_database()
 
 # Service
 product_service = ProductService(db_conn)
 
+# Product pages assembled from the products, categories and reviews collections
+storefront_service = StorefrontService(db_conn, product_service)
+
+# Evicts cached products written by the other workers
+cache_watcher = CacheWatcher(
+    db_conn, "products", product_service.cache, version=product_service.version
+)
+
 # Schema
 product_schema = ProductSchema()
 
 # Routes
 product_routes = ProductRoute(product_service, product_schema)
+storefront_routes = StorefrontRoute(storefront_service)
 
-# Register the blueprint to make the routes available in the app
+# Register the blueprints to make the routes available in the app
 app.register_blueprint(product_routes)
+app.register_blueprint(storefront_routes)
+
+
+def init_worker():
+    """Function that starts the background threads of a worker process
+
+    Called from the gunicorn post_fork hook, so it also runs with --preload.
+    """
+
+    cache_watcher.start()
+
+
+def close_worker():
+    """Function that stops the threads and closes the client of a worker process"""
+
+    cache_watcher.stop()
+    storefront_service.close()
+    db_conn.close_connection()
+
 
 if __name__ == "__main__":
     try:
+        init_worker()
         app.run(debug=True)
     finally:
-        db_conn.close_connection()
+        close_worker()
@@ -0,0 +1,70 @@
+"""Gunicorn settings, loaded with `gunicorn -c gunicorn.conf.py app:app`
+
+Setting GUNICORN_PRELOAD=true imports the app once in the master before the
+workers are forked. MongoDB clients are still created lazily in each worker
+and the worker threads are started by post_fork, so nothing created in the
+master crosses a fork.
+
+Every setting can be overridden with a GUNICORN_* environment variable:
+GUNICORN_WORKERS, GUNICORN_WORKER_CLASS (sync, gthread or gevent),
+GUNICORN_THREADS, GUNICORN_WORKER_CONNECTIONS, GUNICORN_KEEPALIVE,
+GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT, GUNICORN_MAX_REQUESTS and
+GUNICORN_MAX_REQUESTS_JITTER. Empty values keep the defaults below.
+"""
+
+import multiprocessing
+import os
+
+# Catalog reads are cheap and served from a per-worker cache, so a few sync
+# workers keep the caches warm
+DEFAULTS = {"workers_per_cpu": 1, "worker_class": "sync", "threads": 1}
+
+
+def setting(name, default, cast=int):
+    """Function that reads GUNICORN_<name>, falling back to the default when unset"""
+
+    value = os.environ.get(f"GUNICORN_{name}")
+    return cast(value) if value else default
+
+
+bind = "0.0.0.0:8000"
+preload_app = setting("PRELOAD", False, lambda value: value.lower() == "true")
+
+workers = setting(
+    "WORKERS", multiprocessing.cpu_count() * DEFAULTS["workers_per_cpu"] + 1
+)
+worker_class = setting("WORKER_CLASS", DEFAULTS["worker_class"], str)
+# Used by gthread workers, a sync worker with more than one thread becomes gthread
+threads = setting("THREADS", DEFAULTS["threads"])
+
+# gevent serves every worker from an event loop. The sockets pymongo uses
+# become cooperative, so one worker keeps up to worker_connections requests in
+# flight while they wait on MongoDB. Raise MONGODB_MAX_POOL_SIZE with it, or the
+# requests queue for a connection.
+worker_connections = setting("WORKER_CONNECTIONS", 1000)
+
+keepalive = setting("KEEPALIVE", 5)
+timeout = setting("TIMEOUT", 30)
+graceful_timeout = setting("GRACEFUL_TIMEOUT", 30)
+
+# Recycle workers now and then, the jitter keeps them from restarting together
+max_requests = setting("MAX_REQUESTS", 1000)
+max_requests_jitter = setting("MAX_REQUESTS_JITTER", 100)
+
+if worker_class == "gevent":
+    # Patch before a preloading master imports the app, and pymongo with it
+    from gevent import monkey
+
+    monkey.patch_all()
+
+
+def post_fork(server, worker):
+    from app import init_worker
+
+    init_worker()
+
+
+def worker_exit(server, worker):
+    from app import close_worker
+
+    close_worker()
@@ -1,16 +1,12 @@
 import logging as log
+from logger.log_pipeline import configure_logging
 
 
 class Logger:
     """Logger class to log messages with different severity levels"""
 
     def __init__(self, log_file="atemporal_products_api.log", level=log.INFO):
-        log.basicConfig(
-            level=level,
-            format="%(asctime)s: %(levelname)s [%(filename)s:%(lineno)s] %(message)s",
-            datefmt="%I:%M:%S %p",
-            handlers=[log.StreamHandler(), log.FileHandler(log_file)],
-        )
+        configure_logging(log_file, level, datefmt="%I:%M:%S %p")
         self.logger = log.getLogger()
 
     def debug(self, message):
@@ -0,0 +1,46 @@
+import os
+import time
+from pymongo.errors import OperationFailure
+
+
+def ensure_indexes(db, declared_indexes, logger):
+    """Function that builds the declared indexes that are missing and reports on them
+
+    declared_indexes maps a collection name to a list of pymongo IndexModel.
+    Indexes that already exist are left untouched, so it is safe to run on
+    every start.
+    """
+
+    report = {"existing": [], "created": [], "failed": [], "elapsed_ms": 0.0}
+    if os.environ.get("ENSURE_INDEXES", "true").lower() == "false":
+        return report
+
+    started = time.perf_counter()
+    for collection_name, indexes in declared_indexes.items():
+        existing = db[collection_name].index_information()
+
+        for index in indexes:
+            name = f"{collection_name}.{index.document['name']}"
+            if index.document["name"] in existing:
+                report["existing"].append(name)
+                continue
+
+            try:
+                db[collection_name].create_indexes([index])
+                report["created"].append(name)
+            except OperationFailure as e:
+                # e.g. duplicated values that break a unique index
+                report["failed"].append(name)
+                logger.error(f"Could not build index {name}: {e}")
+
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    logger.info(
+        f"Indexes ensured in {report['elapsed_ms']} ms - "
+        f"created: {report['created'] or 'none'}, "
+        f"existing: {report['existing'] or 'none'}"
+    )
+    if report["failed"]:
+        logger.warning(f"Missing indexes: {report['failed']}")
+
+    return report
@@ -0,0 +1,64 @@
+import hashlib
+import os
+from flask import current_app, request
+
+# Browsers revalidate on every navigation while shared caches such as a CDN
+# may serve a copy for S_MAXAGE seconds, and a stale one while they revalidate
+CACHE_MAX_AGE = int(os.environ.get("CACHE_CONTROL_MAX_AGE", 0))
+CACHE_S_MAXAGE = int(os.environ.get("CACHE_CONTROL_S_MAXAGE", 30))
+CACHE_STALE_WHILE_REVALIDATE = int(
+    os.environ.get("CACHE_CONTROL_STALE_WHILE_REVALIDATE", 30)
+)
+
+# Suffixes the compression hook appends to the ETag of an encoded response
+ENCODING_SUFFIXES = ("", "-zstd", "-br", "-gzip")
+
+IF_NONE_MATCH_PARAMETER = {
+    "name": "If-None-Match",
+    "in": "header",
+    "required": False,
+    "type": "string",
+    "description": "ETag of a previous response, answered with 304 while it is current",
+}
+
+
+def collection_etag(collection_name, version):
+    """Function that builds the ETag of a read from the collection version
+
+    The path and the query string are part of the tag, so every page and
+    projection of the same version has its own tag.
+    """
+
+    if version is None:
+        return None
+
+    variant = hashlib.blake2b(request.full_path.encode(), digest_size=8).hexdigest()
+    return f"{collection_name}-{version}-{variant}"
+
+
+def not_modified(etag):
+    """Function that returns a 304 response when If-None-Match holds the etag, else None"""
+
+    if etag is None or not request.if_none_match:
+        return None
+
+    for suffix in ENCODING_SUFFIXES:
+        if request.if_none_match.contains_weak(etag + suffix):
+            response = current_app.response_class(status=304)
+            return cacheable(response, etag + suffix)
+
+    return None
+
+
+def cacheable(response, etag):
+    """Function that adds the ETag and the Cache-Control headers to a read response"""
+
+    if etag is None:
+        return response
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = (
+        f"public, max-age={CACHE_MAX_AGE}, s-maxage={CACHE_S_MAXAGE}, "
+        f"stale-while-revalidate={CACHE_STALE_WHILE_REVALIDATE}"
+    )
+    return response
@@ -1,6 +1,27 @@
 from flask import Blueprint, jsonify, request
 from marshmallow import ValidationError
 from flasgger import swag_from
+from routes.query_params import (
+    FIELDS_PARAMETER,
+    IDS_PARAMETER,
+    PAGINATION_PARAMETERS,
+    bulk_response,
+    parse_bulk_ids,
+    parse_bulk_items,
+    parse_bulk_patch,
+    parse_fields,
+    parse_lookup_ids,
+    parse_pagination,
+    ordered_by_ids,
+    paginated,
+    schema_field_names,
+)
+from routes.conditional import (
+    IF_NONE_MATCH_PARAMETER,
+    cacheable,
+    collection_etag,
+    not_modified,
+)
 from logger.logger_products import Logger
 
 
@@ -12,22 +33,48 @@ class ProductRoute(Blueprint):
         self.logger = Logger()
         self.product_service = product_service
         self.product_schema = product_schema
+        self.projectable_fields = schema_field_names(product_schema) | {
+            "_id",
+            "image",
+            "updated_at",
+        }
         self.register_routes()
 
     def register_routes(self):
         self.route("/api/v1/products", methods=["GET"])(self.get_products)
+        self.route("/api/v1/products/<int:product_id>", methods=["GET"])(
+            self.get_product
+        )
         self.route("/api/v1/products", methods=["POST"])(self.add_product)
+        self.route("/api/v1/products/bulk", methods=["POST"])(self.add_products_bulk)
+        self.route("/api/v1/products/lookup", methods=["POST"])(
+            self.get_products_by_ids
+        )
         self.route("/api/v1/products/<int:product_id>", methods=["PUT"])(
             self.update_product
         )
         self.route("/api/v1/products/<int:product_id>", methods=["DELETE"])(
             self.delete_product
         )
+        self.route("/api/v1/products/bulk", methods=["PATCH"])(
+            self.update_products_bulk
+        )
+        self.route("/api/v1/products/bulk", methods=["DELETE"])(
+            self.delete_products_bulk
+        )
+        self.route("/api/v1/products/cache/stats", methods=["GET"])(
+            self.get_cache_stats
+        )
+        self.route("/api/v1/products/changes", methods=["GET"])(self.get_changes)
+        self.route("/api/v1/products/version", methods=["GET"])(self.get_version)
+        self.route("/api/v1/products/pool/stats", methods=["GET"])(self.get_pool_stats)
         self.route("/healthcheck", methods=["GET"])(self.healthcheck)
 
     @swag_from(
         {
             "tags": ["products"],
+            "parameters": PAGINATION_PARAMETERS
+            + [IDS_PARAMETER, FIELDS_PARAMETER, IF_NONE_MATCH_PARAMETER],
             "responses": {
                 200: {
                     "description": "GET all products",
@@ -42,15 +89,135 @@ class ProductRoute(Blueprint):
                             },
                         },
                     },
-                }
+                },
+                304: {"description": "Products not modified since the given ETag"},
             },
         }
     )
     def get_products(self):
         """Fetches all the products"""
 
-        products = self.product_service.get_all_products()
-        return jsonify(products), 200
+        if "ids" in request.args:
+            return self.get_products_by_ids()
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        try:
+            after, limit = parse_pagination()
+        except ValueError as e:
+            self.logger.error(f"Invalid pagination parameters: {e}")
+            return jsonify({"error": f"Invalid pagination parameters: {e}"}), 400
+
+        etag = collection_etag("products", self.product_service.get_version())
+        unchanged = not_modified(etag)
+        if unchanged is not None:
+            return unchanged
+
+        products = self.product_service.get_all_products(after, limit, fields)
+        if limit is None:
+            return cacheable(jsonify(products), etag), 200
+        return cacheable(jsonify(paginated(products, limit)), etag), 200
+
+    @swag_from(
+        {
+            "tags": ["products"],
+            "parameters": [
+                {
+                    "name": "product_id",
+                    "in": "path",
+                    "required": True,
+                    "type": "integer",
+                },
+                FIELDS_PARAMETER,
+                IF_NONE_MATCH_PARAMETER,
+            ],
+            "responses": {
+                200: {"description": "Product fetched successfully"},
+                304: {"description": "Product not modified since the given ETag"},
+                400: {"description": "Invalid fields parameter"},
+                404: {"description": "Product not found"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_product(self, product_id):
+        """Fetches a product by its ID"""
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        etag = collection_etag("products", self.product_service.get_version())
+        unchanged = not_modified(etag)
+        if unchanged is not None:
+            return unchanged
+
+        try:
+            product = self.product_service.get_product_by_id(product_id, fields)
+            if product:
+                return cacheable(jsonify(product), etag), 200
+            else:
+                self.logger.error("Product not found")
+                return jsonify({"error": "Product not found"}), 404
+
+        except Exception as e:
+            self.logger.error(f"Error fetching product: {e}")
+            return jsonify({"error": f"Error fetching product: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["products"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {"type": "array", "items": {"type": "integer"}},
+                },
+                FIELDS_PARAMETER,
+            ],
+            "responses": {
+                200: {"description": "Products in the requested order and missing ids"},
+                400: {"description": "Invalid ids or fields parameter"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_products_by_ids(self):
+        """Fetches many products by their IDs with one query, in the requested order"""
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        try:
+            product_ids = parse_lookup_ids()
+        except ValueError as e:
+            self.logger.error(f"Invalid ids: {e}")
+            return jsonify({"error": f"Invalid ids: {e}"}), 400
+
+        # Ids sent in a POST body are not part of the URL, so only GET is cacheable
+        etag = None
+        if request.method == "GET":
+            etag = collection_etag("products", self.product_service.get_version())
+            unchanged = not_modified(etag)
+            if unchanged is not None:
+                return unchanged
+
+        try:
+            products = self.product_service.get_products_by_ids(product_ids, fields)
+            return cacheable(jsonify(ordered_by_ids(products, product_ids)), etag), 200
+        except Exception as e:
+            self.logger.error(f"Error fetching products by ids: {e}")
+            return jsonify({"error": f"Error fetching products by ids: {e}"}), 500
 
     def fetch_request_data(self):
         try:
@@ -118,13 +285,122 @@ class ProductRoute(Blueprint):
             }
 
             created_product = self.product_service.add_product(new_product)
-            self.logger.info(f"Product added: {created_product}")
+            self.logger.info(f"Product added: {created_product['_id']}")
             return jsonify(created_product), 201
 
         except Exception as e:
             self.logger.error(f"Error adding the product: {e}")
             return jsonify({"error": f"Error adding the product: {e}"}), 500
 
+    def validate_product(self, data):
+        """Function that validates one product with the schema and returns its fields"""
+
+        if not isinstance(data, dict):
+            raise ValidationError("Each item must be a JSON object")
+
+        missing = [
+            field for field in ("name", "price", "category") if field not in data
+        ]
+        if missing:
+            raise ValidationError(f"Missing fields: {', '.join(missing)}")
+
+        name = data["name"]
+        price = data["price"]
+        category = data["category"]
+
+        self.product_schema.validate_name(name)
+        self.product_schema.validate_price(price)
+        self.product_schema.validate_category(category)
+
+        return {
+            "name": name,
+            "price": price,
+            "category": category,
+            "image": "/shirt-test.jpeg",
+        }
+
+    @swag_from(
+        {
+            "tags": ["products"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string"},
+                                "price": {"type": "string"},
+                                "category": {"type": "string"},
+                            },
+                            "required": ["name", "price", "category"],
+                        },
+                    },
+                }
+            ],
+            "responses": {
+                201: {"description": "Every product was added"},
+                207: {
+                    "description": "Some products were added, see the per-item results"
+                },
+                400: {"description": "No product was added"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def add_products_bulk(self):
+        """Adds many products in one request, reporting the result of each item"""
+
+        try:
+            items = parse_bulk_items()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"error": f"Invalid bulk data: {e}"}), 400
+
+        results = [None] * len(items)
+        new_products = []
+        positions = []
+        for index, item in enumerate(items):
+            try:
+                new_products.append(self.validate_product(item))
+                positions.append(index)
+            except (ValidationError, TypeError, ValueError) as e:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "error": f"Invalid data: {e}",
+                }
+
+        try:
+            if new_products:
+                created, failed = self.product_service.add_products(new_products)
+                for position, (index, product) in enumerate(zip(positions, created)):
+                    if position in failed:
+                        results[index] = {
+                            "index": index,
+                            "status": "error",
+                            "error": failed[position],
+                        }
+                    else:
+                        results[index] = {
+                            "index": index,
+                            "status": "created",
+                            "_id": product["_id"],
+                        }
+
+            body, code = bulk_response(results, success_code=201)
+            self.logger.info(
+                f"Bulk products: {body['succeeded']} added, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error adding products in bulk: {e}")
+            return jsonify({"error": f"Error adding products in bulk: {e}"}), 500
+
     @swag_from(
         {
             "tags": ["products"],
@@ -175,8 +451,8 @@ class ProductRoute(Blueprint):
             )
 
             if updated_product:
-                self.logger.info(f"Product updated: {updated_product}")
-                return jsonify(update_product), 200
+                self.logger.info(f"Product updated: {product_id}")
+                return jsonify(updated_product), 200
             else:
                 self.logger.error(f"Product not found")
                 return jsonify({"error": "Product not found"}), 404
@@ -209,7 +485,7 @@ class ProductRoute(Blueprint):
         try:
             deleted_product = self.product_service.delete_product(product_id)
             if deleted_product:
-                self.logger.info(f"Product deleted: {deleted_product}")
+                self.logger.info(f"Product deleted: {product_id}")
                 return jsonify(deleted_product), 200
             else:
                 self.logger.error(f"Product not found")
@@ -219,6 +495,253 @@ class ProductRoute(Blueprint):
             self.logger.error(f"Error deleting the product: {e}")
             return jsonify({"error": f"Error deleting the product: {e}"}), 500
 
+    def validate_product_patch(self, fields):
+        """Function that validates the fields of a partial product update"""
+
+        validators = {
+            "name": self.product_schema.validate_name,
+            "price": self.product_schema.validate_price,
+            "category": self.product_schema.validate_category,
+        }
+        unknown = [field for field in fields if field not in validators]
+        if unknown:
+            raise ValidationError(f"Unknown fields: {', '.join(unknown)}")
+
+        for field, value in fields.items():
+            validators[field](value)
+
+        return fields
+
+    @swag_from(
+        {
+            "tags": ["products"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "_id": {"type": "integer"},
+                                "name": {"type": "string"},
+                                "price": {"type": "string"},
+                                "category": {"type": "string"},
+                            },
+                            "required": ["_id"],
+                        },
+                    },
+                }
+            ],
+            "responses": {
+                200: {
+                    "description": "Every product was found, see the matched and modified counts"
+                },
+                207: {
+                    "description": "Some products were not updated, see the per-id results"
+                },
+                400: {"description": "No product was updated"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def update_products_bulk(self):
+        """Updates many products in one request, reporting the counts of each id"""
+
+        try:
+            items = parse_bulk_items()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"error": f"Invalid bulk data: {e}"}), 400
+
+        results = [None] * len(items)
+        patches = []
+        positions = []
+        seen = set()
+        for index, item in enumerate(items):
+            try:
+                product_id, fields = parse_bulk_patch(item)
+                if product_id in seen:
+                    raise ValueError(f"_id {product_id} appears more than once")
+                patches.append((product_id, self.validate_product_patch(fields)))
+                seen.add(product_id)
+                positions.append(index)
+            except (ValidationError, TypeError, ValueError) as e:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "error": f"Invalid data: {e}",
+                }
+
+        try:
+            summary = {"matched": 0, "modified": 0, "missing": 0}
+            if patches:
+                updated, summary = self.product_service.update_products(patches)
+                for index, result in zip(positions, updated):
+                    results[index] = {"index": index, **result}
+
+            body, code = bulk_response(results)
+            body.update(summary)
+            self.logger.info(
+                f"Bulk products: {summary['modified']} modified, "
+                f"{summary['missing']} missing, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error updating products in bulk: {e}")
+            return jsonify({"error": f"Error updating products in bulk: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["products"],
+            "parameters": [
+                {
+                    "name": "ids",
+                    "in": "query",
+                    "required": False,
+                    "type": "string",
+                    "description": "Comma separated list of ids, e.g. 1,2,3",
+                },
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": False,
+                    "schema": {"type": "array", "items": {"type": "integer"}},
+                    "description": "JSON array of ids, used when ids is not given",
+                },
+            ],
+            "responses": {
+                200: {"description": "Every product was deleted"},
+                207: {
+                    "description": "Some products were not found, see the per-id results"
+                },
+                400: {"description": "No product was deleted"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def delete_products_bulk(self):
+        """Deletes many products in one request, reporting the result of each id"""
+
+        try:
+            product_ids = parse_bulk_ids()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"error": f"Invalid bulk data: {e}"}), 400
+
+        try:
+            results, summary = self.product_service.delete_products(product_ids)
+
+            body, code = bulk_response(results)
+            body.update(summary)
+            self.logger.info(
+                f"Bulk products: {summary['deleted']} deleted, "
+                f"{summary['missing']} missing, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error deleting products in bulk: {e}")
+            return jsonify({"error": f"Error deleting products in bulk: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["products"],
+            "responses": {
+                200: {"description": "Read cache counters of the worker that answered"},
+            },
+        }
+    )
+    def get_cache_stats(self):
+        """Returns the hit and miss counters of the product read cache"""
+
+        return jsonify(self.product_service.get_cache_stats()), 200
+
+    @swag_from(
+        {
+            "tags": ["products"],
+            "parameters": [
+                {
+                    "name": "since",
+                    "in": "query",
+                    "required": True,
+                    "type": "integer",
+                    "description": "Version the client holds, from /version or a previous call",
+                }
+            ],
+            "responses": {
+                200: {"description": "Documents written and ids deleted after since"},
+                400: {"description": "Invalid since parameter"},
+                410: {"description": "Changes since that version were compacted"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_changes(self):
+        """Returns the products written and deleted after the version a client holds"""
+
+        try:
+            since = int(request.args["since"])
+            if since < 0:
+                raise ValueError
+        except (KeyError, ValueError):
+            self.logger.error("Invalid since parameter")
+            return (
+                jsonify({"error": "since must be a non negative integer version"}),
+                400,
+            )
+
+        try:
+            changes = self.product_service.get_changes(since)
+            if changes is None:
+                # The client has to read the whole list again
+                message = f"Changes since version {since} are no longer kept"
+                self.logger.error(message)
+                return jsonify({"error": message}), 410
+            return jsonify(changes), 200
+
+        except Exception as e:
+            self.logger.error(f"Error fetching products changes: {e}")
+            return jsonify({"error": f"Error fetching products changes: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["products"],
+            "responses": {
+                200: {
+                    "description": "Collection version and the time of the last write"
+                },
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_version(self):
+        """Returns the current version of the products collection"""
+
+        try:
+            return jsonify(self.product_service.get_version_info()), 200
+        except Exception as e:
+            self.logger.error(f"Error reading the products version: {e}")
+            return jsonify({"error": f"Error reading the products version: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["products"],
+            "responses": {
+                200: {
+                    "description": "Checkouts, connections in use and checkout wait times"
+                },
+            },
+        }
+    )
+    def get_pool_stats(self):
+        """Returns the connection pool counters of the worker that answered"""
+
+        return jsonify(self.product_service.get_pool_stats()), 200
+
     def healthcheck(self):
         """Function to check the health of the API in the docker container"""
 
@@ -0,0 +1,157 @@
+from flask import Blueprint, jsonify, request
+from flasgger import swag_from
+from routes.query_params import IDS_PARAMETER, parse_ids
+from routes.conditional import (
+    IF_NONE_MATCH_PARAMETER,
+    cacheable,
+    collection_etag,
+    not_modified,
+)
+from logger.logger_products import Logger
+
+PAGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "product": {"type": "object"},
+        "category": {"type": "object"},
+        "rating": {
+            "type": "object",
+            "properties": {
+                "average": {"type": "number"},
+                "count": {"type": "integer"},
+                "histogram": {"type": "object"},
+            },
+        },
+    },
+}
+
+
+class StorefrontRoute(Blueprint):
+    """Class that handles the storefront routes, which read several collections at once"""
+
+    def __init__(self, storefront_service):
+        super().__init__("storefront", __name__)
+        self.logger = Logger()
+        self.storefront_service = storefront_service
+        self.register_routes()
+
+    def register_routes(self):
+        self.route("/api/v1/storefront/products", methods=["GET"])(
+            self.get_product_pages
+        )
+        self.route("/api/v1/storefront/products/<int:product_id>", methods=["GET"])(
+            self.get_product_page
+        )
+        self.route("/api/v1/storefront/cache/stats", methods=["GET"])(
+            self.get_cache_stats
+        )
+
+    @swag_from(
+        {
+            "tags": ["storefront"],
+            "parameters": [
+                {
+                    "name": "product_id",
+                    "in": "path",
+                    "required": True,
+                    "type": "integer",
+                },
+                IF_NONE_MATCH_PARAMETER,
+            ],
+            "responses": {
+                200: {
+                    "description": "Product with its category and rating summary",
+                    "schema": PAGE_SCHEMA,
+                },
+                304: {"description": "Page not modified since the given ETag"},
+                404: {"description": "Product not found"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_product_page(self, product_id):
+        """Fetches a product together with its category and rating summary"""
+
+        etag = collection_etag("storefront", self.storefront_service.get_version())
+        unchanged = not_modified(etag)
+        if unchanged is not None:
+            return unchanged
+
+        try:
+            pages = self.storefront_service.get_product_pages([product_id])
+            if product_id in pages:
+                return cacheable(jsonify(pages[product_id]), etag), 200
+            else:
+                self.logger.error("Product not found")
+                return jsonify({"error": "Product not found"}), 404
+
+        except Exception as e:
+            self.logger.error(f"Error fetching product page: {e}")
+            return jsonify({"error": f"Error fetching product page: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["storefront"],
+            "parameters": [
+                dict(IDS_PARAMETER, required=True),
+                IF_NONE_MATCH_PARAMETER,
+            ],
+            "responses": {
+                200: {
+                    "description": "Pages in the requested order and missing ids",
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "items": {"type": "array", "items": PAGE_SCHEMA},
+                            "missing": {
+                                "type": "array",
+                                "items": {"type": "integer"},
+                            },
+                        },
+                    },
+                },
+                304: {"description": "Pages not modified since the given ETag"},
+                400: {"description": "Invalid ids"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_product_pages(self):
+        """Fetches many products together with their categories and rating summaries"""
+
+        try:
+            product_ids = parse_ids(request.args.get("ids"))
+            if product_ids is None:
+                raise ValueError("ids is required")
+        except ValueError as e:
+            self.logger.error(f"Invalid ids: {e}")
+            return jsonify({"error": f"Invalid ids: {e}"}), 400
+
+        etag = collection_etag("storefront", self.storefront_service.get_version())
+        unchanged = not_modified(etag)
+        if unchanged is not None:
+            return unchanged
+
+        try:
+            pages = self.storefront_service.get_product_pages(product_ids)
+            body = {
+                "items": [pages[doc_id] for doc_id in product_ids if doc_id in pages],
+                "missing": [doc_id for doc_id in product_ids if doc_id not in pages],
+            }
+            return cacheable(jsonify(body), etag), 200
+        except Exception as e:
+            self.logger.error(f"Error fetching product pages: {e}")
+            return jsonify({"error": f"Error fetching product pages: {e}"}), 500
+
+    @swag_from(
+        {
+            "tags": ["storefront"],
+            "responses": {
+                200: {"description": "Page cache counters of the worker that answered"},
+            },
+        }
+    )
+    def get_cache_stats(self):
+        """Returns the hit and miss counters of the storefront page cache"""
+
+        return jsonify(self.storefront_service.get_cache_stats()), 200
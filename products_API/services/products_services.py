@@ -1,5 +1,12 @@
 from flask import jsonify
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 from logger.logger_products import Logger
+from models.change_log import ChangeLog
+from models.collection_version import CollectionVersion, utc_timestamp
+from models.id_allocator import IdAllocator
+from services.bulk_writes import bulk_delete, bulk_update
+from services.read_cache import ReadCache
 
 
 class ProductService:
@@ -8,12 +15,31 @@ class ProductService:
     def __init__(self, db_conn):
         self.logger = Logger()
         self.db_conn = db_conn
+        self.id_allocator = IdAllocator(db_conn)
+        self.cache = ReadCache()
+        self.version = CollectionVersion(db_conn, "products")
+        self.changes = ChangeLog(db_conn, "products")
 
-    def get_all_products(self):
-        """Function to fetch all products from the database"""
+    def get_all_products(self, after=None, limit=None, fields=None):
+        """Function to fetch all products from the database, one page at a time when a limit is given"""
+
+        # The version is read before the query and is part of the key, so a result
+        # read before a write is never served under the version of that write
+        version = self.get_version()
+        key = ("all", after, limit, tuple(fields) if fields else None, version)
+        hit, products = self.cache.get(key)
+        if hit:
+            return products
 
         try:
-            products = list(self.db_conn.db.products.find())
+            query = {"_id": {"$gt": after}} if after is not None else {}
+            projection = {field: 1 for field in fields} if fields else None
+            cursor = self.db_conn.db.products.find(query, projection)
+            if limit is not None:
+                cursor = cursor.sort("_id", 1).limit(limit)
+            products = list(cursor)
+            if version is not None:
+                self.cache.set(key, products)
             return products
         except Exception as e:
             self.logger.error(f"Error fetching all products from database: {e}")
@@ -22,11 +48,20 @@ class ProductService:
                 500,
             )
 
-    def get_product_by_id(self, product_id):
+    def get_product_by_id(self, product_id, fields=None):
         """Function to fetch a product by its id"""
 
+        version = self.get_version()
+        key = ("id", product_id, tuple(fields) if fields else None, version)
+        hit, product = self.cache.get(key)
+        if hit:
+            return product
+
         try:
-            product = self.db_conn.db.products.find_one({"_id": product_id})
+            projection = {field: 1 for field in fields} if fields else None
+            product = self.db_conn.db.products.find_one({"_id": product_id}, projection)
+            if product and version is not None:
+                self.cache.set(key, product)
             return product
         except Exception as e:
             self.logger.error(f"Error fetching product by id from database: {e}")
@@ -35,51 +70,219 @@ class ProductService:
                 500,
             )
 
+    def get_products_by_ids(self, product_ids, fields=None):
+        """Function to fetch many products by id with a single $in query
+
+        The products come back in no particular order and ids that do not
+        exist are simply absent.
+        """
+
+        version = self.get_version()
+        key = (
+            "all",
+            "ids",
+            tuple(product_ids),
+            tuple(fields) if fields else None,
+            version,
+        )
+        hit, products = self.cache.get(key)
+        if hit:
+            return products
+
+        try:
+            projection = {field: 1 for field in fields} if fields else None
+            products = list(
+                self.db_conn.db.products.find({"_id": {"$in": product_ids}}, projection)
+            )
+            if version is not None:
+                self.cache.set(key, products)
+            return products
+        except Exception as e:
+            self.logger.error(f"Error fetching products by ids from database: {e}")
+            raise
+
     def add_product(self, new_product):
         """Function to add a product to the database"""
 
         try:
-            max_id = self.db_conn.db.products.find_one(sort=[("_id", -1)])["_id"]
-            next_id = max_id + 1
-            new_product["_id"] = next_id
+            new_product["_id"] = self.id_allocator.next_id("products")
+            new_product["updated_at"] = utc_timestamp()
 
             self.db_conn.db.products.insert_one(new_product)
+            self._after_write(upserted=[new_product["_id"]])
             return new_product
         except Exception as e:
             self.logger.error(f"Error adding product to database: {e}")
             return jsonify({"error": f"Error adding product to database: {e}"}), 500
 
+    def add_products(self, new_products):
+        """Function to add many products with a contiguous id range and one insert_many
+
+        Returns the products and a dict of insert errors keyed by their position.
+        """
+
+        ids = self.id_allocator.next_ids("products", len(new_products))
+        updated_at = utc_timestamp()
+        for new_product, product_id in zip(new_products, ids):
+            new_product["_id"] = product_id
+            new_product["updated_at"] = updated_at
+
+        failed = {}
+        try:
+            self.db_conn.db.products.insert_many(new_products, ordered=False)
+        except BulkWriteError as e:
+            failed = {
+                error["index"]: error["errmsg"] for error in e.details["writeErrors"]
+            }
+            self.logger.error(f"Error adding {len(failed)} products in bulk")
+
+        if len(failed) < len(new_products):
+            self._after_write(
+                upserted=[
+                    product["_id"]
+                    for index, product in enumerate(new_products)
+                    if index not in failed
+                ]
+            )
+        return new_products, failed
+
     def update_product(self, product_id, product):
         """Function that updates a product in the database by its id"""
 
         try:
-            update_product = self.get_product_by_id(product_id)
-            if update_product:
-                updated_product = self.db_conn.db.products.update_one(
-                    {"_id": product_id}, {"$set": product}
-                )
-                if updated_product.modified_count > 0:
-                    return updated_product
-                else:
-                    return "The product is already up to date"
-            else:
-                return None
+            product["updated_at"] = utc_timestamp()
+            updated_product = self.db_conn.db.products.find_one_and_update(
+                {"_id": product_id},
+                {"$set": product},
+                return_document=ReturnDocument.AFTER,
+            )
+            if updated_product:
+                self._after_write(upserted=[product_id])
+            return updated_product
 
         except Exception as e:
             self.logger.error(f"Error updating product in database: {e}")
             return jsonify({"error": f"Error updating product in database: {e}"}), 500
 
+    def update_products(self, patches):
+        """Function to update many products with one read and one unordered bulk_write
+
+        Returns the per-id results and the matched, modified and missing counts.
+        """
+
+        try:
+            results, summary, _ = bulk_update(
+                self.db_conn.db.products, patches, utc_timestamp()
+            )
+            if summary["modified"]:
+                self._after_write(
+                    upserted=[
+                        result["_id"]
+                        for result in results
+                        if result["status"] == "updated"
+                    ]
+                )
+            return results, summary
+        except Exception as e:
+            self.logger.error(f"Error updating products in bulk: {e}")
+            raise
+
     def delete_product(self, product_id):
         """Function that deletes a product from the database by its id"""
 
         try:
-            deleted_product = self.get_product_by_id(product_id)
+            deleted_product = self.db_conn.db.products.find_one_and_delete(
+                {"_id": product_id}
+            )
             if deleted_product:
-                self.db_conn.db.products.delete_one({"_id": product_id})
-                return deleted_product
-            else:
-                return None
+                self._after_write(deleted=[product_id])
+            return deleted_product
 
         except Exception as e:
             self.logger.error(f"Error deleting product from database: {e}")
             return jsonify({"error": f"Error deleting product from database: {e}"}), 500
+
+    def delete_products(self, product_ids):
+        """Function to delete many products with one read and one unordered bulk_write
+
+        Returns the per-id results and the deleted and missing counts.
+        """
+
+        try:
+            results, summary, deleted = bulk_delete(
+                self.db_conn.db.products, product_ids
+            )
+            if summary["deleted"]:
+                self._after_write(deleted=list(deleted))
+            return results, summary
+        except Exception as e:
+            self.logger.error(f"Error deleting products in bulk: {e}")
+            raise
+
+    def _after_write(self, upserted=(), deleted=()):
+        """Function that bumps the products version, logs the change and drops stale cache entries"""
+
+        version = self.version.bump()
+        self.changes.record(version, upserted, deleted)
+
+        doc_ids = [*upserted, *deleted]
+        self.cache.invalidate(doc_ids[0] if len(doc_ids) == 1 else None)
+
+    def get_changes(self, since):
+        """Function that returns the products written and deleted after a version
+
+        Returns None when the change log no longer reaches back to that version.
+        """
+
+        try:
+            found = self.changes.since(since, self.version.current())
+            if found is None:
+                return None
+
+            operations, version, has_more = found
+            upserted = [doc_id for doc_id, op in operations.items() if op == "upsert"]
+            changed = []
+            if upserted:
+                cursor = self.db_conn.db.products.find({"_id": {"$in": upserted}})
+                changed = list(cursor.sort("_id", 1))
+            present = {doc["_id"] for doc in changed}
+
+            return {
+                "since": since,
+                "version": version,
+                "has_more": has_more,
+                "changed": changed,
+                # Tombstones, including documents deleted after being written
+                "deleted": [doc_id for doc_id in operations if doc_id not in present],
+            }
+        except Exception as e:
+            self.logger.error(f"Error fetching products changes from database: {e}")
+            raise
+
+    def get_version(self):
+        """Function that returns the products version, or None when it cannot be read"""
+
+        try:
+            return self.version.current()
+        except Exception as e:
+            self.logger.error(f"Error reading the products version: {e}")
+            return None
+
+    def get_cache_stats(self):
+        """Function that returns the read cache counters of this worker"""
+
+        return self.cache.stats()
+
+    def get_version_info(self):
+        """Function that returns the products version and the time of the last write"""
+
+        try:
+            return self.version.snapshot()
+        except Exception as e:
+            self.logger.error(f"Error reading the products version: {e}")
+            raise
+
+    def get_pool_stats(self):
+        """Function that returns the connection pool counters of this worker"""
+
+        return self.db_conn.pool_metrics.stats()
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class ReadCache:
+    """Class that keeps recent read results in memory with LRU and TTL eviction
+
+    Keys are tuples whose first item is either "all" (list queries) or "id"
+    (single document queries, with the document id as second item), which lets
+    writes drop only the entries that can contain the changed document.
+    """
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or int(os.environ.get("CACHE_MAX_ENTRIES", 256))
+        self.ttl = (
+            ttl if ttl is not None else float(os.environ.get("CACHE_TTL_SECONDS", 60))
+        )
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.on_invalidate = []
+
+    def get(self, key):
+        """Function that returns (True, value) on a hit and (False, None) on a miss"""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value):
+        """Function that stores a value and evicts the least recently used entries"""
+
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, doc_id=None, propagate=True):
+        """Function that drops every list entry and the entries of one document
+
+        Without a doc_id, as after bulk writes, the entries of every document
+        are dropped. Callbacks in on_invalidate are told about local writes so
+        other workers can evict the same entries; set propagate=False for remote
+        evictions.
+        """
+
+        with self._lock:
+            stale = [
+                key
+                for key in self._entries
+                if key[0] == "all" or doc_id is None or key[1] == doc_id
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += 1
+
+        if propagate:
+            for callback in self.on_invalidate:
+                callback(doc_id)
+
+    def clear(self):
+        """Function that drops every entry"""
+
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """Function that reports the cache counters"""
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "pid": os.getpid(),
+            }
@@ -0,0 +1,181 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from logger.logger_products import Logger
+from models.collection_version import CollectionVersion
+from services.read_cache import ReadCache
+
+# Threads per worker running the loads of a storefront request side by side.
+# Every thread holds its own pooled connection while it waits on MongoDB.
+FANOUT_THREADS = int(os.environ.get("STOREFRONT_FANOUT_THREADS", 4))
+
+
+class StorefrontService:
+    """Service class that assembles product pages from products, categories and reviews
+
+    The three collections live in the same database, so a page is read with
+    one $in query per collection instead of one request per API. Ratings only
+    need the product ids and are loaded while the products are, the categories
+    follow as soon as the products tell which ones are needed. Keys are
+    deduplicated before they are loaded, so ten products of one category read
+    that category once.
+
+    Whole pages are cached under the versions of the three collections, so a
+    write to any of them makes the next read assemble the page again.
+    """
+
+    def __init__(self, db_conn, product_service):
+        self.logger = Logger()
+        self.db_conn = db_conn
+        self.product_service = product_service
+        self.cache = ReadCache()
+        self.versions = [
+            product_service.version,
+            CollectionVersion(db_conn, "categories"),
+            CollectionVersion(db_conn, "reviews"),
+        ]
+        self.executor = ThreadPoolExecutor(
+            max_workers=FANOUT_THREADS, thread_name_prefix="storefront"
+        )
+
+    def get_product_pages(self, product_ids):
+        """Function to fetch the product, category and rating summary of many products
+
+        Returns the pages of the products found, keyed by product id.
+        """
+
+        version = self.get_version()
+        key = ("all", "pages", tuple(product_ids), version)
+        hit, pages = self.cache.get(key)
+        if hit:
+            return pages
+
+        try:
+            ratings = self.executor.submit(self._load_ratings, product_ids)
+            products = self.product_service.get_products_by_ids(product_ids)
+            categories = self._load_categories(
+                {product.get("category") for product in products}
+            )
+
+            ratings = ratings.result()
+            pages = {
+                product["_id"]: {
+                    "product": product,
+                    "category": categories.get(str(product.get("category"))),
+                    "rating": ratings[product["_id"]],
+                }
+                for product in products
+            }
+            if version is not None:
+                self.cache.set(key, pages)
+            return pages
+        except Exception as e:
+            self.logger.error(f"Error fetching product pages from database: {e}")
+            raise
+
+    def get_version(self):
+        """Function that combines the versions of the three collections, or None when one cannot be read"""
+
+        try:
+            return ".".join(str(version.current()) for version in self.versions)
+        except Exception as e:
+            self.logger.error(f"Error reading the storefront versions: {e}")
+            return None
+
+    def _load_categories(self, references):
+        """Function that loads the categories products refer to, keyed by the reference
+
+        Products name their category, older ones may hold its id instead.
+        """
+
+        references = {str(reference) for reference in references if reference}
+        if not references:
+            return {}
+
+        ids = [int(reference) for reference in references if reference.isdigit()]
+        categories = self.db_conn.db.categories.find(
+            {"$or": [{"name": {"$in": list(references)}}, {"_id": {"$in": ids}}]}
+        )
+
+        loaded = {}
+        for category in categories:
+            for reference in (category.get("name"), str(category["_id"])):
+                if reference in references:
+                    loaded[reference] = category
+        return loaded
+
+    def _load_ratings(self, product_ids):
+        """Function that loads the rating summaries of the products, keyed by product id"""
+
+        ratings = {
+            rating["_id"]: rating
+            for rating in self.db_conn.db.product_ratings.find(
+                {"_id": {"$in": list(product_ids)}, "count": {"$gte": 0}}
+            )
+        }
+
+        # Products without a product_ratings document yet, or with one that
+        # drifted below zero, are counted from the reviews with one aggregation
+        missing = [
+            product_id for product_id in product_ids if product_id not in ratings
+        ]
+        if missing:
+            ratings.update(self._aggregate_ratings(missing))
+
+        return {
+            product_id: _summary_from_rating(ratings.get(product_id, {}))
+            for product_id in product_ids
+        }
+
+    def _aggregate_ratings(self, product_ids):
+        # Products and ratings are stored as strings by the reviews POST endpoint
+        keys = [str(product_id) for product_id in product_ids] + list(product_ids)
+        buckets = self.db_conn.db.reviews.aggregate(
+            [
+                {"$match": {"product": {"$in": keys}}},
+                {
+                    "$group": {
+                        "_id": {
+                            "product": {"$toInt": "$product"},
+                            "rating": {"$toInt": "$rating"},
+                        },
+                        "count": {"$sum": 1},
+                    }
+                },
+            ]
+        )
+
+        ratings = {}
+        for bucket in buckets:
+            product, rating = bucket["_id"]["product"], bucket["_id"]["rating"]
+            if rating not in range(1, 6):
+                continue
+            doc = ratings.setdefault(
+                product,
+                {"sum": 0, "count": 0, "histogram": {str(r): 0 for r in range(1, 6)}},
+            )
+            doc["sum"] += rating * bucket["count"]
+            doc["count"] += bucket["count"]
+            doc["histogram"][str(rating)] += bucket["count"]
+        return ratings
+
+    def get_cache_stats(self):
+        """Function that returns the page cache counters of this worker"""
+
+        return self.cache.stats()
+
+    def close(self):
+        """Function that stops the fan-out threads of this worker"""
+
+        self.executor.shutdown(wait=False)
+
+
+def _summary_from_rating(rating):
+    # Same shape as the rating summaries of the reviews API
+    histogram = {str(value): 0 for value in range(1, 6)}
+    histogram.update(rating.get("histogram", {}))
+    count = rating.get("count", 0)
+    return {
+        "average": round(rating.get("sum", 0) / count, 2) if count else None,
+        "count": count,
+        "histogram": histogram,
+    }
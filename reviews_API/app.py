@@ -2,23 +2,32 @@ from flask import Flask
 from models.reviews_model import ReviewModel
 from services.reviews_services import ReviewService
 from schemas.reviews_schemas import ReviewSchema
+from services.cache_watcher import CacheWatcher
 from routes.reviews_routes import ReviewRoute
+from routes.compression import Compression
+from routes.json_provider import OrjsonProvider
 from flask_cors import CORS
 from flasgger import Swagger
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
+Compression(app)
 
 # Swagger
 swagger = Swagger(app)
 
-# Model
+# Model, the MongoDB client is created on first use in every worker
 db_conn = ReviewModel()
-db_conn.connect_to_database()
 
 # Service
 review_service = ReviewService(db_conn)
 
+# Evicts cached reviews written by the other workers
+cache_watcher = CacheWatcher(
+    db_conn, "reviews", review_service.cache, version=review_service.version
+)
+
 # Schema
 review_schema = ReviewSchema()
 
@@ -28,8 +37,26 @@ review_routes = ReviewRoute(review_service, review_schema)
 # Register the blueprint to make the routes available in the app
 app.register_blueprint(review_routes)
 
+
+def init_worker():
+    """Function that starts the background threads of a worker process
+
+    Called from the gunicorn post_fork hook, so it also runs with --preload.
+    """
+
+    cache_watcher.start()
+
+
+def close_worker():
+    """Function that stops the threads and closes the client of a worker process"""
+
+    cache_watcher.stop()
+    db_conn.close_connection()
+
+
 if __name__ == "__main__":
     try:
+        init_worker()
         app.run(debug=True)
     finally:
-        db_conn.close_connection()
+        close_worker()
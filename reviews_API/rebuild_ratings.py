@@ -0,0 +1,28 @@
+"""Recomputes the product_ratings collection from every review
+
+Run it inside the review_api container after a bulk import or whenever the
+incremental counters drifted:
+
+    docker compose exec review_api python rebuild_ratings.py
+"""
+
+from logger.logger_base import Logger
+from models.reviews_model import ReviewModel
+from services.reviews_services import ReviewService
+
+if __name__ == "__main__":
+    logger = Logger()
+    db_conn = ReviewModel()
+
+    try:
+        db_conn.connect_to_database()
+        result = ReviewService(db_conn).rebuild_product_ratings()
+        logger.info(
+            f"Product ratings rebuilt: {result['products']} products, "
+            f"{result['removed']} stale documents removed"
+        )
+    except Exception as e:
+        logger.critical(f"Error ocurred: {e}")
+        raise
+    finally:
+        db_conn.close_connection()
@@ -0,0 +1,230 @@
+import os
+from flask import request
+from marshmallow import fields as ma_fields
+
+DEFAULT_PAGE_LIMIT = int(os.environ.get("DEFAULT_PAGE_LIMIT", 50))
+MAX_PAGE_LIMIT = int(os.environ.get("MAX_PAGE_LIMIT", 500))
+MAX_IDS_PER_REQUEST = int(os.environ.get("MAX_IDS_PER_REQUEST", 500))
+MAX_BULK_ITEMS = int(os.environ.get("MAX_BULK_ITEMS", 1000))
+
+PAGINATION_PARAMETERS = [
+    {
+        "name": "after",
+        "in": "query",
+        "required": False,
+        "type": "integer",
+        "description": "Return documents whose id is greater than this cursor",
+    },
+    {
+        "name": "limit",
+        "in": "query",
+        "required": False,
+        "type": "integer",
+        "description": f"Page size (default {DEFAULT_PAGE_LIMIT}, max {MAX_PAGE_LIMIT})",
+    },
+]
+
+FIELDS_PARAMETER = {
+    "name": "fields",
+    "in": "query",
+    "required": False,
+    "type": "string",
+    "description": "Comma separated list of fields to return, e.g. name,price",
+}
+
+IDS_PARAMETER = {
+    "name": "ids",
+    "in": "query",
+    "required": False,
+    "type": "string",
+    "description": f"Comma separated ids to fetch with one query, at most {MAX_IDS_PER_REQUEST}",
+}
+
+
+def parse_pagination():
+    """Function that reads the keyset pagination arguments from the query string
+
+    Returns (None, None) when the client did not ask for a page so the
+    endpoints keep answering with the full list.
+    """
+
+    after = request.args.get("after")
+    limit = request.args.get("limit")
+
+    if after is None and limit is None:
+        return None, None
+
+    try:
+        after = int(after) if after is not None else None
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_LIMIT
+    except ValueError:
+        raise ValueError("after and limit must be integers")
+
+    if limit < 1 or limit > MAX_PAGE_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_LIMIT}")
+
+    return after, limit
+
+
+def paginated(items, limit):
+    """Function that wraps a page of documents with the cursor of the next page"""
+
+    next_cursor = items[-1]["_id"] if len(items) == limit else None
+    return {"items": items, "next": next_cursor}
+
+
+def parse_ids(raw_ids, max_ids=MAX_IDS_PER_REQUEST):
+    """Function that turns a comma separated list of ids into unique integers, in order"""
+
+    if raw_ids is None:
+        return None
+
+    ids = []
+    seen = set()
+    for raw_id in str(raw_ids).split(","):
+        raw_id = raw_id.strip()
+        if not raw_id:
+            continue
+        try:
+            doc_id = int(raw_id)
+        except ValueError:
+            raise ValueError(f"ids must be integers, got {raw_id!r}")
+        if doc_id not in seen:
+            seen.add(doc_id)
+            ids.append(doc_id)
+
+    if not ids:
+        raise ValueError("ids must contain at least one id")
+    if len(ids) > max_ids:
+        raise ValueError(f"at most {max_ids} ids can be requested at once")
+
+    return ids
+
+
+def parse_lookup_ids():
+    """Function that reads the ids of a multi-get from ?ids= or, on POST, a JSON array body
+
+    Long lists that do not fit in a URL are sent in the body, which accepts up
+    to MAX_BULK_ITEMS ids.
+    """
+
+    if request.method == "POST":
+        return parse_bulk_ids()
+
+    raw_ids = request.args.get("ids")
+    if raw_ids is None:
+        raise ValueError("ids is required")
+
+    return parse_ids(raw_ids)
+
+
+def ordered_by_ids(documents, ids):
+    """Function that returns the documents in the order of the requested ids and the ids not found"""
+
+    found = {document["_id"]: document for document in documents}
+    return {
+        "items": [found[doc_id] for doc_id in ids if doc_id in found],
+        "missing": [doc_id for doc_id in ids if doc_id not in found],
+    }
+
+
+def schema_field_names(schema):
+    """Function that lists the field names declared on a schema class or instance"""
+
+    declared = getattr(schema, "declared_fields", None)
+    if declared is not None:
+        return set(declared)
+
+    schema_class = schema if isinstance(schema, type) else type(schema)
+    return {
+        name
+        for name in dir(schema_class)
+        if isinstance(getattr(schema_class, name), ma_fields.Field)
+    }
+
+
+def parse_fields(allowed_fields):
+    """Function that reads the ?fields= argument and checks it against the allowed fields
+
+    Returns None when every field was requested. Dotted paths are accepted as
+    long as their top level field is allowed.
+    """
+
+    raw_fields = request.args.get("fields")
+    if raw_fields is None:
+        return None
+
+    requested = [field.strip() for field in raw_fields.split(",") if field.strip()]
+    if not requested:
+        raise ValueError("fields must name at least one field")
+
+    unknown = [
+        field for field in requested if field.split(".")[0] not in allowed_fields
+    ]
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(unknown)}. "
+            f"Allowed fields: {', '.join(sorted(allowed_fields))}"
+        )
+
+    return requested
+
+
+def parse_bulk_items():
+    """Function that reads the JSON array sent to a bulk endpoint"""
+
+    items = request.get_json(silent=True)
+    if not isinstance(items, list) or not items:
+        raise ValueError("The body must be a non empty JSON array")
+    if len(items) > MAX_BULK_ITEMS:
+        raise ValueError(f"At most {MAX_BULK_ITEMS} items can be sent at once")
+
+    return items
+
+
+def parse_bulk_ids():
+    """Function that reads the ids of a bulk delete from ?ids= or a JSON array body"""
+
+    raw_ids = request.args.get("ids")
+    if raw_ids is None:
+        raw_ids = ",".join(str(doc_id) for doc_id in parse_bulk_items())
+
+    return parse_ids(raw_ids, max_ids=MAX_BULK_ITEMS)
+
+
+def parse_bulk_patch(item):
+    """Function that splits one item of a bulk update into its id and the fields to set"""
+
+    if not isinstance(item, dict):
+        raise ValueError("Each item must be a JSON object")
+
+    fields = dict(item)
+    doc_id = fields.pop("_id", None)
+    if not isinstance(doc_id, int) or isinstance(doc_id, bool):
+        raise ValueError("_id must be an integer")
+    if not fields:
+        raise ValueError("The item has no fields to update")
+
+    return doc_id, fields
+
+
+def bulk_response(results, success_code=200):
+    """Function that summarises the per-item results of a bulk request
+
+    Answers success_code when every item succeeded, 207 when only some did and
+    400 when none did.
+    """
+
+    failed = sum(1 for result in results if result["status"] in ("error", "not_found"))
+    if failed == 0:
+        code = success_code
+    elif failed == len(results):
+        code = 400
+    else:
+        code = 207
+
+    return {
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results,
+    }, code
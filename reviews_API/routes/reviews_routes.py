@@ -1,6 +1,29 @@
 from flask import Blueprint, jsonify, request
 from marshmallow import ValidationError
 from flasgger import swag_from
+from routes.query_params import (
+    DEFAULT_PAGE_LIMIT,
+    FIELDS_PARAMETER,
+    IDS_PARAMETER,
+    PAGINATION_PARAMETERS,
+    bulk_response,
+    parse_bulk_ids,
+    parse_bulk_items,
+    parse_bulk_patch,
+    parse_fields,
+    parse_ids,
+    parse_lookup_ids,
+    parse_pagination,
+    ordered_by_ids,
+    paginated,
+    schema_field_names,
+)
+from routes.streaming import (
+    EXPORT_PARAMETERS,
+    ndjson_response,
+    parse_batch_size,
+    wants_ndjson,
+)
 from logger.logger_base import Logger
 
 
@@ -12,25 +35,44 @@ class ReviewRoute(Blueprint):
         self.logger = Logger()
         self.review_service = review_service
         self.review_schema = review_schema
+        self.projectable_fields = schema_field_names(review_schema) | {
+            "_id",
+            "updated_at",
+        }
         self.register_routes()
 
     def register_routes(self):
         """Function to register the routes for the review service"""
 
         self.route("/api/v1/reviews", methods=["GET"])(self.get_reviews)
+        self.route("/api/v1/reviews/<int:review_id>", methods=["GET"])(self.get_review)
+        self.route("/api/v1/products/<int:product_id>/reviews", methods=["GET"])(
+            self.get_product_reviews
+        )
+        self.route("/api/v1/product-ratings", methods=["GET"])(self.get_product_ratings)
         self.route("/api/v1/reviews", methods=["POST"])(self.add_review)
+        self.route("/api/v1/reviews/bulk", methods=["POST"])(self.add_reviews_bulk)
+        self.route("/api/v1/reviews/lookup", methods=["POST"])(self.get_reviews_by_ids)
         self.route("/api/v1/reviews/<int:review_id>", methods=["PUT"])(
             self.update_review
         )
         self.route("/api/v1/reviews/<int:review_id>", methods=["DELETE"])(
             self.delete_review
         )
+        self.route("/api/v1/reviews/bulk", methods=["PATCH"])(self.update_reviews_bulk)
+        self.route("/api/v1/reviews/bulk", methods=["DELETE"])(self.delete_reviews_bulk)
+        self.route("/api/v1/reviews/cache/stats", methods=["GET"])(self.get_cache_stats)
+        self.route("/api/v1/reviews/version", methods=["GET"])(self.get_version)
+        self.route("/api/v1/reviews/pool/stats", methods=["GET"])(self.get_pool_stats)
         self.route("/healthcheck", methods=["GET"])(self.healthcheck)
 
     # Swagger documentation for the GET request to /api/v1/reviews
     @swag_from(
         {
             "tags": ["reviews"],
+            "parameters": PAGINATION_PARAMETERS
+            + [IDS_PARAMETER, FIELDS_PARAMETER]
+            + EXPORT_PARAMETERS,
             "responses": {
                 200: {
                     "description": "GET all reviews",
@@ -53,8 +95,225 @@ class ReviewRoute(Blueprint):
     def get_reviews(self):
         """Fetches all the reviews"""
 
-        reviews = self.review_service.get_all_reviews()
-        return jsonify(reviews), 200
+        if "ids" in request.args:
+            return self.get_reviews_by_ids()
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        if wants_ndjson():
+            try:
+                batch_size = parse_batch_size()
+            except ValueError as e:
+                self.logger.error(f"Invalid export parameters: {e}")
+                return jsonify({"error": f"Invalid export parameters: {e}"}), 400
+
+            cursor = self.review_service.stream_all_reviews(batch_size, fields)
+            return ndjson_response(cursor, batch_size)
+
+        try:
+            after, limit = parse_pagination()
+        except ValueError as e:
+            self.logger.error(f"Invalid pagination parameters: {e}")
+            return jsonify({"error": f"Invalid pagination parameters: {e}"}), 400
+
+        reviews = self.review_service.get_all_reviews(after, limit, fields)
+        if limit is None:
+            return jsonify(reviews), 200
+        return jsonify(paginated(reviews, limit)), 200
+
+    # Swagger documentation for the GET request to /api/v1/reviews/<review_id>
+    @swag_from(
+        {
+            "tags": ["reviews"],
+            "parameters": [
+                {
+                    "name": "review_id",
+                    "in": "path",
+                    "required": True,
+                    "type": "integer",
+                },
+                FIELDS_PARAMETER,
+            ],
+            "responses": {
+                200: {"description": "Review fetched successfully"},
+                400: {"description": "Invalid fields parameter"},
+                404: {"description": "Review not found"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_review(self, review_id):
+        """Fetches a review by its ID"""
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        try:
+            review = self.review_service.get_review_by_id(review_id, fields)
+            if review:
+                return jsonify(review), 200
+            else:
+                self.logger.error("Review not found")
+                return jsonify({"error": "Review not found"}), 404
+
+        except Exception as e:
+            self.logger.error(f"Error fetching review: {e}")
+            return jsonify({"error": f"Error fetching review: {e}"}), 500
+
+    # Swagger documentation for the POST request to /api/v1/reviews/lookup
+    @swag_from(
+        {
+            "tags": ["reviews"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {"type": "array", "items": {"type": "integer"}},
+                },
+                FIELDS_PARAMETER,
+            ],
+            "responses": {
+                200: {"description": "Reviews in the requested order, missing ids"},
+                400: {"description": "Invalid ids or fields parameter"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_reviews_by_ids(self):
+        """Fetches many reviews by their IDs with one query, in the requested order"""
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        try:
+            review_ids = parse_lookup_ids()
+        except ValueError as e:
+            self.logger.error(f"Invalid ids: {e}")
+            return jsonify({"error": f"Invalid ids: {e}"}), 400
+
+        try:
+            reviews = self.review_service.get_reviews_by_ids(review_ids, fields)
+            return jsonify(ordered_by_ids(reviews, review_ids)), 200
+        except Exception as e:
+            self.logger.error(f"Error fetching reviews by ids: {e}")
+            return jsonify({"error": f"Error fetching reviews by ids: {e}"}), 500
+
+    # Swagger documentation for the GET request to /api/v1/products/<product_id>/reviews
+    @swag_from(
+        {
+            "tags": ["reviews"],
+            "parameters": [
+                {
+                    "name": "product_id",
+                    "in": "path",
+                    "required": True,
+                    "type": "integer",
+                },
+                FIELDS_PARAMETER,
+            ]
+            + PAGINATION_PARAMETERS,
+            "responses": {
+                200: {
+                    "description": "One page of the reviews of a product and its rating summary",
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "product": {"type": "integer"},
+                            "summary": {
+                                "type": "object",
+                                "properties": {
+                                    "average": {"type": "number"},
+                                    "count": {"type": "integer"},
+                                    "histogram": {"type": "object"},
+                                },
+                            },
+                            "items": {"type": "array", "items": {"type": "object"}},
+                            "next": {"type": "integer"},
+                        },
+                    },
+                },
+                400: {"description": "Invalid query parameters"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_product_reviews(self, product_id):
+        """Fetches the reviews of a product together with its rating summary"""
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+            after, limit = parse_pagination()
+        except ValueError as e:
+            self.logger.error(f"Invalid query parameters: {e}")
+            return jsonify({"error": f"Invalid query parameters: {e}"}), 400
+
+        limit = limit or DEFAULT_PAGE_LIMIT
+
+        try:
+            reviews = self.review_service.get_reviews_by_product(
+                product_id, after, limit, fields
+            )
+            summary = self.review_service.get_rating_summary(product_id)
+            response = {"product": product_id, "summary": summary}
+            response.update(paginated(reviews, limit))
+            return jsonify(response), 200
+
+        except Exception as e:
+            self.logger.error(f"Error fetching reviews of product: {e}")
+            return jsonify({"error": f"Error fetching reviews of product: {e}"}), 500
+
+    # Swagger documentation for the GET request to /api/v1/product-ratings
+    @swag_from(
+        {
+            "tags": ["reviews"],
+            "parameters": [
+                {
+                    "name": "ids",
+                    "in": "query",
+                    "required": True,
+                    "type": "string",
+                    "description": "Comma separated product ids, e.g. 1,2,3",
+                }
+            ],
+            "responses": {
+                200: {
+                    "description": "Rating summaries keyed by product id",
+                    "schema": {"type": "object"},
+                },
+                400: {"description": "Invalid ids"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_product_ratings(self):
+        """Fetches the rating summaries of many products at once"""
+
+        try:
+            product_ids = parse_ids(request.args.get("ids"))
+            if product_ids is None:
+                raise ValueError("ids is required")
+        except ValueError as e:
+            self.logger.error(f"Invalid ids: {e}")
+            return jsonify({"error": f"Invalid ids: {e}"}), 400
+
+        try:
+            ratings = self.review_service.get_rating_summaries(product_ids)
+            return jsonify(ratings), 200
+
+        except Exception as e:
+            self.logger.error(f"Error fetching product ratings: {e}")
+            return jsonify({"error": f"Error fetching product ratings: {e}"}), 500
 
     def fetch_request_data(self):
         """Function to fetch the request data from the request body and validate it with the schema"""
@@ -129,13 +388,123 @@ class ReviewRoute(Blueprint):
             }
 
             created_review = self.review_service.add_review(new_review)
-            self.logger.info(f"Review added: {created_review}")
+            self.logger.info(f"Review added: {created_review['_id']}")
             return jsonify(created_review), 201
 
         except Exception as e:
             self.logger.error(f"Error adding review: {e}")
             return jsonify({"error": f"Error adding review: {e}"}), 500
 
+    def validate_review(self, data):
+        """Function that validates one review with the schema and returns its fields"""
+
+        if not isinstance(data, dict):
+            raise ValidationError("Each item must be a JSON object")
+
+        missing = [
+            field
+            for field in ("user", "product", "review", "rating")
+            if field not in data
+        ]
+        if missing:
+            raise ValidationError(f"Missing fields: {', '.join(missing)}")
+
+        user = data["user"]
+        product = data["product"]
+        review = data["review"]
+        rating = data["rating"]
+
+        self.review_schema.validates_user(user)
+        self.review_schema.validates_product(product)
+        self.review_schema.validates_review(review)
+        self.review_schema.validates_rating(rating)
+
+        return {"user": user, "product": product, "review": review, "rating": rating}
+
+    # Swagger documentation for the POST request to /api/v1/reviews/bulk
+    @swag_from(
+        {
+            "tags": ["reviews"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "user": {"type": "string"},
+                                "product": {"type": "string"},
+                                "review": {"type": "string"},
+                                "rating": {"type": "string"},
+                            },
+                            "required": ["user", "product", "review", "rating"],
+                        },
+                    },
+                }
+            ],
+            "responses": {
+                201: {"description": "Every review was added"},
+                207: {
+                    "description": "Some reviews were added, see the per-item results"
+                },
+                400: {"description": "No review was added"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def add_reviews_bulk(self):
+        """Adds many reviews in one request, reporting the result of each item"""
+
+        try:
+            items = parse_bulk_items()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"error": f"Invalid bulk data: {e}"}), 400
+
+        results = [None] * len(items)
+        new_reviews = []
+        positions = []
+        for index, item in enumerate(items):
+            try:
+                new_reviews.append(self.validate_review(item))
+                positions.append(index)
+            except (ValidationError, TypeError, ValueError) as e:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "error": f"Invalid data: {e}",
+                }
+
+        try:
+            if new_reviews:
+                created, failed = self.review_service.add_reviews(new_reviews)
+                for position, (index, review) in enumerate(zip(positions, created)):
+                    if position in failed:
+                        results[index] = {
+                            "index": index,
+                            "status": "error",
+                            "error": failed[position],
+                        }
+                    else:
+                        results[index] = {
+                            "index": index,
+                            "status": "created",
+                            "_id": review["_id"],
+                        }
+
+            body, code = bulk_response(results, success_code=201)
+            self.logger.info(
+                f"Bulk reviews: {body['succeeded']} added, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error adding reviews in bulk: {e}")
+            return jsonify({"error": f"Error adding reviews in bulk: {e}"}), 500
+
     # Swagger documentation for the PUT request to /api/v1/reviews/<review_id>
     @swag_from(
         {
@@ -187,8 +556,8 @@ class ReviewRoute(Blueprint):
 
             updated_review = self.review_service.update_review(review_id, update_review)
             if updated_review:
-                self.logger.info(f"Review updated: {updated_review}")
-                return jsonify(update_review), 200
+                self.logger.info(f"Review updated: {review_id}")
+                return jsonify(updated_review), 200
             else:
                 self.logger.error("Review not found")
                 return jsonify({"error": "Review not found"}), 404
@@ -222,7 +591,7 @@ class ReviewRoute(Blueprint):
         try:
             deleted_review = self.review_service.delete_review(review_id)
             if deleted_review:
-                self.logger.info(f"Review deleted: {deleted_review}")
+                self.logger.info(f"Review deleted: {review_id}")
                 return jsonify(deleted_review), 200
             else:
                 self.logger.error("Review not found")
@@ -232,6 +601,213 @@ class ReviewRoute(Blueprint):
             self.logger.error(f"Error deleting review: {e}")
             return jsonify({"error": f"Error deleting review: {e}"}), 500
 
+    def validate_review_patch(self, fields):
+        """Function that validates the fields of a partial review update"""
+
+        validators = {
+            "user": self.review_schema.validates_user,
+            "product": self.review_schema.validates_product,
+            "review": self.review_schema.validates_review,
+            "rating": self.review_schema.validates_rating,
+        }
+        unknown = [field for field in fields if field not in validators]
+        if unknown:
+            raise ValidationError(f"Unknown fields: {', '.join(unknown)}")
+
+        for field, value in fields.items():
+            validators[field](value)
+
+        return fields
+
+    # Swagger documentation for the PATCH request to /api/v1/reviews/bulk
+    @swag_from(
+        {
+            "tags": ["reviews"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "_id": {"type": "integer"},
+                                "user": {"type": "string"},
+                                "product": {"type": "string"},
+                                "review": {"type": "string"},
+                                "rating": {"type": "string"},
+                            },
+                            "required": ["_id"],
+                        },
+                    },
+                }
+            ],
+            "responses": {
+                200: {
+                    "description": "Every review was found, see the matched and modified counts"
+                },
+                207: {
+                    "description": "Some reviews were not updated, see the per-id results"
+                },
+                400: {"description": "No review was updated"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def update_reviews_bulk(self):
+        """Updates many reviews in one request, reporting the counts of each id"""
+
+        try:
+            items = parse_bulk_items()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"error": f"Invalid bulk data: {e}"}), 400
+
+        results = [None] * len(items)
+        patches = []
+        positions = []
+        seen = set()
+        for index, item in enumerate(items):
+            try:
+                review_id, fields = parse_bulk_patch(item)
+                if review_id in seen:
+                    raise ValueError(f"_id {review_id} appears more than once")
+                patches.append((review_id, self.validate_review_patch(fields)))
+                seen.add(review_id)
+                positions.append(index)
+            except (ValidationError, TypeError, ValueError) as e:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "error": f"Invalid data: {e}",
+                }
+
+        try:
+            summary = {"matched": 0, "modified": 0, "missing": 0}
+            if patches:
+                updated, summary = self.review_service.update_reviews(patches)
+                for index, result in zip(positions, updated):
+                    results[index] = {"index": index, **result}
+
+            body, code = bulk_response(results)
+            body.update(summary)
+            self.logger.info(
+                f"Bulk reviews: {summary['modified']} modified, "
+                f"{summary['missing']} missing, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error updating reviews in bulk: {e}")
+            return jsonify({"error": f"Error updating reviews in bulk: {e}"}), 500
+
+    # Swagger documentation for the DELETE request to /api/v1/reviews/bulk
+    @swag_from(
+        {
+            "tags": ["reviews"],
+            "parameters": [
+                {
+                    "name": "ids",
+                    "in": "query",
+                    "required": False,
+                    "type": "string",
+                    "description": "Comma separated list of ids, e.g. 1,2,3",
+                },
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": False,
+                    "schema": {"type": "array", "items": {"type": "integer"}},
+                    "description": "JSON array of ids, used when ids is not given",
+                },
+            ],
+            "responses": {
+                200: {"description": "Every review was deleted"},
+                207: {
+                    "description": "Some reviews were not found, see the per-id results"
+                },
+                400: {"description": "No review was deleted"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def delete_reviews_bulk(self):
+        """Deletes many reviews in one request, reporting the result of each id"""
+
+        try:
+            review_ids = parse_bulk_ids()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"error": f"Invalid bulk data: {e}"}), 400
+
+        try:
+            results, summary = self.review_service.delete_reviews(review_ids)
+
+            body, code = bulk_response(results)
+            body.update(summary)
+            self.logger.info(
+                f"Bulk reviews: {summary['deleted']} deleted, "
+                f"{summary['missing']} missing, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error deleting reviews in bulk: {e}")
+            return jsonify({"error": f"Error deleting reviews in bulk: {e}"}), 500
+
+    # Swagger documentation for the GET request to /api/v1/reviews/cache/stats
+    @swag_from(
+        {
+            "tags": ["reviews"],
+            "responses": {
+                200: {"description": "Read cache counters of the worker that answered"},
+            },
+        }
+    )
+    def get_cache_stats(self):
+        """Returns the hit and miss counters of the review read cache"""
+
+        return jsonify(self.review_service.get_cache_stats()), 200
+
+    # Swagger documentation for the GET request to /api/v1/reviews/version
+    @swag_from(
+        {
+            "tags": ["reviews"],
+            "responses": {
+                200: {
+                    "description": "Collection version and the time of the last write"
+                },
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_version(self):
+        """Returns the current version of the reviews collection"""
+
+        try:
+            return jsonify(self.review_service.get_version_info()), 200
+        except Exception as e:
+            self.logger.error(f"Error reading the reviews version: {e}")
+            return jsonify({"error": f"Error reading the reviews version: {e}"}), 500
+
+    # Swagger documentation for the GET request to /api/v1/reviews/pool/stats
+    @swag_from(
+        {
+            "tags": ["reviews"],
+            "responses": {
+                200: {
+                    "description": "Checkouts, connections in use and checkout wait times"
+                },
+            },
+        }
+    )
+    def get_pool_stats(self):
+        """Returns the connection pool counters of the worker that answered"""
+
+        return jsonify(self.review_service.get_pool_stats()), 200
+
     def healthcheck(self):
         """Function to check the health of the docker container"""
 
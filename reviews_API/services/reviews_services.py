@@ -1,5 +1,11 @@
 from flask import jsonify
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 from logger.logger_base import Logger
+from models.collection_version import CollectionVersion, utc_timestamp
+from models.id_allocator import IdAllocator
+from services.bulk_writes import bulk_delete, bulk_update
+from services.read_cache import ReadCache
 
 
 class ReviewService:
@@ -8,12 +14,30 @@ class ReviewService:
     def __init__(self, db_conn):
         self.logger = Logger()
         self.db_conn = db_conn
+        self.id_allocator = IdAllocator(db_conn)
+        self.version = CollectionVersion(db_conn, "reviews")
+        self.cache = ReadCache()
 
-    def get_all_reviews(self):
-        """Function to fetch all reviews from the database"""
+    def get_all_reviews(self, after=None, limit=None, fields=None):
+        """Function to fetch all reviews from the database, one page at a time when a limit is given"""
+
+        # The version is read before the query and is part of the key, so a result
+        # read before a write is never served under the version of that write
+        version = self.get_version()
+        key = ("all", after, limit, tuple(fields) if fields else None, version)
+        hit, reviews = self.cache.get(key)
+        if hit:
+            return reviews
 
         try:
-            reviews = list(self.db_conn.db.reviews.find())
+            query = {"_id": {"$gt": after}} if after is not None else {}
+            projection = {field: 1 for field in fields} if fields else None
+            cursor = self.db_conn.db.reviews.find(query, projection)
+            if limit is not None:
+                cursor = cursor.sort("_id", 1).limit(limit)
+            reviews = list(cursor)
+            if version is not None:
+                self.cache.set(key, reviews)
             return reviews
         except Exception as e:
             self.logger.error(f"Error fetching all reviews from database: {e}")
@@ -22,11 +46,28 @@ class ReviewService:
                 500,
             )
 
-    def get_review_by_id(self, review_id):
+    def stream_all_reviews(self, batch_size, fields=None):
+        """Function that returns a cursor over all reviews, fetched batch_size at a time"""
+
+        projection = {field: 1 for field in fields} if fields else None
+        return self.db_conn.db.reviews.find(projection=projection).batch_size(
+            batch_size
+        )
+
+    def get_review_by_id(self, review_id, fields=None):
         """Function to fetch a review by its id"""
 
+        version = self.get_version()
+        key = ("id", review_id, tuple(fields) if fields else None, version)
+        hit, review = self.cache.get(key)
+        if hit:
+            return review
+
         try:
-            review = self.db_conn.db.reviews.find_one({"_id": review_id})
+            projection = {field: 1 for field in fields} if fields else None
+            review = self.db_conn.db.reviews.find_one({"_id": review_id}, projection)
+            if review and version is not None:
+                self.cache.set(key, review)
             return review
         except Exception as e:
             self.logger.error(f"Error fetching review by id from database: {e}")
@@ -35,34 +76,201 @@ class ReviewService:
                 500,
             )
 
+    def get_reviews_by_ids(self, review_ids, fields=None):
+        """Function to fetch many reviews by id with a single $in query
+
+        The reviews come back in no particular order and ids that do not
+        exist are simply absent.
+        """
+
+        version = self.get_version()
+        key = (
+            "all",
+            "ids",
+            tuple(review_ids),
+            tuple(fields) if fields else None,
+            version,
+        )
+        hit, reviews = self.cache.get(key)
+        if hit:
+            return reviews
+
+        try:
+            projection = {field: 1 for field in fields} if fields else None
+            reviews = list(
+                self.db_conn.db.reviews.find({"_id": {"$in": review_ids}}, projection)
+            )
+            if version is not None:
+                self.cache.set(key, reviews)
+            return reviews
+        except Exception as e:
+            self.logger.error(f"Error fetching reviews by ids from database: {e}")
+            raise
+
+    def get_reviews_by_product(self, product_id, after=None, limit=None, fields=None):
+        """Function to fetch one page of the reviews of a product"""
+
+        version = self.get_version()
+        key = (
+            "all",
+            "product",
+            product_id,
+            after,
+            limit,
+            tuple(fields) if fields else None,
+            version,
+        )
+        hit, reviews = self.cache.get(key)
+        if hit:
+            return reviews
+
+        try:
+            query = {"product": {"$in": [str(product_id), product_id]}}
+            if after is not None:
+                query["_id"] = {"$gt": after}
+            projection = {field: 1 for field in fields} if fields else None
+            cursor = self.db_conn.db.reviews.find(query, projection).sort("_id", 1)
+            if limit is not None:
+                cursor = cursor.limit(limit)
+            reviews = list(cursor)
+            if version is not None:
+                self.cache.set(key, reviews)
+            return reviews
+        except Exception as e:
+            self.logger.error(f"Error fetching reviews by product from database: {e}")
+            raise
+
+    def get_rating_summary(self, product_id):
+        """Function to fetch the average rating, count and 1-5 histogram of a product"""
+
+        return self.get_rating_summaries([product_id])[str(product_id)]
+
+    def get_rating_summaries(self, product_ids):
+        """Function to fetch the rating summaries of many products with one $in query"""
+
+        version = self.get_version()
+        summaries = {}
+        missing = []
+        for product_id in product_ids:
+            hit, summary = self.cache.get(("all", "summary", product_id, version))
+            if hit:
+                summaries[str(product_id)] = summary
+            else:
+                missing.append(product_id)
+
+        if not missing:
+            return summaries
+
+        try:
+            # Documents that drifted below zero are counted from the reviews instead
+            ratings = self.db_conn.db.product_ratings.find(
+                {
+                    "_id": {"$in": [self._product_key(product) for product in missing]},
+                    "count": {"$gte": 0},
+                }
+            )
+            ratings = {str(rating["_id"]): rating for rating in ratings}
+
+            for product_id in missing:
+                rating = ratings.get(str(product_id))
+                if rating is None:
+                    # No materialised aggregate yet, e.g. before the first rebuild
+                    summary = self._aggregate_rating_summary(product_id)
+                else:
+                    summary = self._summary_from_rating(rating)
+                if version is not None:
+                    self.cache.set(("all", "summary", product_id, version), summary)
+                summaries[str(product_id)] = summary
+
+            return summaries
+        except Exception as e:
+            self.logger.error(f"Error fetching rating summaries from database: {e}")
+            raise
+
+    def rebuild_product_ratings(self):
+        """Function that recomputes every product_ratings document from the reviews"""
+
+        try:
+            ratings = self._aggregate_ratings()
+            operations = [
+                ReplaceOne({"_id": product}, doc, upsert=True)
+                for product, doc in ratings.items()
+            ]
+            if operations:
+                self.db_conn.db.product_ratings.bulk_write(operations, ordered=False)
+            removed = self.db_conn.db.product_ratings.delete_many(
+                {"_id": {"$nin": list(ratings)}}
+            )
+
+            self.cache.invalidate()
+            return {"products": len(ratings), "removed": removed.deleted_count}
+        except Exception as e:
+            self.logger.error(f"Error rebuilding product ratings: {e}")
+            raise
+
     def add_review(self, new_review):
         """Function to add a review to the database"""
 
         try:
-            # Gets the highest id
-            max_id = self.db_conn.db.reviews.find_one(sort=[("_id", -1)])["_id"]
-            next_id = max_id + 1
-            new_review["_id"] = next_id
+            new_review["_id"] = self.id_allocator.next_id("reviews")
+            new_review["updated_at"] = utc_timestamp()
 
             self.db_conn.db.reviews.insert_one(new_review)
+            self._update_ratings(added=[new_review])
+            self._after_write(new_review["_id"])
             return new_review
         except Exception as e:
             self.logger.error(f"Error adding review to database: {e}")
             return jsonify({"error": f"Error adding review to database: {e}"}), 500
 
+    def add_reviews(self, new_reviews):
+        """Function to add many reviews with a contiguous id range and one insert_many
+
+        Returns the reviews and a dict of insert errors keyed by their position.
+        """
+
+        ids = self.id_allocator.next_ids("reviews", len(new_reviews))
+        updated_at = utc_timestamp()
+        for new_review, review_id in zip(new_reviews, ids):
+            new_review["_id"] = review_id
+            new_review["updated_at"] = updated_at
+
+        failed = {}
+        try:
+            self.db_conn.db.reviews.insert_many(new_reviews, ordered=False)
+        except BulkWriteError as e:
+            failed = {
+                error["index"]: error["errmsg"] for error in e.details["writeErrors"]
+            }
+            self.logger.error(f"Error adding {len(failed)} reviews in bulk")
+
+        if len(failed) < len(new_reviews):
+            inserted = [
+                review
+                for index, review in enumerate(new_reviews)
+                if index not in failed
+            ]
+            self._update_ratings(added=inserted)
+            self._after_write()
+        return new_reviews, failed
+
     def update_review(self, review_id, review):
         """Function that updatse a review in the database by its id"""
 
         try:
-            update_review = self.get_review_by_id(review_id)
-            if update_review:
-                updated_review = self.db_conn.db.reviews.update_one(
-                    {"_id": review_id}, {"$set": review}
+            review["updated_at"] = utc_timestamp()
+            # The previous version is needed to move the rating between buckets
+            previous_review = self.db_conn.db.reviews.find_one_and_update(
+                {"_id": review_id},
+                {"$set": review},
+                return_document=ReturnDocument.BEFORE,
+            )
+            if previous_review:
+                self._update_ratings(
+                    removed=[previous_review], added=[{**previous_review, **review}]
                 )
-                if updated_review.modified_count > 0:
-                    return updated_review
-                else:
-                    return "The review is already up to date"
+                self._after_write(review_id)
+                return {**previous_review, **review}
             else:
                 return None
 
@@ -70,13 +278,44 @@ class ReviewService:
             self.logger.error(f"Error updating review in database: {e}")
             return jsonify({"error": f"Error updating review in database: {e}"}), 500
 
+    def update_reviews(self, patches):
+        """Function to update many reviews with one read and one unordered bulk_write
+
+        Returns the per-id results and the matched, modified and missing counts.
+        """
+
+        try:
+            results, summary, previous = bulk_update(
+                self.db_conn.db.reviews, patches, utc_timestamp()
+            )
+            updated = [
+                result["_id"] for result in results if result["status"] == "updated"
+            ]
+            fields = dict(patches)
+            self._update_ratings(
+                removed=[previous[review_id] for review_id in updated],
+                added=[
+                    {**previous[review_id], **fields[review_id]}
+                    for review_id in updated
+                ],
+            )
+            if summary["modified"]:
+                self._after_write()
+            return results, summary
+        except Exception as e:
+            self.logger.error(f"Error updating reviews in bulk: {e}")
+            raise
+
     def delete_review(self, review_id):
         """Function to delete a review from the database by its id"""
 
         try:
-            deleted_review = self.get_review_by_id(review_id)
+            deleted_review = self.db_conn.db.reviews.find_one_and_delete(
+                {"_id": review_id}
+            )
             if deleted_review:
-                self.db_conn.db.reviews.delete_one({"_id": review_id})
+                self._update_ratings(removed=[deleted_review])
+                self._after_write(review_id)
                 return deleted_review
             else:
                 return None
@@ -84,3 +323,240 @@ class ReviewService:
         except Exception as e:
             self.logger.error(f"Error deleting review from database: {e}")
             return jsonify({"error": f"Error deleting review from database: {e}"}), 500
+
+    def delete_reviews(self, review_ids):
+        """Function to delete many reviews with one read and one unordered bulk_write
+
+        Returns the per-id results and the deleted and missing counts.
+        """
+
+        try:
+            results, summary, deleted = bulk_delete(self.db_conn.db.reviews, review_ids)
+            self._update_ratings(removed=list(deleted.values()))
+            if summary["deleted"]:
+                self._after_write()
+            return results, summary
+        except Exception as e:
+            self.logger.error(f"Error deleting reviews in bulk: {e}")
+            raise
+
+    def _after_write(self, doc_id=None):
+        """Function that bumps the reviews version and drops the stale cache entries"""
+
+        self.version.bump()
+        self.cache.invalidate(doc_id)
+
+    def get_version(self):
+        """Function that returns the reviews version, or None when it cannot be read"""
+
+        try:
+            return self.version.current()
+        except Exception as e:
+            self.logger.error(f"Error reading the reviews version: {e}")
+            return None
+
+    def get_cache_stats(self):
+        """Function that returns the read cache counters of this worker"""
+
+        return self.cache.stats()
+
+    def _aggregate_rating_summary(self, product_id):
+        """Function that computes a rating summary straight from the reviews"""
+
+        product = self._product_key(product_id)
+        rating = self._aggregate_ratings([product]).get(product)
+        return self._summary_from_rating(rating or self._empty_rating(product))
+
+    def _aggregate_ratings(self, products=None, exclude=()):
+        """Function that counts ratings straight from the reviews, keyed by product_ratings _id
+
+        Every product is counted when no products are given. Reviews whose id
+        is in exclude are left out.
+        """
+
+        match = {}
+        if products is not None:
+            # Products and ratings are stored as strings by the POST endpoint
+            match["product"] = {
+                "$in": [str(product) for product in products] + list(products)
+            }
+        if exclude:
+            match["_id"] = {"$nin": list(exclude)}
+
+        buckets = self.db_conn.db.reviews.aggregate(
+            [
+                {"$match": match},
+                {
+                    "$group": {
+                        "_id": {
+                            "product": "$product",
+                            "rating": {"$toInt": "$rating"},
+                        },
+                        "count": {"$sum": 1},
+                    }
+                },
+            ]
+        )
+
+        ratings = {}
+        for bucket in buckets:
+            product = self._product_key(bucket["_id"]["product"])
+            rating = bucket["_id"]["rating"]
+            if rating not in range(1, 6):
+                continue
+            doc = ratings.setdefault(product, self._empty_rating(product))
+            self._count_rating(doc, rating, bucket["count"])
+        return ratings
+
+    def _update_ratings(self, removed=(), added=()):
+        """Function that moves reviews between product_ratings buckets with $inc
+
+        Products without a product_ratings document yet, such as the ones
+        reviewed before the documents existed, are seeded from their reviews
+        first, so the increments start from the real totals.
+        """
+
+        increments = {}
+        for reviews, sign in ((removed, -1), (added, 1)):
+            for review in reviews:
+                rating = int(review["rating"])
+                increment = increments.setdefault(
+                    self._product_key(review["product"]), {"sum": 0, "count": 0}
+                )
+                increment["sum"] += sign * rating
+                increment["count"] += sign
+                bucket = f"histogram.{rating}"
+                increment[bucket] = increment.get(bucket, 0) + sign
+
+        if not increments:
+            return
+
+        operations = [
+            UpdateOne({"_id": product}, {"$inc": increment}, upsert=True)
+            for product, increment in increments.items()
+        ]
+
+        try:
+            self._seed_ratings(list(increments), removed, added)
+            self.db_conn.db.product_ratings.bulk_write(operations, ordered=False)
+            self._repair_ratings(list(increments))
+        except Exception as e:
+            # The reviews themselves were written, rebuild_product_ratings fixes the drift
+            self.logger.error(f"Error updating product ratings: {e}")
+
+    def _seed_ratings(self, products, removed, added):
+        """Function that creates the missing product_ratings documents from the reviews"""
+
+        ratings = self.db_conn.db.product_ratings
+        existing = {
+            rating["_id"]
+            for rating in ratings.find({"_id": {"$in": products}}, {"_id": 1})
+        }
+        unseeded = [product for product in products if product not in existing]
+        if not unseeded:
+            return
+
+        # The seed is the state before this write: its reviews are left out of
+        # the count and the previous versions of the removed ones added back,
+        # the increments then apply the write itself
+        touched = [review["_id"] for review in (*removed, *added)]
+        seeds = {product: self._empty_rating(product) for product in unseeded}
+        for product, rating in self._aggregate_ratings(unseeded, touched).items():
+            seeds[product] = rating
+        for review in removed:
+            product, rating = self._product_key(review["product"]), int(
+                review["rating"]
+            )
+            if product in seeds and rating in range(1, 6):
+                self._count_rating(seeds[product], rating, 1)
+
+        # $setOnInsert leaves the document alone when another write seeded it first
+        ratings.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": product},
+                    {"$setOnInsert": {k: v for k, v in seed.items() if k != "_id"}},
+                    upsert=True,
+                )
+                for product, seed in seeds.items()
+            ],
+            ordered=False,
+        )
+
+    def _repair_ratings(self, products):
+        """Function that recounts product_ratings documents whose counters went below zero"""
+
+        drifted = [
+            rating["_id"]
+            for rating in self.db_conn.db.product_ratings.find(
+                {
+                    "_id": {"$in": products},
+                    "$or": [
+                        {"count": {"$lt": 0}},
+                        *[{f"histogram.{r}": {"$lt": 0}} for r in range(1, 6)],
+                    ],
+                },
+                {"_id": 1},
+            )
+        ]
+        if not drifted:
+            return
+
+        self.logger.warning(f"Recounting drifted product ratings: {drifted}")
+        ratings = self._aggregate_ratings(drifted)
+        self.db_conn.db.product_ratings.bulk_write(
+            [
+                ReplaceOne(
+                    {"_id": product},
+                    ratings.get(product, self._empty_rating(product)),
+                    upsert=True,
+                )
+                for product in drifted
+            ],
+            ordered=False,
+        )
+
+    def _product_key(self, product):
+        """Function that normalises the product id used as product_ratings _id"""
+
+        try:
+            return int(product)
+        except (TypeError, ValueError):
+            return product
+
+    def _empty_rating(self, product):
+        return {
+            "_id": self._product_key(product),
+            "sum": 0,
+            "count": 0,
+            "histogram": {str(rating): 0 for rating in range(1, 6)},
+        }
+
+    def _count_rating(self, doc, rating, count):
+        doc["sum"] += rating * count
+        doc["count"] += count
+        doc["histogram"][str(rating)] += count
+
+    def _summary_from_rating(self, rating):
+        histogram = {str(value): 0 for value in range(1, 6)}
+        histogram.update(rating.get("histogram", {}))
+        count = rating.get("count", 0)
+        return {
+            "average": round(rating.get("sum", 0) / count, 2) if count else None,
+            "count": count,
+            "histogram": histogram,
+        }
+
+    def get_version_info(self):
+        """Function that returns the reviews version and the time of the last write"""
+
+        try:
+            return self.version.snapshot()
+        except Exception as e:
+            self.logger.error(f"Error reading the reviews version: {e}")
+            raise
+
+    def get_pool_stats(self):
+        """Function that returns the connection pool counters of this worker"""
+
+        return self.db_conn.pool_metrics.stats()
@@ -3,18 +3,21 @@ from models.users_model import UserModel
 from services.users_services import UserService
 from schemas.users_schemas import UserSchema
 from routes.users_routes import UserRoute
+from routes.compression import Compression
+from routes.json_provider import OrjsonProvider
 from flask_cors import CORS
 from flasgger import Swagger
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
+Compression(app)
 
 # Swagger
 swagger = Swagger(app)
 
-# Model
+# Model, the MongoDB client is created on first use in every worker
 db_conn = UserModel()
-db_conn.connect_to_database()
 
 # Service
 user_service = UserService(db_conn)
@@ -26,8 +29,13 @@ user_routes = UserRoute(user_service, user_schema)
 # Register the blueprint to make the routes available in the app
 app.register_blueprint(user_routes)
 
+
+def close_worker():
+    db_conn.close_connection()
+
+
 if __name__ == "__main__":
     try:
         app.run(debug=True)
     finally:
-        db_conn.close_connection()
+        close_worker()
@@ -0,0 +1,179 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    WatchedFileHandler,
+)
+
+LOG_FORMAT = "%(asctime)s: %(levelname)s [%(filename)s:%(lineno)s] %(message)s"
+
+# Records waiting for the writer thread. A full queue never blocks a request,
+# LOG_DROP_POLICY picks the record that is lost: "newest" discards the record
+# being logged, "oldest" makes room by discarding the longest waiting one.
+QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+DROP_POLICY = os.environ.get("LOG_DROP_POLICY", "newest")
+
+# The log file is rotated once it reaches MAX_BYTES, keeping BACKUP_COUNT files
+MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))
+BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+
+_configure_lock = threading.Lock()
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of waiting when the queue is full"""
+
+    def __init__(self, log_queue, policy):
+        super().__init__(log_queue)
+        self.policy = policy
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+
+        if self.policy == "oldest":
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.queue.put_nowait(record)
+            except (queue.Empty, queue.Full):
+                pass
+
+        with self._lock:
+            self.dropped += 1
+
+
+class _SharedRotatingFileHandler(RotatingFileHandler):
+    """Rotating file handler that follows the rotations done by other processes
+
+    Every gunicorn worker appends to the same file. When one of them rotates
+    it, the others reopen the new file instead of writing to the rotated one.
+    """
+
+    _statstream = WatchedFileHandler._statstream
+    reopenIfNeeded = WatchedFileHandler.reopenIfNeeded
+
+    def __init__(self, filename, max_bytes, backup_count):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count)
+        self.dev, self.ino = -1, -1
+        self._statstream()
+
+    def emit(self, record):
+        self.reopenIfNeeded()
+        super().emit(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self._statstream()
+
+
+class _Listener(QueueListener):
+    """Queue listener that reports how many records were dropped since its last report"""
+
+    def __init__(self, log_queue, queue_handler, *handlers):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.queue_handler = queue_handler
+        self.reported = 0
+
+    def enqueue_sentinel(self):
+        # Wait for room, the writer thread is still draining the queue
+        self.queue.put(self._sentinel)
+
+    def handle(self, record):
+        dropped = self.queue_handler.dropped
+        if dropped > self.reported:
+            super().handle(
+                logging.makeLogRecord(
+                    {
+                        "name": record.name,
+                        "levelno": logging.WARNING,
+                        "levelname": "WARNING",
+                        "pathname": __file__,
+                        "filename": os.path.basename(__file__),
+                        "lineno": 0,
+                        "msg": f"{dropped - self.reported} log records dropped, "
+                        f"the log queue was full",
+                    }
+                )
+            )
+            self.reported = dropped
+        super().handle(record)
+
+
+class LogPipeline:
+    """Class that moves log writes off the request path
+
+    Loggers only put records on a bounded in-memory queue; a background
+    thread writes them to stderr and to a size rotated file. The queue and
+    the thread are rebuilt in every process forked from the one that created
+    them, since threads do not survive fork().
+    """
+
+    def __init__(self, log_file, level, datefmt):
+        formatter = logging.Formatter(LOG_FORMAT, datefmt=datefmt)
+        self.handlers = [
+            logging.StreamHandler(),
+            _SharedRotatingFileHandler(log_file, MAX_BYTES, BACKUP_COUNT),
+        ]
+        for handler in self.handlers:
+            handler.setFormatter(formatter)
+            handler.setLevel(level)
+
+        self.queue_handler = _DroppingQueueHandler(queue.Queue(QUEUE_SIZE), DROP_POLICY)
+        self.listener = None
+
+    def start(self):
+        """Function that starts the writer thread"""
+
+        self.listener = _Listener(
+            self.queue_handler.queue, self.queue_handler, *self.handlers
+        )
+        self.listener.start()
+
+    def stop(self):
+        """Function that writes the records still queued and stops the writer thread"""
+
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def restart_after_fork(self):
+        # The parent's writer thread is gone and its queue may hold a lock
+        # taken at fork time, so the child starts over with empty ones
+        self.queue_handler.queue = queue.Queue(QUEUE_SIZE)
+        self.queue_handler.dropped = 0
+        self.queue_handler._lock = threading.Lock()
+        self.listener = None
+        self.start()
+
+
+def configure_logging(log_file, level=logging.INFO, datefmt=None):
+    """Function that routes the root logger through a LogPipeline
+
+    Like logging.basicConfig, it does nothing when the root logger already
+    has handlers, so every Logger of a process shares the first pipeline.
+    """
+
+    root = logging.getLogger()
+    with _configure_lock:
+        if root.handlers:
+            return None
+
+        pipeline = LogPipeline(log_file, level, datefmt)
+        pipeline.start()
+        root.addHandler(pipeline.queue_handler)
+        root.setLevel(level)
+
+    os.register_at_fork(after_in_child=pipeline.restart_after_fork)
+    atexit.register(pipeline.stop)
+    return pipeline
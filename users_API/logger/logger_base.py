@@ -1,15 +1,11 @@
 import logging as log
+from logger.log_pipeline import configure_logging
 
 
 class Logger:
 
     def __init__(self, log_file="atemporal_users_api.log", level=log.INFO):
-        log.basicConfig(
-            level=level,
-            format="%(asctime)s: %(levelname)s [%(filename)s:%(lineno)s] %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-            handlers=[log.StreamHandler(), log.FileHandler(log_file)],
-        )
+        configure_logging(log_file, level, datefmt="%Y-%m-%d %H:%M:%S")
         self.logger = log.getLogger()
 
     def debug(self, message):
@@ -0,0 +1,169 @@
+import os
+import zlib
+from flask import request
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Responses smaller than this many bytes are sent uncompressed. Streamed
+# responses have no known size and are always compressed.
+MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 500))
+GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6))
+BROTLI_LEVEL = int(os.environ.get("COMPRESSION_BROTLI_LEVEL", 4))
+ZSTD_LEVEL = int(os.environ.get("COMPRESSION_ZSTD_LEVEL", 3))
+
+# Encodings offered to clients, in the order preferred when the client
+# accepts several of them with the same weight
+ENCODINGS = os.environ.get("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",")
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/html",
+    "text/css",
+    "text/plain",
+}
+
+
+class _GzipStream:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        return self._compressor.compress(chunk) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_LEVEL)
+
+    def compress(self, chunk):
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _ZstdStream:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, chunk):
+        return self._compressor.compress(chunk) + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+def _available_streams():
+    streams = {"gzip": _GzipStream}
+    if brotli is not None:
+        streams["br"] = _BrotliStream
+    if zstandard is not None:
+        streams["zstd"] = _ZstdStream
+    return streams
+
+
+class Compression:
+    """Class that compresses the app's responses with the encoding the client prefers
+
+    The encoding is negotiated from Accept-Encoding among zstd, br and gzip;
+    brotli and zstd are only offered when their packages are installed.
+    Streamed responses, such as the NDJSON exports, are compressed chunk by
+    chunk and flushed after every chunk so clients keep receiving batches as
+    they are read.
+    """
+
+    def __init__(self, app=None):
+        self.streams = _available_streams()
+        self.encodings = [
+            encoding.strip()
+            for encoding in ENCODINGS
+            if encoding.strip() in self.streams
+        ]
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.compress)
+
+    def compress(self, response):
+        """Function that compresses a response when the client and the response allow it"""
+
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+
+        response.vary.add("Accept-Encoding")
+
+        if (
+            request.method == "HEAD"
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            return self._compress_stream(response, encoding)
+
+        data = response.get_data()
+        if len(data) < MIN_SIZE:
+            return response
+
+        stream = self.streams[encoding]()
+        compressed = stream.compress(data) + stream.finish()
+        if len(compressed) >= len(data):
+            return response
+
+        response.set_data(compressed)
+        self._set_encoding(response, encoding)
+        return response
+
+    def _compress_stream(self, response, encoding):
+        original = response.response
+        chunks = response.iter_encoded()
+        stream = self.streams[encoding]()
+
+        def generate():
+            for chunk in chunks:
+                if chunk:
+                    yield stream.compress(chunk)
+            yield stream.finish()
+
+        # Closing the response must still close the original iterable, which
+        # releases the MongoDB cursor of the NDJSON exports
+        response.response = ClosingIterator(
+            generate(), getattr(original, "close", None)
+        )
+        response.headers.pop("Content-Length", None)
+        self._set_encoding(response, encoding)
+        return response
+
+    def _set_encoding(self, response, encoding):
+        response.headers["Content-Encoding"] = encoding
+
+        # A strong ETag names exact bytes, so each encoding needs its own tag
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding}")
@@ -1,6 +1,20 @@
 from flask import Blueprint, jsonify, request
 from marshmallow import ValidationError
 from flasgger import swag_from
+from routes.query_params import (
+    FIELDS_PARAMETER,
+    IDS_PARAMETER,
+    PAGINATION_PARAMETERS,
+    bulk_response,
+    parse_bulk_ids,
+    parse_bulk_items,
+    parse_bulk_patch,
+    parse_fields,
+    parse_lookup_ids,
+    parse_pagination,
+    ordered_by_ids,
+    paginated,
+)
 from logger.logger_base import Logger
 import hashlib
 
@@ -12,21 +26,39 @@ class UserRoute(Blueprint):
         self.logger = Logger()
         self.user_service = user_service
         self.users_schema = users_schema
+        # UserSchema describes the request body, the stored documents use these names
+        # and the password hash is never projectable
+        self.projectable_fields = {"_id", "email", "type", "status", "updated_at"}
         self.register_routes()
 
     def register_routes(self):
 
         self.route("/api/v1/users", methods=["GET"])(self.get_users)
+        self.route("/api/v1/users/<int:user_id>", methods=["GET"])(
+            self.get_user
+        )
         self.route("/api/v1/is-users", methods=["POST"])(self.is_user)
         self.route("/api/v1/users", methods=["POST"])(self.create_user)
+        self.route("/api/v1/users/lookup", methods=["POST"])(self.get_users_by_ids)
         self.route("/api/v1/users/<int:user_id>", methods=["PUT"])(self.update_user_info)
         self.route("/api/v1/users/<int:user_id>", methods=["DELETE"])(self.delete_user)
+        self.route("/api/v1/users/bulk", methods=["PATCH"])(
+            self.update_users_bulk
+        )
+        self.route("/api/v1/users/bulk", methods=["DELETE"])(
+            self.delete_users_bulk
+        )
+        self.route("/api/v1/users/version", methods=["GET"])(self.get_version)
+        self.route("/api/v1/users/pool/stats", methods=["GET"])(
+            self.get_pool_stats
+        )
         self.route("/healthcheck", methods=["GET"])(self.healthcheck)
 
     # Swagger documentation for the GET request to /api/v1/users
     @swag_from(
         {
             "tags": ["users"],
+            "parameters": PAGINATION_PARAMETERS + [IDS_PARAMETER, FIELDS_PARAMETER],
             "responses": {
                 200: {
                     "description": "Get all registered users",
@@ -58,10 +90,106 @@ class UserRoute(Blueprint):
         }
     )
     def get_users(self):
-        users = self.user_service.get_all_users()
-        return jsonify(users), 200
+        if "ids" in request.args:
+            return self.get_users_by_ids()
+
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"error": f"Invalid fields parameter: {e}"}), 400
+
+        try:
+            after, limit = parse_pagination()
+        except ValueError as e:
+            self.logger.error(f"Invalid pagination parameters: {e}")
+            return jsonify({"error": f"Invalid pagination parameters: {e}"}), 400
+
+        users = self.user_service.get_all_users(after, limit, fields)
+        if limit is None:
+            return jsonify(users), 200
+        return jsonify(paginated(users, limit)), 200
     
 
+    @swag_from(
+        {
+            "tags": ["users"],
+            "parameters": [
+                {
+                    "name": "user_id",
+                    "in": "path",
+                    "required": True,
+                    "type": "integer",
+                },
+                FIELDS_PARAMETER,
+            ],
+            "responses": {
+                200: {"description": "User fetched successfully"},
+                400: {"description": "Invalid fields parameter"},
+                404: {"description": "User not found"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_user(self, user_id):
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"Error": f"Invalid fields parameter: {e}"}), 400
+
+        try:
+            user = self.user_service.get_users_by_user_id(user_id, fields)
+            if user:
+                return jsonify(user), 200
+            else:
+                self.logger.error("User not found")
+                return jsonify({"Error": "User not found"}), 404
+
+        except Exception as e:
+            self.logger.error(f"Error fetching user: {e}")
+            return jsonify({"Error": f"Error fetching user: {e}"}), 500
+
+    # Swagger documentation for the POST request to /api/v1/users/lookup
+    @swag_from(
+        {
+            "tags": ["users"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {"type": "array", "items": {"type": "integer"}},
+                },
+                FIELDS_PARAMETER,
+            ],
+            "responses": {
+                200: {"description": "Users in the requested order, missing ids"},
+                400: {"description": "Invalid ids or fields parameter"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_users_by_ids(self):
+        try:
+            fields = parse_fields(self.projectable_fields)
+        except ValueError as e:
+            self.logger.error(f"Invalid fields parameter: {e}")
+            return jsonify({"Error": f"Invalid fields parameter: {e}"}), 400
+
+        try:
+            user_ids = parse_lookup_ids()
+        except ValueError as e:
+            self.logger.error(f"Invalid ids: {e}")
+            return jsonify({"Error": f"Invalid ids: {e}"}), 400
+
+        try:
+            users = self.user_service.get_users_by_user_ids(user_ids, fields)
+            return jsonify(ordered_by_ids(users, user_ids)), 200
+        except Exception as e:
+            self.logger.error(f"Error fetching users by ids: {e}")
+            return jsonify({"Error": f"Error fetching users by ids: {e}"}), 500
+
     def fetch_request_data(self):
 
         try:
@@ -173,7 +301,7 @@ class UserRoute(Blueprint):
                 self.logger.error("Error: Please verify the data entered (email and password)")
                 return jsonify({"Error":"Please verify the data entered (email and password)."}), 500
 
-            self.logger.info(f"Login user: {user}")
+            self.logger.info(f"Login user: {user['_id']}")
             return jsonify({
                 "status": "success", 
                 "user_info": {
@@ -274,7 +402,7 @@ class UserRoute(Blueprint):
                 return jsonify({"Error": f"Error creating new user: {response}"}), code
 
             response['password'] = user_password
-            self.logger.info(f"New User created: {response}")
+            self.logger.info(f"New User created: {response['_id']}")
             return jsonify({"status":"success", "New_user_created": response}), 201
 
         except Exception as e:
@@ -379,7 +507,7 @@ class UserRoute(Blueprint):
             updated_user = self.user_service.update_user(user_id, update_user)
             if updated_user:
                 update_user['password'] = user_password
-                self.logger.info(f"User updated: {update_user}")
+                self.logger.info(f"User updated: {user_id}")
                 return jsonify({"status": "success","User updated": update_user}), 200
             else:
                 self.logger.error("User not found")
@@ -453,7 +581,7 @@ class UserRoute(Blueprint):
         try:
             deleted_user = self.user_service.delete_user(user_id)
             if deleted_user:
-                self.logger.info(f"User deleted: {deleted_user}")
+                self.logger.info(f"User deleted: {user_id}")
                 return jsonify({"User deleted": deleted_user}), 200
             else:
                 self.logger.error("User not found")
@@ -464,6 +592,181 @@ class UserRoute(Blueprint):
             return jsonify({"Error": f"Error deleting user: {e}"}), 500
 
 
+    def validate_user_patch(self, fields):
+        validators = {
+            "email": self.users_schema.validates_user,
+            "password": self.users_schema.validates_password,
+            "type": self.users_schema.validates_type,
+        }
+        unknown = [field for field in fields if field not in validators]
+        if unknown:
+            raise ValidationError(f"Unknown fields: {', '.join(unknown)}")
+
+        for field, value in fields.items():
+            validators[field](value)
+
+        if "password" in fields:
+            # Passwords are stored as their SHA-256 hex digest, as in update_user_info
+            fields["password"] = hashlib.sha256(fields["password"].encode()).hexdigest()
+
+        return fields
+
+    # Swagger documentation for the PATCH request to /api/v1/users/bulk
+    @swag_from(
+        {
+            "tags": ["users"],
+            "parameters": [
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": True,
+                    "schema": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "_id": {"type": "integer"},
+                                "email": {"type": "string"},
+                                "password": {"type": "string"},
+                                "type": {"type": "string"},
+                            },
+                            "required": ["_id"],
+                        },
+                    },
+                }
+            ],
+            "responses": {
+                200: {"description": "Every user was found, see the matched and modified counts"},
+                207: {"description": "Some users were not updated, see the per-id results"},
+                400: {"description": "No user was updated"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def update_users_bulk(self):
+        try:
+            items = parse_bulk_items()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"Error": f"Invalid bulk data: {e}"}), 400
+
+        results = [None] * len(items)
+        patches = []
+        positions = []
+        seen = set()
+        for index, item in enumerate(items):
+            try:
+                user_id, fields = parse_bulk_patch(item)
+                if user_id in seen:
+                    raise ValueError(f"_id {user_id} appears more than once")
+                patches.append((user_id, self.validate_user_patch(fields)))
+                seen.add(user_id)
+                positions.append(index)
+            except (ValidationError, TypeError, ValueError) as e:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "error": f"Invalid data: {e}",
+                }
+
+        try:
+            summary = {"matched": 0, "modified": 0, "missing": 0}
+            if patches:
+                updated, summary = self.user_service.update_users(patches)
+                for index, result in zip(positions, updated):
+                    results[index] = {"index": index, **result}
+
+            body, code = bulk_response(results)
+            body.update(summary)
+            self.logger.info(
+                f"Bulk users: {summary['modified']} modified, "
+                f"{summary['missing']} missing, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error updating users in bulk: {e}")
+            return jsonify({"Error": f"Error updating users in bulk: {e}"}), 500
+
+    # Swagger documentation for the DELETE request to /api/v1/users/bulk
+    @swag_from(
+        {
+            "tags": ["users"],
+            "parameters": [
+                {
+                    "name": "ids",
+                    "in": "query",
+                    "required": False,
+                    "type": "string",
+                    "description": "Comma separated list of ids, e.g. 1,2,3",
+                },
+                {
+                    "name": "body",
+                    "in": "body",
+                    "required": False,
+                    "schema": {"type": "array", "items": {"type": "integer"}},
+                    "description": "JSON array of ids, used when ids is not given",
+                },
+            ],
+            "responses": {
+                200: {"description": "Every user was deleted"},
+                207: {"description": "Some users were not found, see the per-id results"},
+                400: {"description": "No user was deleted"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def delete_users_bulk(self):
+        try:
+            user_ids = parse_bulk_ids()
+        except ValueError as e:
+            self.logger.error(f"Invalid bulk data: {e}")
+            return jsonify({"Error": f"Invalid bulk data: {e}"}), 400
+
+        try:
+            results, summary = self.user_service.delete_users(user_ids)
+
+            body, code = bulk_response(results)
+            body.update(summary)
+            self.logger.info(
+                f"Bulk users: {summary['deleted']} deleted, "
+                f"{summary['missing']} missing, {body['failed']} failed"
+            )
+            return jsonify(body), code
+
+        except Exception as e:
+            self.logger.error(f"Error deleting users in bulk: {e}")
+            return jsonify({"Error": f"Error deleting users in bulk: {e}"}), 500
+
+    # Swagger documentation for the GET request to /api/v1/users/version
+    @swag_from(
+        {
+            "tags": ["users"],
+            "responses": {
+                200: {"description": "Collection version and the time of the last write"},
+                500: {"description": "Internal server error"},
+            },
+        }
+    )
+    def get_version(self):
+        try:
+            return jsonify(self.user_service.get_version_info()), 200
+        except Exception as e:
+            self.logger.error(f"Error reading the users version: {e}")
+            return jsonify({"Error": f"Error reading the users version: {e}"}), 500
+
+    # Swagger documentation for the GET request to /api/v1/users/pool/stats
+    @swag_from(
+        {
+            "tags": ["users"],
+            "responses": {
+                200: {"description": "Checkouts, connections in use and checkout wait times"},
+            },
+        }
+    )
+    def get_pool_stats(self):
+        return jsonify(self.user_service.get_pool_stats()), 200
+
     def healthcheck(self):
         """Function to check the health of the docker container"""
 
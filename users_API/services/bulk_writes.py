@@ -0,0 +1,102 @@
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+_MISSING = object()
+
+
+def bulk_update(collection, patches, updated_at=None):
+    """Function that applies many $set patches with one read and one unordered bulk_write
+
+    patches is a list of (doc_id, fields) pairs with unique ids. The current
+    documents are read with a single $in query so every id can be reported as
+    updated, unchanged or not_found, and only the patches that change something
+    are sent to the server, stamped with updated_at when it is given.
+
+    Returns the per-id results, the summary counts and the documents as they
+    were before the update, keyed by id.
+    """
+
+    ids = [doc_id for doc_id, _ in patches]
+    previous = {doc["_id"]: doc for doc in collection.find({"_id": {"$in": ids}})}
+
+    results = []
+    operations = []
+    positions = []
+    for doc_id, fields in patches:
+        doc = previous.get(doc_id)
+        if doc is None:
+            results.append(
+                {"_id": doc_id, "status": "not_found", "matched": 0, "modified": 0}
+            )
+        elif all(doc.get(field, _MISSING) == value for field, value in fields.items()):
+            results.append(
+                {"_id": doc_id, "status": "unchanged", "matched": 1, "modified": 0}
+            )
+        else:
+            results.append(
+                {"_id": doc_id, "status": "updated", "matched": 1, "modified": 1}
+            )
+            changes = {**fields, "updated_at": updated_at} if updated_at else fields
+            operations.append(UpdateOne({"_id": doc_id}, {"$set": changes}))
+            positions.append(len(results) - 1)
+
+    _bulk_write(collection, operations, positions, results)
+
+    summary = {
+        "matched": sum(result.get("matched", 0) for result in results),
+        "modified": sum(result.get("modified", 0) for result in results),
+        "missing": sum(1 for result in results if result["status"] == "not_found"),
+    }
+    return results, summary, previous
+
+
+def bulk_delete(collection, ids):
+    """Function that deletes many documents with one read and one unordered bulk_write
+
+    Returns the per-id results, the summary counts and the deleted documents,
+    keyed by id.
+    """
+
+    previous = {doc["_id"]: doc for doc in collection.find({"_id": {"$in": ids}})}
+
+    results = []
+    operations = []
+    positions = []
+    for doc_id in ids:
+        if doc_id in previous:
+            results.append({"_id": doc_id, "status": "deleted", "deleted": 1})
+            operations.append(DeleteOne({"_id": doc_id}))
+            positions.append(len(results) - 1)
+        else:
+            results.append({"_id": doc_id, "status": "not_found", "deleted": 0})
+
+    _bulk_write(collection, operations, positions, results)
+
+    deleted = {
+        result["_id"]: previous[result["_id"]]
+        for result in results
+        if result["status"] == "deleted"
+    }
+    summary = {
+        "deleted": len(deleted),
+        "missing": sum(1 for result in results if result["status"] == "not_found"),
+    }
+    return results, summary, deleted
+
+
+def _bulk_write(collection, operations, positions, results):
+    """Function that runs the operations and marks the ones the server rejected"""
+
+    if not operations:
+        return
+
+    try:
+        collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details["writeErrors"]:
+            position = positions[error["index"]]
+            results[position] = {
+                "_id": results[position]["_id"],
+                "status": "error",
+                "error": error["errmsg"],
+            }
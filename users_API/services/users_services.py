@@ -1,5 +1,10 @@
 from flask import jsonify
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from logger.logger_base import Logger
+from models.collection_version import CollectionVersion, utc_timestamp
+from models.id_allocator import IdAllocator
+from services.bulk_writes import bulk_delete, bulk_update
 
 
 class UserService:
@@ -7,10 +12,17 @@ class UserService:
     def __init__(self, db_conn):
         self.logger = Logger()
         self.db_conn = db_conn
+        self.id_allocator = IdAllocator(db_conn)
+        self.version = CollectionVersion(db_conn, "users")
 
-    def get_all_users(self):
+    def get_all_users(self, after=None, limit=None, fields=None):
         try:
-            users = list(self.db_conn.db.users.find())  # retry all documents
+            query = {"_id": {"$gt": after}} if after is not None else {}
+            projection = {field: 1 for field in fields} if fields else None
+            cursor = self.db_conn.db.users.find(query, projection)
+            if limit is not None:
+                cursor = cursor.sort("_id", 1).limit(limit)
+            users = list(cursor)
             return users
         except Exception as e:
             self.logger.error(f"Error fetching all users from database: {e}")
@@ -33,12 +45,13 @@ class UserService:
                 500,
             )
 
-    def get_users_by_user_id(self, user_id):
+    def get_users_by_user_id(self, user_id, fields=None):
 
         try:
+            projection = {field: 1 for field in fields} if fields else None
             user = self.db_conn.db.users.find_one(
-                {"_id": user_id}
-            )  # filter by user email
+                {"_id": user_id}, projection
+            )  # filter by user id
             return user
         except Exception as e:
             self.logger.error(f"Error fetching user by id from database: {e}")
@@ -47,6 +60,22 @@ class UserService:
                 500,
             )
 
+    def get_users_by_user_ids(self, user_ids, fields=None):
+        """Function to fetch many users by id with a single $in query
+
+        The users come back in no particular order and ids that do not
+        exist are simply absent.
+        """
+
+        try:
+            projection = {field: 1 for field in fields} if fields else None
+            return list(
+                self.db_conn.db.users.find({"_id": {"$in": user_ids}}, projection)
+            )
+        except Exception as e:
+            self.logger.error(f"Error fetching users by ids from database: {e}")
+            raise
+
     def create_new_user(self, new_user):
 
         try:
@@ -57,18 +86,20 @@ class UserService:
                 )
                 return "Email is already registered", 500
 
-            if self.db_conn.db.users.count_documents({}) == 0:
-                new_user["_id"] = 1
-            else:
-                max_id = self.db_conn.db.users.find_one(sort=[("_id", -1)])[
-                    "_id"
-                ]  # Gets the highest id
-                next_id = max_id + 1
-                new_user["_id"] = next_id
+            new_user["_id"] = self.id_allocator.next_id("users")
+            new_user["updated_at"] = utc_timestamp()
 
             self.db_conn.db.users.insert_one(new_user)
+            self.version.bump()
             return new_user, 201
 
+        except DuplicateKeyError:
+            # A concurrent signup won the race on the unique email index
+            self.logger.error(
+                f"Error adding new user to database: Email is already registered"
+            )
+            return "Email is already registered", 500
+
         except Exception as e:
             self.logger.error(f"Error adding new user to database: {e}")
             return jsonify({"error": f"Error adding new user to database: {e}"}), 500
@@ -76,32 +107,74 @@ class UserService:
     def update_user(self, user_id, user):
 
         try:
-            update_user = self.get_users_by_user_id(user_id)
-            if update_user:
-                updated_user = self.db_conn.db.users.update_one(
-                    {"_id": user_id}, {"$set": user}
-                )
-                if updated_user.modified_count > 0:
-                    return updated_user
-                else:
-                    return "The review is already up to date"
-            else:
-                return None
+            user["updated_at"] = utc_timestamp()
+            updated_user = self.db_conn.db.users.find_one_and_update(
+                {"_id": user_id},
+                {"$set": user},
+                return_document=ReturnDocument.AFTER,
+            )
+            if updated_user:
+                self.version.bump()
+            return updated_user
 
         except Exception as e:
             self.logger.error(f"Error updating user in database: {e}")
             return jsonify({"error": f"Error updating user in database: {e}"}), 500
 
+    def update_users(self, patches):
+        """Function to update many users with one read and one unordered bulk_write
+
+        Returns the per-id results and the matched, modified and missing counts.
+        """
+
+        try:
+            results, summary, _ = bulk_update(
+                self.db_conn.db.users, patches, utc_timestamp()
+            )
+            if summary["modified"]:
+                self.version.bump()
+            return results, summary
+        except Exception as e:
+            self.logger.error(f"Error updating users in bulk: {e}")
+            raise
+
     def delete_user(self, user_id):
 
         try:
-            deleted_user = self.get_users_by_user_id(user_id)
+            deleted_user = self.db_conn.db.users.find_one_and_delete({"_id": user_id})
             if deleted_user:
-                self.db_conn.db.users.delete_one({"_id": user_id})
-                return deleted_user
-            else:
-                return None
+                self.version.bump()
+            return deleted_user
 
         except Exception as e:
             self.logger.error(f"Error deleting review from database: {e}")
             return jsonify({"error": f"Error deleting review from database: {e}"}), 500
+
+    def delete_users(self, user_ids):
+        """Function to delete many users with one read and one unordered bulk_write
+
+        Returns the per-id results and the deleted and missing counts.
+        """
+
+        try:
+            results, summary, _ = bulk_delete(self.db_conn.db.users, user_ids)
+            if summary["deleted"]:
+                self.version.bump()
+            return results, summary
+        except Exception as e:
+            self.logger.error(f"Error deleting users in bulk: {e}")
+            raise
+
+    def get_version_info(self):
+        """Function that returns the users version and the time of the last write"""
+
+        try:
+            return self.version.snapshot()
+        except Exception as e:
+            self.logger.error(f"Error reading the users version: {e}")
+            raise
+
+    def get_pool_stats(self):
+        """Function that returns the connection pool counters of this worker"""
+
+        return self.db_conn.pool_metrics.stats()